@@ -4,4 +4,5 @@ app_name = "api_v1"
 
 urlpatterns = [
     path('user/', include('apps.users.api.v1.urls.users')),
+    path('stats/', include('apps.core.api.v1.urls.stats')),
 ]
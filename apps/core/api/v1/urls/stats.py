@@ -0,0 +1,13 @@
+from django.urls import path
+
+from apps.core.api.v1.views import (
+    DatabasePoolStatsView, ResponseCacheStatsView, ServerTimingStatsView,
+)
+
+app_name = 'stats'
+
+urlpatterns = [
+    path('response-cache/', ResponseCacheStatsView.as_view(), name='response_cache'),
+    path('server-timing/', ServerTimingStatsView.as_view(), name='server_timing'),
+    path('db-pool/', DatabasePoolStatsView.as_view(), name='db_pool'),
+]
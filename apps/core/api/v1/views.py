@@ -0,0 +1,40 @@
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.core.db.pool import get_pool_stats
+from apps.core.profiling import get_server_timing_stats
+from apps.core.response_cache import get_response_cache
+
+
+class ResponseCacheStatsView(APIView):
+    """
+    Hit ratio and latency of the response cache per action, for the
+    process answering the request.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(get_response_cache().stats())
+
+
+class ServerTimingStatsView(APIView):
+    """
+    Rolling percentiles of the request profiles per URL name, for the
+    process answering the request.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(get_server_timing_stats().stats())
+
+
+class DatabasePoolStatsView(APIView):
+    """
+    Size, saturation and checkout wait time of the database connection
+    pools, for the process answering the request.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(get_pool_stats())
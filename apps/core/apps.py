@@ -0,0 +1,24 @@
+from django.apps import AppConfig
+from django.core.checks import register
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+
+
+class CoreConfig(AppConfig):
+    name = 'apps.core'
+
+    def ready(self):
+        from apps.core.checks import check_response_cache
+        from apps.core.db.sqlite import apply_sqlite_profile
+        from apps.core.profiling import install_query_recorder
+        from apps.core.response_cache import invalidate_model_responses
+
+        post_save.connect(invalidate_model_responses,
+                          dispatch_uid='core.invalidate_model_responses')
+        post_delete.connect(invalidate_model_responses,
+                            dispatch_uid='core.invalidate_model_responses')
+        connection_created.connect(install_query_recorder,
+                                   dispatch_uid='core.install_query_recorder')
+        connection_created.connect(apply_sqlite_profile,
+                                   dispatch_uid='core.apply_sqlite_profile')
+        register(check_response_cache)
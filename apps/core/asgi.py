@@ -0,0 +1,189 @@
+"""
+Async JSON endpoints served next to the Django ASGI application.
+
+Django 3.0 runs every view synchronously, so under an ASGI server each
+request holds a thread for its whole duration. `AsyncRouter` answers a few
+hot endpoints on the event loop instead and hands everything else, the
+async viewsets of `apps.core.async_viewsets` included, to the Django
+application.
+"""
+import asyncio
+import tempfile
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler, ASGIRequest
+from django.core.handlers.exception import response_for_exception
+from django.db import close_old_connections
+from rest_framework.exceptions import APIException
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+
+def database_sync_to_async(func, executor=None):
+    """
+    `sync_to_async` for functions using the ORM. Stale connections of the
+    worker thread are closed before and after the call, as Django does
+    around each request.
+
+    :param executor: `BoundedExecutor` to run ``func`` on instead of the
+        event loop's default executor
+    """
+    def inner(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    if executor is None:
+        return sync_to_async(inner)
+
+    async def run(*args, **kwargs):
+        return await executor.run_async(inner, *args, **kwargs)
+    return run
+
+
+async def send_response(response, send):
+    headers = [
+        (name.encode('latin1'), value.encode('latin1'))
+        for name, value in response.items()
+    ]
+    for cookie in response.cookies.values():
+        headers.append(
+            (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+        )
+    await send({
+        'type': 'http.response.start',
+        'status': response.status_code,
+        'headers': headers,
+    })
+    if response.streaming:
+        await send_streaming_body(response, send)
+    else:
+        await send({'type': 'http.response.body', 'body': response.content})
+
+
+async def send_streaming_body(response, send):
+    """
+    The content may query the database, e.g. an export iterating a
+    queryset, so it is consumed on a single worker thread, waiting for each
+    chunk to be sent.
+    """
+    loop = asyncio.get_event_loop()
+
+    def send_chunks():
+        try:
+            for chunk in response:
+                asyncio.run_coroutine_threadsafe(send({
+                    'type': 'http.response.body', 'body': chunk, 'more_body': True,
+                }), loop).result()
+        finally:
+            response.close()
+
+    await database_sync_to_async(send_chunks)()
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """
+    Django's ASGI handler, consuming streaming responses off the event loop
+    (see `send_streaming_body`): Django 3.0 iterates them on the loop, where
+    the ORM refuses to run.
+    """
+
+    async def send_response(self, response, send):
+        if response.streaming:
+            return await send_response(response, send)
+        return await super().send_response(response, send)
+
+
+class AsyncRouter:
+    """
+    ASGI application routing ``(method, path)`` pairs to async views and
+    every other request to ``application``.
+
+    Async views receive a DRF `Request` and return a `Response`, which is
+    rendered as JSON. They bypass every `MIDDLEWARE` entry: their responses
+    get no security, clickjacking or CORS headers, and no session. Only
+    anonymous, same-origin JSON requests are routed for that reason;
+    requests with an ``Authorization``, ``Cookie`` or ``Origin`` header go
+    through Django, so authentication, CSRF and CORS keep applying. Errors
+    other than `APIException` are answered by `response_for_exception`,
+    which logs them and sends ``got_request_exception`` as Django does.
+    """
+
+    def __init__(self, application):
+        self.application = application
+        self.routes = {}
+
+    def route(self, method, path, view):
+        self.routes[(method.upper(), path)] = view
+
+    async def __call__(self, scope, receive, send):
+        view = self.resolve(scope)
+        if view is not None:
+            return await self.handle(view, scope, receive, send)
+        return await self.application(scope, receive, send)
+
+    def resolve(self, scope):
+        if scope['type'] != 'http':
+            return None
+        view = self.routes.get((scope['method'], scope['path']))
+        if view is None:
+            return None
+        headers = dict(scope.get('headers') or ())
+        content_type = headers.get(b'content-type', b'').split(b';')[0].strip()
+        if (content_type != b'application/json' or b'authorization' in headers
+                or b'cookie' in headers or b'origin' in headers):
+            return None
+        return view
+
+    async def handle(self, view, scope, receive, send):
+        body_file = await self.read_body(receive)
+        if body_file is None:
+            return
+        request = Request(ASGIRequest(scope, body_file), parsers=[JSONParser()])
+        try:
+            response = await view(request)
+        except APIException as exc:
+            response = self.handle_exception(exc)
+        except Exception as exc:
+            response = response_for_exception(request._request, exc)
+        finally:
+            body_file.close()
+
+        if isinstance(response, Response):
+            response.accepted_renderer = JSONRenderer()
+            response.accepted_media_type = response.accepted_renderer.media_type
+            response.renderer_context = {'request': request}
+            response.render()
+        await send_response(response, send)
+
+    def handle_exception(self, exc):
+        # Same payload as rest_framework.views.exception_handler.
+        headers = {}
+        if getattr(exc, 'wait', None):
+            headers['Retry-After'] = '%d' % exc.wait
+        if isinstance(exc.detail, (list, dict)):
+            data = exc.detail
+        else:
+            data = {'detail': exc.detail}
+        return Response(data, status=exc.status_code, headers=headers)
+
+    async def read_body(self, receive):
+        body_file = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE, mode='w+b'
+        )
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body_file.close()
+                return None
+            body_file.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                break
+        body_file.seek(0)
+        return body_file
@@ -0,0 +1,231 @@
+"""
+Async counterparts of `apps.core.viewsets`.
+
+Opt-in, for endpoints spending their time waiting on I/O; the sync
+viewsets stay the default. On Django 3.1+ the views are coroutines,
+served natively. Django 3.0 can't serve a coroutine view, so there they
+are synchronous views running the same code on the request thread, behind
+the whole Django handler and its middleware.
+
+Django has no async ORM, so in the coroutine views every step touching
+the database (authentication, permissions, the action itself) runs on a
+bounded executor configured by the `ASYNC_VIEWSET_EXECUTOR` setting. Its
+size caps the database connections the views hold, and once it is
+saturated requests get a 503 instead of queueing without limit. The
+synchronous views run those steps on the calling thread instead, inside
+the caller's transaction. `run_sync` is the one place to switch to async
+ORM calls.
+"""
+import asyncio
+from functools import update_wrapper
+
+import django
+from django.conf import settings
+from django.utils.decorators import classonlymethod
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.mixins import (
+    CreateModelMixin,
+    DestroyModelMixin,
+    UpdateModelMixin,
+)
+
+from apps.core.asgi import database_sync_to_async
+from apps.core.mixins import ListModelMixin, RetrieveModelMixin
+from apps.core.utils.executors import BoundedExecutor, ExecutorSaturated
+from apps.core.viewsets import BaseViewSet
+
+
+class ServiceUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Too many requests in progress, try again shortly.')
+    default_code = 'service_unavailable'
+
+
+_executor = None
+
+
+def get_viewset_executor():
+    """
+    Returns the executor configured by the `ASYNC_VIEWSET_EXECUTOR` setting.
+    """
+    global _executor
+    if _executor is None:
+        config = getattr(settings, 'ASYNC_VIEWSET_EXECUTOR', {})
+        _executor = BoundedExecutor(
+            max_workers=config.get('MAX_WORKERS', 16),
+            max_queue=config.get('MAX_QUEUE', 256),
+            name='async-viewsets',
+        )
+    return _executor
+
+
+async def run_sync(func, *args, **kwargs):
+    """
+    Runs the synchronous ``func`` on the viewset executor.
+    """
+    try:
+        return await database_sync_to_async(func, get_viewset_executor())(
+            *args, **kwargs
+        )
+    except ExecutorSaturated:
+        raise ServiceUnavailable()
+
+
+def run_to_completion(coroutine):
+    """
+    Runs ``coroutine`` on the calling thread, without an event loop. It
+    must not suspend, i.e. only await `AsyncViewSetMixin.run_sync` of a
+    synchronous view.
+    """
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    coroutine.close()
+    raise RuntimeError(
+        'The async viewset awaited more than run_sync, it can only be '
+        'served by an ASGI server.'
+    )
+
+
+class AsyncViewSetMixin:
+    """
+    Makes `as_view` return a coroutine view dispatching through `adispatch`.
+    Handlers may be coroutines; synchronous ones, e.g. extra actions written
+    for the sync viewsets, run on the executor.
+
+    On Django 3.0 `as_view` returns a synchronous view instead.
+    """
+    # Set by `as_view` for the coroutine view; the synchronous one runs
+    # `adispatch` to completion, with `run_sync` calling straight through.
+    is_async = False
+
+    @classonlymethod
+    def as_view(cls, actions=None, **initkwargs):
+        if django.VERSION < (3, 1):
+            return super().as_view(actions, **initkwargs)
+
+        # The view built by ViewSetMixin returns what `dispatch` returns,
+        # here the `adispatch` coroutine.
+        view = super().as_view(actions, is_async=True, **initkwargs)
+
+        async def async_view(request, *args, **kwargs):
+            return await view(request, *args, **kwargs)
+
+        update_wrapper(async_view, view)
+        return async_view
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.is_async:
+            return self.adispatch(request, *args, **kwargs)
+        return run_to_completion(self.adispatch(request, *args, **kwargs))
+
+    async def adispatch(self, request, *args, **kwargs):
+        """
+        `APIView.dispatch` with the blocking steps awaited.
+        """
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.run_sync(self.initial, request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(),
+                                  self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            if asyncio.iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await self.run_sync(handler, request, *args, **kwargs)
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def run_sync(self, func, *args, **kwargs):
+        if not self.is_async:
+            return func(*args, **kwargs)
+        return await run_sync(func, *args, **kwargs)
+
+    async def aget_object(self):
+        return await self.run_sync(self.get_object)
+
+
+class AsyncListModelMixin(ListModelMixin):
+    async def list(self, request, *args, **kwargs):
+        return await self.run_sync(super().list, request, *args, **kwargs)
+
+
+class AsyncRetrieveModelMixin(RetrieveModelMixin):
+    async def retrieve(self, request, *args, **kwargs):
+        return await self.run_sync(super().retrieve, request, *args, **kwargs)
+
+
+class AsyncCreateModelMixin(CreateModelMixin):
+    async def create(self, request, *args, **kwargs):
+        return await self.run_sync(super().create, request, *args, **kwargs)
+
+
+class AsyncUpdateModelMixin(UpdateModelMixin):
+    async def update(self, request, *args, **kwargs):
+        return await self.run_sync(super().update, request, *args, **kwargs)
+
+    async def partial_update(self, request, *args, **kwargs):
+        kwargs['partial'] = True
+        return await self.update(request, *args, **kwargs)
+
+
+class AsyncDestroyModelMixin(DestroyModelMixin):
+    async def destroy(self, request, *args, **kwargs):
+        return await self.run_sync(super().destroy, request, *args, **kwargs)
+
+
+class AsyncBaseViewSet(AsyncViewSetMixin, BaseViewSet):
+    pass
+
+
+class AsyncListViewSet(AsyncListModelMixin, AsyncBaseViewSet):
+    pass
+
+
+class AsyncCreateViewSet(AsyncCreateModelMixin, AsyncBaseViewSet):
+    pass
+
+
+class AsyncRetrieveViewSet(AsyncRetrieveModelMixin, AsyncBaseViewSet):
+    pass
+
+
+class AsyncUpdateViewSet(AsyncUpdateModelMixin, AsyncBaseViewSet):
+    pass
+
+
+class AsyncDestroyViewSet(AsyncDestroyModelMixin, AsyncBaseViewSet):
+    pass
+
+
+class AsyncReadOnlyViewSet(AsyncListViewSet, AsyncRetrieveViewSet):
+    pass
+
+
+class AsyncCreateListUpdateDestroyViewSet(AsyncCreateViewSet, AsyncListViewSet,
+                                          AsyncUpdateViewSet, AsyncDestroyViewSet):
+    pass
+
+
+class AsyncCustomModelViewSet(AsyncCreateViewSet,
+                              AsyncListViewSet,
+                              AsyncRetrieveViewSet,
+                              AsyncUpdateViewSet,
+                              AsyncDestroyViewSet):
+    pass
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.checks import Warning
+
+from apps.core.utils.cache import is_process_local_cache
+
+
+def check_response_cache(app_configs, **kwargs):
+    """
+    Warns when `RESPONSE_CACHE` isn't shared by the workers: a write
+    through one of them only drops the cached responses of that one, the
+    others keep serving theirs until they expire.
+    """
+    config = getattr(settings, 'RESPONSE_CACHE', {})
+    if not is_process_local_cache(config.get('CACHE_ALIAS', 'default')):
+        return []
+    return [Warning(
+        'RESPONSE_CACHE keeps responses in the memory of each process.',
+        hint='With several workers, the others keep serving stale responses '
+             'for up to TIMEOUT seconds after a write. Use a CACHE_ALIAS '
+             'shared by the workers, e.g. memcached.',
+        id='core.W001',
+    )]
@@ -0,0 +1,187 @@
+"""
+Compiled read path for `DynamicFieldsModelSerializer`.
+
+A reader turns ``.values()`` rows straight into the dicts the serializer
+would render, without instantiating models or walking DRF fields for every
+instance. The row converter is generated as Python source once per field
+set and only re-bound to the per-request field converters.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import ISO_8601
+from rest_framework import fields as drf_fields
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.settings import api_settings
+
+# Serializer fields whose representation of an already typed database value
+# is the value itself.
+IDENTITY_FIELDS = {
+    drf_fields.CharField: str,
+    drf_fields.EmailField: str,
+    drf_fields.SlugField: str,
+    drf_fields.URLField: str,
+    drf_fields.IntegerField: int,
+    drf_fields.BooleanField: bool,
+    drf_fields.NullBooleanField: bool,
+}
+
+
+class CompiledReader:
+    """
+    :ivar columns: names to pass to ``.values()``
+    :ivar field_names: output keys, in the serializer's order
+    """
+
+    def __init__(self, field_names, columns, builders):
+        self.field_names = field_names
+        self.columns = columns
+        self.builders = builders
+        self.make_converter = self._generate()
+
+    def bind(self, serializer):
+        """
+        Returns a ``convert(row)`` function for the fields of ``serializer``.
+        """
+        fields = serializer.fields
+        converters = [
+            builder(fields[field_name]) if builder is not None else None
+            for field_name, builder in zip(self.field_names, self.builders)
+        ]
+        return self.make_converter(*[c for c in converters if c is not None])
+
+    def _generate(self):
+        args = []
+        items = []
+        for index, (field_name, column, builder) in enumerate(
+                zip(self.field_names, self.columns, self.builders)):
+            value = 'row[%r]' % column
+            if builder is not None:
+                converter = 'c%d' % index
+                args.append(converter)
+                # None is rendered as None without calling the field, like
+                # Serializer.to_representation does.
+                value = '(None if %s is None else %s(%s))' % (value, converter, value)
+            items.append('%r: %s' % (field_name, value))
+
+        source = (
+            'def make_converter(%s):\n'
+            '    def convert(row):\n'
+            '        return {%s}\n'
+            '    return convert\n'
+        ) % (', '.join(args), ', '.join(items))
+        namespace = {}
+        exec(compile(source, '<compiled reader>', 'exec'), namespace)
+        return namespace['make_converter']
+
+
+def compile_reader(serializer):
+    """
+    Compiles a reader for the readable fields of ``serializer`` or returns
+    None if one of them has no compiled equivalent.
+    """
+    opts = serializer.Meta.model._meta
+    field_names, columns, builders = [], [], []
+    for field in serializer._readable_fields:
+        if field.source == '*' or len(field.source_attrs) != 1:
+            return None
+        try:
+            model_field = opts.get_field(field.source_attrs[0])
+        except FieldDoesNotExist:
+            return None
+        if not model_field.concrete:
+            return None
+
+        builder = get_converter_builder(field, model_field)
+        if builder is False:
+            return None
+        field_names.append(field.field_name)
+        columns.append(model_field.attname)
+        builders.append(builder)
+    return CompiledReader(field_names, columns, builders)
+
+
+def get_converter_builder(field, model_field):
+    """
+    Returns None when the raw value is rendered as is, a callable building
+    the value converter from the bound serializer field, or False if the
+    field can't be compiled.
+    """
+    compiled = getattr(field, 'get_compiled_converter', None)
+    if compiled is not None:
+        return lambda bound_field: bound_field.get_compiled_converter(model_field)
+
+    if model_field.is_relation:
+        if (type(field) is PrimaryKeyRelatedField and field.pk_field is None
+                and model_field.many_to_one):
+            return None
+        return False
+
+    if isinstance(field, drf_fields.FileField):
+        return _build_file_converter(model_field)
+
+    if type(field) is drf_fields.DateTimeField:
+        return _build_datetime_converter
+
+    python_type = IDENTITY_FIELDS.get(type(field))
+    if python_type is not None and _db_type_matches(model_field, python_type):
+        return None
+    return lambda bound_field: bound_field.to_representation
+
+
+def _db_type_matches(model_field, python_type):
+    internal_type = model_field.get_internal_type()
+    if python_type is str:
+        return internal_type in ('CharField', 'TextField', 'EmailField', 'SlugField', 'URLField')
+    if python_type is int:
+        return internal_type in (
+            'AutoField', 'BigAutoField', 'SmallAutoField', 'IntegerField',
+            'BigIntegerField', 'SmallIntegerField', 'PositiveIntegerField',
+            'PositiveSmallIntegerField',
+        )
+    return internal_type in ('BooleanField', 'NullBooleanField')
+
+
+def _build_datetime_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+    # Resolved once per request instead of once per value.
+    field_timezone = getattr(field, 'timezone', field.default_timezone())
+    if field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        # Mirrors DateTimeField.to_representation for ISO 8601 output.
+        if not value:
+            return None
+        if isinstance(value, str):
+            return value
+        if value.utcoffset() is not None:
+            value = value.astimezone(field_timezone)
+        else:
+            value = field.enforce_timezone(value)
+        value = value.isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return convert
+
+
+def _build_file_converter(model_field):
+    storage = model_field.storage
+
+    def build(field):
+        use_url = getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL)
+        request = field.context.get('request', None)
+
+        def convert(name):
+            # Mirrors FileField.to_representation on a FieldFile.
+            if not name:
+                return None
+            if not use_url:
+                return name
+            url = storage.url(name)
+            if request is not None:
+                return request.build_absolute_uri(url)
+            return url
+        return convert
+    return build
@@ -0,0 +1,6 @@
+"""
+Database configuration from the environment (`apps.core.db.config`) and a
+PostgreSQL backend keeping connections in a process wide pool
+(``apps.core.db.backends.postgresql``, `apps.core.db.pool`), and the tuning
+of SQLite connections (`apps.core.db.sqlite`).
+"""
@@ -0,0 +1,89 @@
+"""
+PostgreSQL backend handing out connections from a process wide
+`ConnectionPool` instead of opening one per request.
+
+Select it with ``'ENGINE': 'apps.core.db.backends.postgresql'`` and tune
+the pool with a ``POOL`` dict in the database settings, see
+`apps.core.db.config`. Keep ``CONN_MAX_AGE`` at 0: Django then "closes"
+the connection at the end of each request, which returns it to the pool.
+"""
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base, creation
+from psycopg2 import extensions
+
+from apps.core.db.config import POOL_DEFAULTS
+from apps.core.db.pool import ConnectionPool, PoolTimeout, close_pools, get_pool
+from apps.core.profiling import timer
+
+Database = base.Database
+
+
+def reset_connection(connection):
+    # Whatever the last user left open is rolled back.
+    if connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+        connection.rollback()
+
+
+def is_usable(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    reset_connection(connection)
+    return True
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle pooled connections would keep the database from being dropped.
+        close_pools(self.connection.alias + ':')
+        return super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    pool = None
+
+    def get_pool(self, conn_params):
+        # Keyed by the parameters too, as test database setup connects to
+        # another database under the same alias.
+        key = (self.alias, repr(sorted(conn_params.items())))
+
+        def create():
+            options = {**POOL_DEFAULTS, **self.settings_dict.get('POOL', {})}
+            return ConnectionPool(
+                connect=lambda: super(DatabaseWrapper, self).get_new_connection(conn_params),
+                reset=reset_connection,
+                is_usable=is_usable if options['HEALTH_CHECK'] else None,
+                min_size=options['MIN_SIZE'],
+                max_size=options['MAX_SIZE'],
+                timeout=options['TIMEOUT'],
+                max_lifetime=options['MAX_LIFETIME'],
+                max_idle=options['MAX_IDLE'],
+                health_check_after=options['HEALTH_CHECK_AFTER'],
+                name='{}:{}'.format(self.alias, conn_params.get('database', '')),
+            )
+        return get_pool(key, create)
+
+    def get_new_connection(self, conn_params):
+        if self.alias == NO_DB_ALIAS:
+            # Maintenance connections, e.g. creating the test database, are
+            # dropped without being closed.
+            return super().get_new_connection(conn_params)
+        pool = self.get_pool(conn_params)
+        try:
+            with timer('pool'):
+                connection = pool.getconn()
+        except PoolTimeout as e:
+            # Surfaces as django.db.OperationalError.
+            raise Database.OperationalError(str(e)) from e
+        self.pool = pool
+        self.isolation_level = connection.isolation_level
+        return connection
+
+    def _close(self):
+        if self.pool is None:
+            return super()._close()
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.putconn(self.connection)
@@ -0,0 +1,278 @@
+"""
+Process wide pools of database connections, see
+``apps.core.db.backends.postgresql``.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from apps.core.utils.stats import RollingWindow
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection frees up within the pool's timeout."""
+
+
+class ConnectionPool:
+    """
+    Thread safe pool of at most `max_size` connections made by ``connect``.
+
+    Checkouts hand out the most recently returned connection, skipping
+    (and closing) the ones older than `max_lifetime` and the ones failing
+    ``is_usable``, which is only asked about connections idle for more than
+    `health_check_after` seconds. When every connection is in use they wait
+    up to `timeout` seconds for one to come back, then raise `PoolTimeout`.
+    Connections idle for more than `max_idle` seconds are closed as long as
+    more than `min_size` remain.
+
+    :param connect: callable opening a new connection
+    :param reset: callable cleaning a returned connection up, e.g. rolling
+        back an open transaction; if it raises, the connection is closed
+    :param is_usable: callable telling whether a connection still works,
+        or None to skip health checks
+    """
+
+    def __init__(self, connect, reset=None, is_usable=None, min_size=2,
+                 max_size=20, timeout=10.0, max_lifetime=1800.0, max_idle=300.0,
+                 health_check_after=1.0, name='pool'):
+        self.connect = connect
+        self.reset = reset
+        self.is_usable = is_usable
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.health_check_after = health_check_after
+        self.name = name
+        self.pid = os.getpid()
+        self.closed = False
+
+        self._cond = threading.Condition()
+        # (connection, returned at) of idle connections, oldest first.
+        self._idle = deque()
+        # Opening time of every open connection, idle or in use.
+        self._opened_at = {}
+        # Connections being opened count towards `max_size`.
+        self._opening = 0
+        self._waiting = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.recycled = 0
+        self.health_check_failures = 0
+        self.wait_time = RollingWindow()
+
+    @property
+    def size(self):
+        return len(self._opened_at) + self._opening
+
+    def getconn(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            connection, returned_at = self._acquire(deadline)
+            if connection is None:
+                connection = self._open()
+                break
+            if self._check(connection, returned_at):
+                break
+            self._discard(connection)
+        with self._cond:
+            self.checkouts += 1
+        self.wait_time.add(time.monotonic() - started)
+        return connection
+
+    def putconn(self, connection, discard=False):
+        if os.getpid() != self.pid:
+            # Inherited through a fork: closing it would end the parent's
+            # session too.
+            return
+        if not discard and self.reset is not None:
+            try:
+                self.reset(connection)
+            except Exception:
+                discard = True
+        now = time.monotonic()
+        with self._cond:
+            opened_at = self._opened_at.get(connection)
+            expired = opened_at is not None and now - opened_at > self.max_lifetime
+            if (discard or expired or self.closed or opened_at is None
+                    or getattr(connection, 'closed', False)):
+                self.recycled += expired
+                self._opened_at.pop(connection, None)
+                self._cond.notify()
+                stale = [connection]
+            else:
+                self._idle.append((connection, now))
+                self._cond.notify()
+                stale = self._pop_idle_expired(now)
+        for connection in stale:
+            self._close(connection)
+
+    def close(self):
+        """
+        Closes the idle connections; the ones in use are closed when they
+        are returned.
+        """
+        with self._cond:
+            self.closed = True
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+            for connection in idle:
+                self._opened_at.pop(connection, None)
+            self._cond.notify_all()
+        for connection in idle:
+            self._close(connection)
+
+    def stats(self):
+        with self._cond:
+            idle = len(self._idle)
+            size = self.size
+            stats = {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': size,
+                'idle': idle,
+                'in_use': size - idle,
+                'saturation': (size - idle) / self.max_size if self.max_size else None,
+                'waiting': self._waiting,
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'connects': self.connects,
+                'recycled': self.recycled,
+                'health_check_failures': self.health_check_failures,
+            }
+        stats['wait_ms'] = self.wait_time.summary(scale=1000)
+        return stats
+
+    def _acquire(self, deadline):
+        """
+        Returns an idle connection and the time it was returned, or
+        ``(None, None)`` once a slot for a new connection is reserved.
+        """
+        with self._cond:
+            while True:
+                if self.closed:
+                    raise PoolTimeout('The {} pool is closed'.format(self.name))
+                if self._idle:
+                    return self._idle.pop()
+                if self.size < self.max_size:
+                    self._opening += 1
+                    return None, None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(
+                        'No connection of the {} pool freed up within {} seconds; '
+                        'all {} are in use'.format(self.name, self.timeout, self.max_size)
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+    def _open(self):
+        try:
+            connection = self.connect()
+        except BaseException:
+            with self._cond:
+                self._opening -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._opening -= 1
+            self._opened_at[connection] = time.monotonic()
+            self.connects += 1
+        return connection
+
+    def _check(self, connection, returned_at):
+        now = time.monotonic()
+        if getattr(connection, 'closed', False):
+            return False
+        if now - self._opened_at.get(connection, now) > self.max_lifetime:
+            with self._cond:
+                self.recycled += 1
+            return False
+        if self.is_usable is None or now - returned_at <= self.health_check_after:
+            return True
+        try:
+            usable = self.is_usable(connection)
+        except Exception:
+            usable = False
+        if not usable:
+            with self._cond:
+                self.health_check_failures += 1
+        return usable
+
+    def _discard(self, connection):
+        with self._cond:
+            self._opened_at.pop(connection, None)
+            self._cond.notify()
+        self._close(connection)
+
+    def _pop_idle_expired(self, now):
+        # Called with the lock held.
+        expired = []
+        while (len(self._opened_at) > self.min_size and self._idle
+               and now - self._idle[0][1] > self.max_idle):
+            connection, _ = self._idle.popleft()
+            self._opened_at.pop(connection, None)
+            expired.append(connection)
+        return expired
+
+    def _close(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+_pools = {}
+# Pools created before a fork, kept referenced so that garbage collection
+# never closes the parent's connections.
+_inherited_pools = []
+_lock = threading.Lock()
+
+
+def get_pool(key, create):
+    """
+    Returns the pool of this process stored under ``key``, calling
+    ``create()`` to make it on first use.
+    """
+    pool = _pools.get(key)
+    if pool is None or pool.pid != os.getpid():
+        with _lock:
+            pool = _pools.get(key)
+            if pool is not None and pool.pid != os.getpid():
+                _inherited_pools.append(pool)
+                pool = None
+            if pool is None:
+                pool = _pools[key] = create()
+    return pool
+
+
+def close_pools(name_prefix=''):
+    """
+    Closes and forgets the pools whose name starts with ``name_prefix``.
+    """
+    with _lock:
+        pools = [
+            (key, pool) for key, pool in _pools.items()
+            if pool.name.startswith(name_prefix) and pool.pid == os.getpid()
+        ]
+        for key, pool in pools:
+            del _pools[key]
+    for key, pool in pools:
+        pool.close()
+
+
+def get_pool_stats():
+    """
+    Returns the `ConnectionPool.stats` of each pool of this process by name.
+    """
+    with _lock:
+        pools = [pool for pool in _pools.values() if pool.pid == os.getpid()]
+    return {pool.name: pool.stats() for pool in pools}
@@ -2,15 +2,23 @@ import base64
 import binascii
 import imghdr
 import io
+import os
+import tempfile
 import uuid
 
+from django import forms
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import UploadedFile
 from django.utils.translation import gettext_lazy as _
 from rest_framework.fields import (
+    Field,
     ImageField,
 )
 
+from apps.core.utils.cache import LRUCache
+from apps.core.validators import get_attachment_size_error
+
 # django.utils.six has been removed in Django 3.0
 try:
     from django.utils.six import string_types, text_type
@@ -19,6 +27,24 @@ except ImportError:
     text_type = str
 
 
+_base64_cache = None
+
+
+def get_base64_cache():
+    """
+    Returns the process wide cache of base64 encoded files, sized by the
+    `BASE64_REPRESENTATION_CACHE` setting.
+    """
+    global _base64_cache
+    if _base64_cache is None:
+        config = getattr(settings, 'BASE64_REPRESENTATION_CACHE', {})
+        _base64_cache = LRUCache(
+            max_items=config.get('MAX_ITEMS'),
+            max_bytes=config.get('MAX_BYTES', 32 * 1024 * 1024),
+        )
+    return _base64_cache
+
+
 class Base64FieldMixin(object):
     @property
     def ALLOWED_TYPES(self):
@@ -34,37 +60,102 @@ class Base64FieldMixin(object):
 
     EMPTY_VALUES = (None, '', [], (), {})
 
+    # Base64 characters decoded per step. Must be a multiple of 4.
+    DECODE_CHUNK_SIZE = 64 * 1024
+    # Leading decoded bytes passed to `get_file_extension` to sniff the type.
+    HEADER_SIZE = 64 * 1024
+
     def __init__(self, *args, **kwargs):
         self.represent_in_base64 = kwargs.pop('represent_in_base64', False)
+        self.max_upload_size = kwargs.pop('max_upload_size', None)
         super(Base64FieldMixin, self).__init__(*args, **kwargs)
 
+    def get_max_upload_size(self):
+        if self.max_upload_size is not None:
+            return self.max_upload_size
+        return settings.ATTACHMENT_MAX_UPLOAD_SIZE
+
     def to_internal_value(self, base64_data):
+        """
+        Decodes the payload chunk by chunk into a spooled temporary file.
+
+        The type is detected from the leading bytes only and the upload is
+        rejected as soon as the decoded size passes `get_max_upload_size`, so
+        an oversized body is never decoded in full.
+        """
         # Check if this is a base64 string
         if base64_data in self.EMPTY_VALUES:
             return None
 
         if isinstance(base64_data, string_types):
-            # Strip base64 header.
-            if ';base64,' in base64_data:
-                header, base64_data = base64_data.split(';base64,')
+            # Skip base64 header without copying the payload.
+            start = base64_data.find(';base64,')
+            start = start + len(';base64,') if start != -1 else 0
 
-            # Try to decode the file. Return validation error if it fails.
+            max_size = self.get_max_upload_size()
+            spooled_file = tempfile.SpooledTemporaryFile(
+                max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+            )
             try:
-                decoded_file = base64.b64decode(base64_data)
-            except (TypeError, binascii.Error, ValueError):
-                raise ValidationError(self.INVALID_FILE_MESSAGE)
-            # Generate file name:
-            file_name = self.get_file_name(decoded_file)
-            # Get the file name extension:
-            file_extension = self.get_file_extension(file_name, decoded_file)
-            if file_extension not in self.ALLOWED_TYPES:
-                raise ValidationError(self.INVALID_TYPE_MESSAGE)
-            complete_file_name = file_name + "." + file_extension
-            data = ContentFile(decoded_file, name=complete_file_name)
+                size = 0
+                header = b''
+                complete_file_name = None
+                # Try to decode the file. Return validation error if it fails.
+                try:
+                    for chunk in self._iter_decoded_chunks(base64_data, start):
+                        size += len(chunk)
+                        if max_size and size > max_size:
+                            raise ValidationError(
+                                get_attachment_size_error(max_size)
+                            )
+                        spooled_file.write(chunk)
+                        if complete_file_name is None:
+                            header += chunk[:self.HEADER_SIZE - len(header)]
+                            if len(header) >= self.HEADER_SIZE:
+                                complete_file_name = self.get_complete_file_name(header)
+                except (TypeError, binascii.Error, ValueError):
+                    raise ValidationError(self.INVALID_FILE_MESSAGE)
+
+                if complete_file_name is None:
+                    complete_file_name = self.get_complete_file_name(header)
+            except BaseException:
+                spooled_file.close()
+                raise
+
+            spooled_file.seek(0)
+            data = UploadedFile(
+                spooled_file, name=complete_file_name, size=size
+            )
             return super(Base64FieldMixin, self).to_internal_value(data)
         raise ValidationError(_('Invalid type. This is not an base64 string: {}'.format(
             type(base64_data))))
 
+    def _iter_decoded_chunks(self, base64_data, start=0):
+        """
+        Yields decoded bytes for ``base64_data[start:]``, ignoring whitespace
+        such as MIME line breaks.
+        """
+        remainder = ''
+        for offset in range(start, len(base64_data), self.DECODE_CHUNK_SIZE):
+            chunk = remainder + ''.join(
+                base64_data[offset:offset + self.DECODE_CHUNK_SIZE].split()
+            )
+            usable = len(chunk) - len(chunk) % 4
+            remainder = chunk[usable:]
+            if usable:
+                yield base64.b64decode(chunk[:usable], validate=True)
+        if remainder:
+            raise binascii.Error('Incorrect padding')
+
+    def get_complete_file_name(self, header):
+        # Generate file name:
+        file_name = self.get_file_name(header)
+        # Get the file name extension:
+        file_extension = self.get_file_extension(file_name, header)
+        if file_extension not in self.ALLOWED_TYPES:
+            raise ValidationError(self.INVALID_TYPE_MESSAGE)
+        return file_name + "." + file_extension
+
     def get_file_extension(self, filename, decoded_file):
         raise NotImplementedError
 
@@ -81,13 +172,70 @@ class Base64FieldMixin(object):
                 return ''
 
             try:
-                with open(file.path, 'rb') as f:
-                    return base64.b64encode(f.read()).decode()
+                return self.get_base64_representation(file.path)
             except Exception:
                 raise IOError("Error encoding file")
         else:
             return super(Base64FieldMixin, self).to_representation(file)
 
+    def get_base64_representation(self, path):
+        """
+        Returns the base64 encoded content of ``path``.
+
+        Files up to `MAX_ITEM_BYTES` of the `BASE64_REPRESENTATION_CACHE`
+        setting are served from a cache keyed by path, size and mtime, so an
+        unchanged file is encoded only once. Larger ones are encoded on every
+        call rather than evicting the rest of the cache; the renderer needs
+        the whole string either way.
+        """
+        stat = os.stat(path)
+        max_item_bytes = getattr(
+            settings, 'BASE64_REPRESENTATION_CACHE', {}
+        ).get('MAX_ITEM_BYTES', 1024 * 1024)
+        if stat.st_size > max_item_bytes:
+            return self.encode_base64(path)
+
+        cache = get_base64_cache()
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        encoded = cache.get(key)
+        if encoded is None:
+            encoded = self.encode_base64(path)
+            cache.set(key, encoded)
+        return encoded
+
+    def encode_base64(self, path):
+        with open(path, 'rb') as f:
+            return base64.b64encode(f.read()).decode()
+
+
+class SpooledImageField(forms.ImageField):
+    """
+    `forms.ImageField` checking the image on the uploaded file itself, where
+    Django reads uploads without a temporary file path into memory again.
+    """
+
+    def to_python(self, data):
+        if hasattr(data, 'temporary_file_path'):
+            return super().to_python(data)
+        f = forms.FileField.to_python(self, data)
+        if f is None:
+            return None
+
+        from PIL import Image
+
+        try:
+            image = Image.open(data)
+            # verify() must be called immediately after the constructor.
+            image.verify()
+            f.image = image
+            f.content_type = Image.MIME.get(image.format)
+        except Exception as exc:
+            raise ValidationError(
+                self.error_messages['invalid_image'], code='invalid_image',
+            ) from exc
+        f.seek(0)
+        return f
+
 
 class Base64ImageField(Base64FieldMixin, ImageField):
     """
@@ -103,6 +251,11 @@ class Base64ImageField(Base64FieldMixin, ImageField):
     INVALID_FILE_MESSAGE = _("Please upload a valid image.")
     INVALID_TYPE_MESSAGE = _("The type of the image couldn't be determined.")
 
+    def __init__(self, *args, **kwargs):
+        # Validates the spooled upload without copying it into memory.
+        kwargs.setdefault('_DjangoImageField', SpooledImageField)
+        super().__init__(*args, **kwargs)
+
     def get_file_extension(self, filename, decoded_file):
         try:
             from PIL import Image
@@ -122,3 +275,44 @@ class Base64ImageField(Base64FieldMixin, ImageField):
 
         extension = "jpg" if extension == "jpeg" else extension
         return extension
+
+
+class ImageVariantsField(Field):
+    """
+    Read only representation of an `apps.core.images.ImageVariantsField` as
+    ``{size: url}``, a size mapping to None until its variant is generated.
+    No image gives None.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_model_field(self):
+        return self.parent.Meta.model._meta.get_field(self.source_attrs[0])
+
+    def get_url_builder(self, model_field):
+        storage = model_field.get_source_field().storage
+        sizes = [str(size) for size in model_field.get_sizes()]
+        request = self.context.get('request', None)
+
+        def build(value):
+            if not value.get('source'):
+                return None
+            variants = value.get('variants', {})
+            urls = {}
+            for size in sizes:
+                name = variants.get(size)
+                url = storage.url(name) if name else None
+                if url is not None and request is not None:
+                    url = request.build_absolute_uri(url)
+                urls[size] = url
+            return urls
+        return build
+
+    def to_representation(self, value):
+        model_field = self.get_model_field()
+        return self.get_url_builder(model_field)(model_field.to_python(value))
+
+    def get_compiled_converter(self, model_field):
+        return self.get_url_builder(model_field)
@@ -0,0 +1,289 @@
+"""
+Resized, re-encoded variants of uploaded images.
+
+An `ImageVariantsField` next to an ``ImageField`` records the variants
+generated for the file currently stored in it. Once a save that changes
+the image commits, the variants are rendered in a process pool (Pillow is
+CPU bound and holds the GIL) and written through the image's storage next
+to the original, e.g. ``uploads/user/<uuid>_256.webp``. Until then, and
+whenever the pool is saturated, the field has no variants and clients fall
+back to the original; ``manage.py generate_image_variants`` fills in the
+missing ones.
+
+Sizes, format and pool sizes come from the `IMAGE_VARIANTS` setting.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, models, transaction
+from django.db.models.signals import post_save
+from django.utils import timezone
+
+from apps.core.response_cache import invalidate_responses
+from apps.core.utils.executors import BoundedExecutor, ExecutorSaturated
+from apps.core.utils.imaging import render_variants
+
+logger = logging.getLogger(__name__)
+
+FORMAT_EXTENSIONS = {
+    'WEBP': 'webp',
+    'JPEG': 'jpg',
+    'PNG': 'png',
+}
+
+
+def get_image_variants_config():
+    return getattr(settings, 'IMAGE_VARIANTS', {})
+
+
+_process_pool = None
+_executor = None
+_lock = threading.Lock()
+
+
+def get_image_process_pool():
+    """
+    Returns the process pool rendering the variants, sized by the
+    `IMAGE_VARIANTS` setting. Workers are spawned rather than forked, so
+    they don't inherit the server's threads or database connections.
+    """
+    global _process_pool
+    with _lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=get_image_variants_config().get('PROCESSES', 2),
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+    return _process_pool
+
+
+def reset_image_process_pool(pool):
+    global _process_pool
+    with _lock:
+        if _process_pool is pool:
+            _process_pool = None
+    pool.shutdown(wait=False)
+
+
+def get_image_variants_executor():
+    """
+    Returns the threads feeding the process pool: they read the originals,
+    store the variants and update the rows.
+    """
+    global _executor
+    with _lock:
+        if _executor is None:
+            config = get_image_variants_config()
+            _executor = BoundedExecutor(
+                max_workers=config.get('PROCESSES', 2),
+                max_queue=config.get('MAX_QUEUE', 64),
+                name='image-variants',
+            )
+    return _executor
+
+
+class ImageVariantsField(models.TextField):
+    """
+    JSON ``{"source": name, "variants": {size: name}}`` of the variants of
+    the image stored in the ``source`` field.
+
+    :param source: name of the ``ImageField`` the variants are made from
+    :param sizes: bounding square sizes, `IMAGE_VARIANTS` ``SIZES`` if None
+    """
+
+    def __init__(self, source=None, sizes=None, *args, **kwargs):
+        self.source = source
+        self.sizes = sizes
+        kwargs.setdefault('blank', True)
+        kwargs.setdefault('editable', False)
+        kwargs.setdefault('default', dict)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['source'] = self.source
+        if self.sizes is not None:
+            kwargs['sizes'] = self.sizes
+        for option, value in (('blank', True), ('editable', False), ('default', dict)):
+            if kwargs.get(option) is value:
+                del kwargs[option]
+        return name, path, args, kwargs
+
+    def contribute_to_class(self, cls, name, **kwargs):
+        super().contribute_to_class(cls, name, **kwargs)
+        if not cls._meta.abstract:
+            post_save.connect(self.schedule_variants, sender=cls, weak=False)
+
+    def get_sizes(self):
+        if self.sizes is not None:
+            return tuple(self.sizes)
+        return tuple(get_image_variants_config().get('SIZES', (64, 256, 1024)))
+
+    def get_format(self):
+        return get_image_variants_config().get('FORMAT', 'WEBP')
+
+    def get_source_field(self):
+        return self.model._meta.get_field(self.source)
+
+    def to_python(self, value):
+        if isinstance(value, dict):
+            return value
+        if not value:
+            return {}
+        return json.loads(value)
+
+    def from_db_value(self, value, expression, connection):
+        return self.to_python(value)
+
+    def get_prep_value(self, value):
+        return json.dumps(self.to_python(value), sort_keys=True)
+
+    def value_to_string(self, obj):
+        return self.get_prep_value(self.value_from_object(obj))
+
+    def get_pending_value(self, source_name):
+        return {'source': source_name, 'variants': {}} if source_name else {}
+
+    def pre_save(self, model_instance, add):
+        if self.source in model_instance.get_deferred_fields():
+            return getattr(model_instance, self.attname)
+        # Variants of a replaced or cleared image are dropped.
+        source_name = getattr(model_instance, self.source).name or ''
+        value = self.to_python(getattr(model_instance, self.attname))
+        if value.get('source', '') != source_name:
+            value = self.get_pending_value(source_name)
+            setattr(model_instance, self.attname, value)
+        return value
+
+    def schedule_variants(self, sender, instance, raw=False, using='default', **kwargs):
+        """
+        Connected to ``post_save``; queues the generation of missing
+        variants for when the transaction commits.
+        """
+        if raw or {self.source, self.attname} & instance.get_deferred_fields():
+            return
+        source_name = getattr(instance, self.source).name or ''
+        value = self.to_python(getattr(instance, self.attname))
+        if value.get('source', '') != source_name:
+            # Saved with ``update_fields`` leaving this field out; models
+            # add it along with the source instead, as `User.save` does.
+            value = self.get_pending_value(source_name)
+            setattr(instance, self.attname, value)
+            sender._default_manager.using(using).filter(pk=instance.pk).update(
+                **{self.attname: value}
+            )
+            mark_saved = getattr(instance, 'mark_saved', None)
+            if mark_saved is not None:
+                mark_saved([self.attname])
+        if source_name and not value.get('variants'):
+            pk = instance.pk
+            transaction.on_commit(
+                lambda: submit_variants(self, pk, source_name, using), using=using
+            )
+
+
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def submit_variants(field, pk, source_name, using='default'):
+    """
+    Queues the generation of the variants of ``source_name``, unless it is
+    already queued. Returns the future, or None.
+    """
+    key = (field.model._meta.label, field.name, pk, source_name)
+    with _pending_lock:
+        if key in _pending:
+            return None
+        _pending.add(key)
+
+    def done(future):
+        with _pending_lock:
+            _pending.discard(key)
+
+    try:
+        future = get_image_variants_executor().submit(
+            run_generate_variants, field.model._meta.label, field.name, pk,
+            source_name, using,
+        )
+    except ExecutorSaturated:
+        done(None)
+        logger.warning('Skipped the variants of %s: %s', source_name,
+                       'the image pipeline is saturated')
+        return None
+    future.add_done_callback(done)
+    return future
+
+
+def run_generate_variants(*args):
+    # Executor threads outlive requests, so their connections are managed
+    # like a request's.
+    close_old_connections()
+    try:
+        return generate_variants(*args)
+    except Exception:
+        logger.exception('Generating the variants of %s failed', args[3])
+        raise
+    finally:
+        close_old_connections()
+
+
+def generate_variants(model_label, field_name, pk, source_name, using='default'):
+    """
+    Renders and stores the variants of ``source_name`` and records them on
+    the row ``pk``, if it still holds that image. Returns the stored names.
+    """
+    model = apps.get_model(model_label)
+    field = model._meta.get_field(field_name)
+    source_field = field.get_source_field()
+    storage = source_field.storage
+    with storage.open(source_name, 'rb') as source:
+        data = source.read()
+    image_format = field.get_format()
+    pool = get_image_process_pool()
+    try:
+        rendered = pool.submit(
+            render_variants, data, field.get_sizes(), image_format,
+            get_image_variants_config().get('QUALITY', 80),
+        ).result()
+    except BrokenProcessPool:
+        # A worker died, e.g. killed for memory; the next image gets a new pool.
+        reset_image_process_pool(pool)
+        raise
+
+    root = os.path.splitext(source_name)[0]
+    extension = FORMAT_EXTENSIONS.get(image_format, image_format.lower())
+    variants = {}
+    for size, content in rendered.items():
+        name = '{}_{}.{}'.format(root, size, extension)
+        # Regenerated variants replace the previous files.
+        storage.delete(name)
+        variants[str(size)] = storage.save(name, ContentFile(content))
+
+    values = {field.attname: {'source': source_name, 'variants': variants}}
+    # Moves the conditional request validators of the row forward.
+    values.update(
+        (model_field.attname, timezone.now())
+        for model_field in model._meta.concrete_fields
+        if getattr(model_field, 'auto_now', False)
+    )
+    with transaction.atomic(using=using):
+        updated = model._default_manager.using(using).filter(
+            pk=pk, **{source_field.attname: source_name}
+        ).update(**values)
+        if updated:
+            invalidate_responses([model], using=using)
+    if not updated:
+        # The image was replaced meanwhile.
+        for name in variants.values():
+            storage.delete(name)
+        return {}
+    return variants
@@ -0,0 +1,51 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from apps.core.images import ImageVariantsField, generate_variants
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates the missing variants of the images behind every '
+        'ImageVariantsField, e.g. of uploads made before the field existed '
+        'or skipped while the image pipeline was saturated.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='regenerate existing variants too, e.g. after '
+                                 'changing the IMAGE_VARIANTS setting')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        generated = failed = 0
+        for field in self.get_variants_fields():
+            model = field.model
+            source_field = field.get_source_field()
+            rows = model._default_manager.using(using).exclude(
+                **{source_field.attname: ''}
+            ).values_list('pk', source_field.attname, field.attname)
+            for pk, source_name, value in rows.iterator():
+                if not options['all'] and value.get('source') == source_name \
+                        and value.get('variants'):
+                    continue
+                try:
+                    generate_variants(model._meta.label, field.name, pk,
+                                      source_name, using)
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write('{} {}: {}'.format(model._meta.label, pk, e))
+                else:
+                    generated += 1
+        self.stdout.write('Generated the variants of {} images, {} failed.'.format(
+            generated, failed
+        ))
+
+    def get_variants_fields(self):
+        return [
+            field
+            for model in apps.get_models()
+            for field in model._meta.concrete_fields
+            if isinstance(field, ImageVariantsField)
+        ]
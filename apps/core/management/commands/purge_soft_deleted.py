@@ -0,0 +1,109 @@
+import gzip
+import json
+import time
+from datetime import timedelta
+
+from django.apps import apps
+from django.core import serializers
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import ProtectedError
+from django.utils import timezone
+
+from apps.core.models import SoftDeleteModel
+
+
+class Command(BaseCommand):
+    help = (
+        'Deletes the rows of SoftDeleteModel subclasses soft deleted more than '
+        '--days days ago, optionally archiving them first. Rows go in batches '
+        'of --batch-size, each in its own short transaction, so locks are '
+        'held briefly and the job can run next to live traffic.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30,
+                            help='keep rows soft deleted more recently')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--sleep', type=float, default=0.1,
+                            help='seconds to pause between batches')
+        parser.add_argument('--archive',
+                            help='NDJSON file the rows are appended to before '
+                                 'being deleted, gzipped if it ends with .gz')
+        parser.add_argument('--model', action='append', dest='models',
+                            help='app_label.ModelName to purge, all by default')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='only count the rows that would be purged')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive.')
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        archive = None
+        if options['archive'] and not options['dry_run']:
+            opener = gzip.open if options['archive'].endswith('.gz') else open
+            archive = opener(options['archive'], 'at', encoding='utf-8')
+        try:
+            for model in self.get_models(options['models']):
+                queryset = model._base_manager.using(options['database']).filter(
+                    deleted_at__lt=cutoff
+                )
+                if options['dry_run']:
+                    self.stdout.write('{}: {} rows to purge'.format(
+                        model._meta.label, queryset.count()
+                    ))
+                    continue
+                purged = self.purge(queryset, archive, options)
+                self.stdout.write('{}: {} rows purged'.format(model._meta.label, purged))
+        finally:
+            if archive is not None:
+                archive.close()
+
+    def get_models(self, labels):
+        if labels:
+            try:
+                models = [apps.get_model(label) for label in labels]
+            except (LookupError, ValueError) as e:
+                raise CommandError(e)
+            for model in models:
+                if not issubclass(model, SoftDeleteModel):
+                    raise CommandError('{} is not a SoftDeleteModel.'.format(
+                        model._meta.label
+                    ))
+            return models
+        return [model for model in apps.get_models() if issubclass(model, SoftDeleteModel)]
+
+    def purge(self, queryset, archive, options):
+        using = options['database']
+        purged = 0
+        last_pk = None
+        while True:
+            batch = queryset.order_by('pk')
+            if last_pk is not None:
+                batch = batch.filter(pk__gt=last_pk)
+            pks = list(batch.values_list('pk', flat=True)[:options['batch_size']])
+            if not pks:
+                return purged
+            last_pk = pks[-1]
+            try:
+                with transaction.atomic(using=using):
+                    # Locked, on PostgreSQL, against a concurrent restore.
+                    rows = list(queryset.filter(pk__in=pks).select_for_update())
+                    if archive is not None:
+                        self.archive(archive, rows)
+                    queryset.filter(pk__in=[row.pk for row in rows]).delete()
+            except ProtectedError as e:
+                self.stderr.write('Skipped {} rows: {}'.format(len(pks), e.args[0]))
+            else:
+                purged += len(rows)
+            if len(pks) < options['batch_size']:
+                return purged
+            time.sleep(options['sleep'])
+
+    def archive(self, archive, rows):
+        for row in serializers.serialize('python', rows):
+            archive.write(json.dumps(row, cls=DjangoJSONEncoder))
+            archive.write('\n')
+        archive.flush()
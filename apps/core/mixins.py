@@ -0,0 +1,470 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse
+from django.utils.translation import gettext_lazy as _
+from rest_framework import mixins, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from apps.core.renderers import CSVRenderer, NDJSONRenderer
+from apps.core.response_cache import invalidate_responses
+
+
+def cache_response(view, get_response):
+    """
+    Returns ``get_response()`` through the view's response cache, if any.
+    """
+    cache_response = getattr(view, 'cache_response', None)
+    if cache_response is None:
+        return get_response()
+    return cache_response(get_response)
+
+
+def get_validators(view, name, *args):
+    """
+    Calls the view's ``name`` validators hook (see `BaseViewSet`), if any.
+    """
+    get_validators = getattr(view, name, None)
+    if get_validators is None:
+        return None, None
+    return get_validators(*args)
+
+
+class ListModelMixin(mixins.ListModelMixin):
+    """
+    List a queryset.
+
+    Serializers with a compiled reader (see
+    `DynamicFieldsModelSerializer.compiled_read`) are rendered from
+    ``.values()`` rows without instantiating models.
+
+    Conditional requests matching the view's list validators are answered
+    with a 304 before the page is fetched.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return cache_response(self, self.get_list_response)
+
+    def get_list_response(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        validators = get_validators(self, 'get_list_validators', queryset)
+        if any(validators):
+            not_modified = self.get_not_modified_response(*validators)
+            if not_modified is not None:
+                return not_modified
+
+        response = self.list_queryset(queryset)
+        if any(validators):
+            self.set_validator_headers(response, *validators)
+        return response
+
+    def list_queryset(self, queryset):
+        serializer = self.get_serializer()
+        get_compiled_reader = getattr(serializer, 'get_compiled_reader', None)
+        reader = get_compiled_reader() if get_compiled_reader else None
+        if reader is None:
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
+            return Response(self.get_serializer(queryset, many=True).data)
+
+        # Annotations such as a search rank stay available to the paginator.
+        queryset = queryset.values(
+            *reader.columns, *queryset.query.annotation_select
+        )
+        convert = reader.bind(serializer)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response([convert(row) for row in page])
+
+        return Response([convert(row) for row in queryset])
+
+
+class RetrieveModelMixin(mixins.RetrieveModelMixin):
+    """
+    Retrieve a model instance, answering conditional requests matching the
+    view's object validators with a 304 before serializing it.
+    """
+
+    def retrieve(self, request, *args, **kwargs):
+        return cache_response(self, self.get_retrieve_response)
+
+    def get_retrieve_response(self):
+        instance = self.get_object()
+        validators = get_validators(self, 'get_object_validators', instance)
+        if any(validators):
+            not_modified = self.get_not_modified_response(*validators)
+            if not_modified is not None:
+                return not_modified
+
+        response = Response(self.get_serializer(instance).data)
+        if any(validators):
+            self.set_validator_headers(response, *validators)
+        return response
+
+
+class ExportModelMixin:
+    """
+    Streams every row of the filtered queryset (``GET <list url>/export/``)
+    as CSV or NDJSON, picked with ``?format=csv|ndjson`` or the ``Accept``
+    header, CSV by default.
+
+    Rows go through the same filters, search and ``?fields=`` / ``?omit=``
+    selection as the list, unpaginated. They are fetched with
+    ``.iterator()`` `export_chunk_size` at a time (through a server-side
+    cursor on PostgreSQL) and rendered as they are sent, through the
+    serializer's compiled reader when it has one, so memory use doesn't
+    grow with the row count.
+    """
+    export_chunk_size = 2000
+
+    @action(detail=False, methods=['get'], url_path='export', url_name='export',
+            renderer_classes=[CSVRenderer, NDJSONRenderer])
+    def export(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer()
+        field_names = [field.field_name for field in serializer._readable_fields]
+        renderer = request.accepted_renderer
+        rows = self.iter_export_rows(queryset, serializer)
+        response = StreamingHttpResponse(
+            renderer.iter_render(rows, field_names),
+            content_type='{}; charset={}'.format(renderer.media_type, renderer.charset),
+        )
+        response['Content-Disposition'] = 'attachment; filename="{}.{}"'.format(
+            self.get_export_filename(), renderer.format
+        )
+        return response
+
+    def iter_export_rows(self, queryset, serializer):
+        """
+        Yields the representation of each row of ``queryset``. Nothing is
+        queried before the first row is asked for.
+        """
+        get_compiled_reader = getattr(serializer, 'get_compiled_reader', None)
+        reader = get_compiled_reader() if get_compiled_reader else None
+        if reader is None:
+            for instance in queryset.iterator(chunk_size=self.export_chunk_size):
+                yield serializer.to_representation(instance)
+            return
+
+        convert = reader.bind(serializer)
+        rows = queryset.values(*reader.columns, *queryset.query.annotation_select)
+        for row in rows.iterator(chunk_size=self.export_chunk_size):
+            yield convert(row)
+
+    def get_export_filename(self):
+        return str(self.get_queryset().model._meta.verbose_name_plural).replace(' ', '-')
+
+
+class BulkModelMixin:
+    """
+    Bulk create (``POST <list url>/bulk/``) and bulk partial update
+    (``PATCH <list url>/bulk/``, every item carrying its ``id``) from a
+    list payload.
+
+    Items are validated one by one and then as a whole through the
+    serializer's `validate_bulk`, and written with ``bulk_create`` /
+    ``bulk_update`` in chunks of ``?chunk_size=`` items (`bulk_chunk_size`
+    by default). ``?transaction=batch`` writes everything or nothing;
+    ``?transaction=chunk`` commits chunk by chunk, so valid items are saved
+    even when others fail.
+
+    The response lists the saved items in payload order under ``results``
+    and the failing ones under ``errors`` as ``{"index": ..., "errors":
+    ...}``. The status is 201 (create) or 200 (update) when every item was
+    saved, 207 when only some were and 400 when none were.
+    """
+    bulk_chunk_size = 500
+    bulk_max_chunk_size = 5000
+    bulk_max_items = 50000
+    bulk_lookup_field = 'id'
+    bulk_transaction = 'batch'
+    bulk_transaction_modes = ('batch', 'chunk')
+    bulk_actions = ('bulk_create', 'bulk_update')
+
+    bulk_error_messages = {
+        'not_a_list': _('Expected a list of items but got type "{input_type}".'),
+        'max_items': _('Ensure this list has no more than {max_items} items.'),
+        'transaction': _('"{value}" is not a valid choice, use one of {choices}.'),
+        'chunk_size': _('Expected an integer between 1 and {max_chunk_size}.'),
+        'lookup_required': _('This field is required.'),
+        'not_found': _('Not found.'),
+        'duplicate': _('This item is already updated by another one in the list.'),
+        'conflict': _('This item conflicts with existing data.'),
+        'rolled_back': _('Not saved, another item of the batch failed.'),
+    }
+
+    @action(detail=False, methods=['post'], url_path='bulk', url_name='bulk')
+    def bulk_create(self, request, *args, **kwargs):
+        items = self.get_bulk_items(request)
+        return self.perform_bulk(items, [None] * len(items), {})
+
+    @bulk_create.mapping.patch
+    def bulk_update(self, request, *args, **kwargs):
+        items = self.get_bulk_items(request)
+        instances, errors = self.get_bulk_objects(items)
+        return self.perform_bulk(items, instances, errors)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in self.bulk_actions:
+            context['bulk'] = True
+        return context
+
+    def get_bulk_items(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError({'non_field_errors': [
+                self.bulk_error_messages['not_a_list'].format(
+                    input_type=type(items).__name__
+                )
+            ]})
+        if len(items) > self.bulk_max_items:
+            raise ValidationError({'non_field_errors': [
+                self.bulk_error_messages['max_items'].format(
+                    max_items=self.bulk_max_items
+                )
+            ]})
+        return items
+
+    def get_bulk_transaction(self):
+        value = self.request.query_params.get('transaction', self.bulk_transaction)
+        if value not in self.bulk_transaction_modes:
+            raise ValidationError({'transaction': [
+                self.bulk_error_messages['transaction'].format(
+                    value=value, choices=', '.join(self.bulk_transaction_modes)
+                )
+            ]})
+        return value
+
+    def get_bulk_chunk_size(self):
+        value = self.request.query_params.get('chunk_size')
+        if value is None:
+            return self.bulk_chunk_size
+        try:
+            chunk_size = int(value)
+        except ValueError:
+            chunk_size = 0
+        if not 1 <= chunk_size <= self.bulk_max_chunk_size:
+            raise ValidationError({'chunk_size': [
+                self.bulk_error_messages['chunk_size'].format(
+                    max_chunk_size=self.bulk_max_chunk_size
+                )
+            ]})
+        return chunk_size
+
+    def get_bulk_objects(self, items):
+        """
+        Fetches the instances the items of a bulk update refer to in one
+        query, honouring the view's queryset and filters.
+
+        :return: the instances, None for unresolved items, and
+            ``{index: errors}`` of those items
+        """
+        pk_field = self.get_queryset().model._meta.pk
+        lookup_field = self.bulk_lookup_field
+        errors = {}
+        pks = {}
+        seen = set()
+        for index, item in enumerate(items):
+            value = item.get(lookup_field) if isinstance(item, dict) else None
+            try:
+                if value is None:
+                    raise DjangoValidationError(
+                        self.bulk_error_messages['lookup_required']
+                    )
+                pk = pk_field.to_python(value)
+            except DjangoValidationError as exc:
+                errors[index] = {lookup_field: list(exc.messages)}
+                continue
+            if pk in seen:
+                errors[index] = {lookup_field: [self.bulk_error_messages['duplicate']]}
+                continue
+            seen.add(pk)
+            pks[index] = pk
+
+        objects = self.filter_queryset(self.get_queryset()).in_bulk(seen)
+        instances = []
+        for index in range(len(items)):
+            instance = objects.get(pks[index]) if index in pks else None
+            if instance is None and index not in errors:
+                errors[index] = {lookup_field: [self.bulk_error_messages['not_found']]}
+            if instance is not None:
+                self.check_object_permissions(self.request, instance)
+            instances.append(instance)
+        return instances, errors
+
+    def perform_bulk(self, items, instances, errors):
+        transaction_mode = self.get_bulk_transaction()
+        chunk_size = self.get_bulk_chunk_size()
+
+        valid = {}
+        for index, (item, instance) in enumerate(zip(items, instances)):
+            if index in errors:
+                continue
+            serializer = self.get_serializer(
+                instance, data=item, partial=instance is not None
+            )
+            if serializer.is_valid():
+                valid[index] = (instance, serializer.validated_data)
+            else:
+                errors[index] = serializer.errors
+
+        bulk_serializer = self.get_serializer()
+        errors.update(bulk_serializer.validate_bulk(valid))
+        indexes = [index for index in valid if index not in errors]
+        if errors and transaction_mode == 'batch':
+            errors.update(self.get_rolled_back_errors(indexes))
+            return self.get_bulk_response([], errors)
+
+        # Before any transaction, so that slow preparation such as password
+        # hashing doesn't hold the write lock.
+        prepared = self.build_bulk_instances(bulk_serializer, valid, indexes)
+        chunks = [
+            indexes[start:start + chunk_size]
+            for start in range(0, len(indexes), chunk_size)
+        ]
+        saved = {}
+        if transaction_mode == 'batch':
+            failed_chunk = []
+            try:
+                with transaction.atomic():
+                    for chunk in chunks:
+                        failed_chunk = chunk
+                        saved.update(self.write_bulk_chunk(
+                            bulk_serializer, valid, prepared, chunk
+                        ))
+            except IntegrityError:
+                saved = {}
+                errors.update(self.get_conflict_errors(failed_chunk))
+                errors.update(self.get_rolled_back_errors(
+                    [index for index in indexes if index not in errors]
+                ))
+        else:
+            for chunk in chunks:
+                try:
+                    with transaction.atomic():
+                        saved.update(self.write_bulk_chunk(
+                            bulk_serializer, valid, prepared, chunk
+                        ))
+                except IntegrityError:
+                    errors.update(self.get_conflict_errors(chunk))
+
+        return self.get_bulk_response(
+            [saved[index] for index in indexes if index in saved], errors
+        )
+
+    def build_bulk_instances(self, serializer, valid, indexes):
+        """
+        Builds the instances of the items at ``indexes``, through the
+        serializer's `get_bulk_instance` and `prepare_bulk_instances`, and
+        returns them as ``{index: instance}``.
+        """
+        instances = [
+            serializer.get_bulk_instance(dict(valid[index][1]), valid[index][0])
+            for index in indexes
+        ]
+        serializer.prepare_bulk_instances(
+            instances, [valid[index][1] for index in indexes]
+        )
+        return dict(zip(indexes, instances))
+
+    def write_bulk_chunk(self, serializer, valid, prepared, chunk):
+        """
+        Writes the prepared items at ``chunk`` indexes and returns them as
+        ``{index: instance}``.
+        """
+        instances = [prepared[index] for index in chunk]
+        attrs_list = [valid[index][1] for index in chunk]
+
+        if self.action == 'bulk_create':
+            self.perform_bulk_create(instances)
+        else:
+            # One UPDATE per distinct field set, so items don't overwrite
+            # fields they didn't send.
+            model_fields = {
+                field.name for field in serializer.Meta.model._meta.concrete_fields
+                if not field.primary_key
+            }
+            groups = {}
+            for instance, attrs in zip(instances, attrs_list):
+                fields = frozenset(model_fields.intersection(attrs))
+                if fields:
+                    groups.setdefault(fields, []).append(instance)
+            for fields, group in groups.items():
+                self.perform_bulk_update(group, sorted(fields))
+        return dict(zip(chunk, instances))
+
+    def perform_bulk_create(self, instances):
+        model = type(instances[0])
+        model._default_manager.bulk_create(instances)
+        self.fetch_bulk_pks(instances)
+        # Bulk writes don't send `post_save`.
+        invalidate_responses([model])
+
+    def perform_bulk_update(self, instances, fields):
+        # `bulk_update` doesn't call `pre_save`, which sets `auto_now` fields.
+        fields = list(fields)
+        for field in instances[0]._meta.concrete_fields:
+            if getattr(field, 'auto_now', False):
+                for instance in instances:
+                    field.pre_save(instance, add=False)
+                fields.append(field.name)
+        type(instances[0])._default_manager.bulk_update(instances, fields)
+        invalidate_responses([type(instances[0])])
+
+    def fetch_bulk_pks(self, instances, batch_size=500):
+        """
+        Sets the primary keys ``bulk_create`` couldn't return (all backends
+        but PostgreSQL) by looking the rows up by a unique field.
+        """
+        missing = [instance for instance in instances if instance.pk is None]
+        if not missing:
+            return
+        model = type(missing[0])
+        for field in model._meta.concrete_fields:
+            if not field.unique or field.primary_key:
+                continue
+            values = [getattr(instance, field.attname) for instance in missing]
+            if None in values:
+                continue
+            pks = {}
+            for start in range(0, len(values), batch_size):
+                pks.update(model._default_manager.filter(**{
+                    field.attname + '__in': values[start:start + batch_size]
+                }).values_list(field.attname, 'pk'))
+            for instance, value in zip(missing, values):
+                instance.pk = pks.get(value)
+            return
+
+    def get_conflict_errors(self, chunk):
+        return {
+            index: {'non_field_errors': [self.bulk_error_messages['conflict']]}
+            for index in chunk
+        }
+
+    def get_rolled_back_errors(self, indexes):
+        return {
+            index: {'non_field_errors': [self.bulk_error_messages['rolled_back']]}
+            for index in indexes
+        }
+
+    def get_bulk_response(self, instances, errors):
+        data = {
+            'results': self.get_serializer(instances, many=True).data,
+            'errors': [
+                {'index': index, 'errors': errors[index]}
+                for index in sorted(errors)
+            ],
+        }
+        if not errors:
+            status_code = (status.HTTP_201_CREATED if self.action == 'bulk_create'
+                           else status.HTTP_200_OK)
+        elif instances:
+            status_code = status.HTTP_207_MULTI_STATUS
+        else:
+            status_code = status.HTTP_400_BAD_REQUEST
+        return Response(data, status=status_code)
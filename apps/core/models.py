@@ -1,16 +1,224 @@
-from django.db import models
+import copy
 
-from apps.core.utils.slugify import unique_slugify
+from django.db import IntegrityError, models, transaction
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+
+from apps.core.utils.slugify import unique_slugify, unique_slugify_bulk
 
 
 class BaseModel(models.Model):
-    """Base model for this project."""
+    """
+    Base model for this project.
+
+    Instances remember the field values they were loaded or last saved
+    with, so that `get_dirty_fields` tells which fields changed since and
+    `save_changes` writes only those.
+    """
     created_at = models.DateTimeField(auto_now_add=True)
     modified_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         abstract = True
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            attname: _copy_loaded_value(value)
+            for attname, value in zip(field_names, values)
+        }
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self.mark_saved(fields)
+
+    def save(self, force_insert=False, force_update=False, using=None,
+             update_fields=None):
+        if update_fields:
+            # Partial saves, e.g. `update_last_login`, still change
+            # `modified_at`, which the ETags of the viewsets come from.
+            update_fields = list(update_fields)
+            update_fields.extend(
+                field.name for field in self._meta.concrete_fields
+                if getattr(field, 'auto_now', False)
+                and field.name not in update_fields
+            )
+        super().save(force_insert=force_insert, force_update=force_update,
+                     using=using, update_fields=update_fields)
+        self.mark_saved(update_fields)
+
+    def get_dirty_fields(self):
+        """
+        Returns the names of the concrete fields changed since the instance
+        was loaded or saved, or None when that is unknown, e.g. for new
+        instances or ones made by ``bulk_create``.
+        """
+        loaded_values = getattr(self, '_loaded_values', None)
+        if loaded_values is None or self._state.adding:
+            return None
+        dirty_fields = []
+        for field in self._meta.concrete_fields:
+            attname = field.attname
+            if attname not in self.__dict__:
+                # Deferred and never set.
+                continue
+            if attname not in loaded_values:
+                dirty_fields.append(field.name)
+            elif loaded_values[attname] != self.__dict__[attname]:
+                if field.primary_key:
+                    return None
+                dirty_fields.append(field.name)
+        return dirty_fields
+
+    def save_changes(self, using=None):
+        """
+        Saves the fields returned by `get_dirty_fields` (along with the
+        ``auto_now`` ones, see `save`), skipping the query when none changed. Instances
+        whose changes are unknown are saved in full.
+
+        :return: whether the row was written
+        """
+        dirty_fields = self.get_dirty_fields()
+        if dirty_fields is None:
+            self.save(using=using)
+            return True
+        if not dirty_fields:
+            return False
+        self.save(using=using, update_fields=dirty_fields)
+        return True
+
+    def mark_saved(self, fields=None):
+        """
+        Takes the current values of ``fields``, all by default, as the
+        saved ones, e.g. after writing them with ``QuerySet.update()``.
+        """
+        if fields is None:
+            self._loaded_values = {}
+        elif getattr(self, '_loaded_values', None) is None:
+            # Partially saved new instance; its other fields stay unknown.
+            return
+        else:
+            fields = set(fields)
+        for field in self._meta.concrete_fields:
+            if fields is not None and field.name not in fields \
+                    and field.attname not in fields:
+                continue
+            if field.attname in self.__dict__:
+                self._loaded_values[field.attname] = _copy_loaded_value(
+                    self.__dict__[field.attname]
+                )
+
+
+def _copy_loaded_value(value):
+    # Mutable values, e.g. of JSON fields or files, may be changed in place.
+    if isinstance(value, (dict, list)):
+        return copy.deepcopy(value)
+    if isinstance(value, FieldFile):
+        return value.name
+    return value
+
+
+class SoftDeleteQuerySet(models.QuerySet):
+
+    def alive(self):
+        return self.filter(deleted_at__isnull=True)
+
+    def deleted(self):
+        return self.filter(deleted_at__isnull=False)
+
+    def soft_delete(self):
+        """
+        Soft deletes the rows with one UPDATE. Like every
+        ``QuerySet.update()`` it sends no signals, so the cached responses
+        of the model are dropped here; returns the row count.
+        """
+        # Imported here, the module imports this one.
+        from apps.core.response_cache import invalidate_responses
+
+        count = self.alive().update(**self.model.get_soft_delete_values())
+        invalidate_responses([self.model], using=self.db)
+        return count
+
+
+class SoftDeleteManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    """Manager of the rows that aren't soft deleted."""
+
+    def get_queryset(self):
+        return super().get_queryset().alive()
+
+
+class SoftDeleteModel(BaseModel):
+    """
+    Abstract model whose rows are soft deleted by setting `deleted_at`.
+
+    `objects` still returns every row, so uniqueness checks and
+    authentication see soft deleted rows too; query `alive_objects`, which
+    a partial index over the rows left (ordered like `KeysetPagination`)
+    serves, for the others. Old soft deleted rows are archived and removed
+    by ``manage.py purge_soft_deleted``.
+
+    Subclasses declaring a ``Meta`` must inherit ``SoftDeleteModel.Meta``
+    to keep the index.
+    """
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = models.Manager.from_queryset(SoftDeleteQuerySet)()
+    alive_objects = SoftDeleteManager()
+
+    class Meta:
+        abstract = True
+        indexes = [
+            models.Index(
+                fields=['created_at', 'id'],
+                name='%(app_label)s_%(class)s_alive',
+                condition=models.Q(deleted_at__isnull=True),
+            ),
+        ]
+
+    @property
+    def is_deleted(self):
+        return self.deleted_at is not None
+
+    @classmethod
+    def get_soft_delete_values(cls):
+        """
+        Returns the field values that mark a row as soft deleted.
+        """
+        now = timezone.now()
+        values = {'deleted_at': now}
+        for field in cls._meta.concrete_fields:
+            # `QuerySet.update()` doesn't set `auto_now` fields.
+            if getattr(field, 'auto_now', False):
+                values[field.attname] = now
+        return values
+
+    @classmethod
+    def get_restore_values(cls):
+        """
+        Returns the field values that mark a soft deleted row as alive
+        again, undoing `get_soft_delete_values`.
+        """
+        now = timezone.now()
+        values = {'deleted_at': None}
+        for field in cls._meta.concrete_fields:
+            if getattr(field, 'auto_now', False):
+                values[field.attname] = now
+        return values
+
+    def soft_delete(self, using=None):
+        values = self.get_soft_delete_values()
+        for attname, value in values.items():
+            setattr(self, attname, value)
+        self.save(using=using, update_fields=list(values))
+
+    def restore(self, using=None):
+        values = self.get_restore_values()
+        for attname, value in values.items():
+            setattr(self, attname, value)
+        self.save(using=using, update_fields=list(values))
+
 
 class SlugModel(models.Model):
     """
@@ -21,6 +229,10 @@ class SlugModel(models.Model):
     """
     slug = models.SlugField(unique=True, max_length=255, blank=True)
 
+    # Times a generated slug is recomputed when a concurrent save grabbed it
+    # between the lookup and the INSERT.
+    slug_save_attempts = 3
+
     class Meta:
         abstract = True
 
@@ -34,11 +246,40 @@ class SlugModel(models.Model):
             "There must be a field named `name` or `title` or `alt name`"
         return slug_text
 
+    def needs_slug(self):
+        return not self.slug or self.slug.startswith("copy-of")
+
     def save(self, *args, **kwargs):
-        if not self.slug:
-            slug_text = self.get_slug_text()
-            unique_slugify(self, slug_text)
-        if self.slug and self.slug.startswith("copy-of"):
-            slug_text = self.get_slug_text()
-            unique_slugify(self, slug_text)
-        return super().save(*args, **kwargs)
+        if not self.needs_slug():
+            return super().save(*args, **kwargs)
+
+        using = kwargs.get('using') or self._state.db or 'default'
+        for attempt in range(1, self.slug_save_attempts + 1):
+            unique_slugify(self, self.get_slug_text())
+            try:
+                with transaction.atomic(using=using):
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                # Only retry when somebody else took our slug meanwhile.
+                slug_taken = self.__class__._default_manager.using(
+                    using
+                ).filter(slug=self.slug).exclude(pk=self.pk).exists()
+                if not slug_taken or attempt == self.slug_save_attempts:
+                    raise
+
+    @classmethod
+    def assign_slugs(cls, instances):
+        """
+        Assigns unique slugs to unsaved ``instances`` so they can be passed
+        to ``bulk_create``. Slugs already set on the others are kept and
+        not handed out again.
+        """
+        instances = list(instances)
+        preset_slugs = {
+            instance.slug for instance in instances if not instance.needs_slug()
+        }
+        instances = [instance for instance in instances if instance.needs_slug()]
+        return unique_slugify_bulk(
+            instances, [instance.get_slug_text() for instance in instances],
+            taken=preset_slugs,
+        )
@@ -0,0 +1,275 @@
+import datetime
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import namedtuple
+
+from django.core.exceptions import FieldDoesNotExist, FieldError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+KeysetCursor = namedtuple('KeysetCursor', ['position', 'reverse'])
+KeysetKey = namedtuple('KeysetKey', ['name', 'lookup', 'descending', 'nullable', 'field'])
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Keyset (seek) pagination with opaque next/previous cursors.
+
+    Rows are ordered by the ordering requested through `OrderingFilter`
+    (falling back to the queryset's explicit ordering and then to
+    `ordering`, or if None to `get_default_ordering`) plus the primary key
+    as tie breaker. A page is fetched with
+    a ``WHERE (key) > (cursor)`` condition instead of an OFFSET, so deep
+    pages cost the same as the first one.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.keys = self.get_keys(
+            queryset.model, self.ordering, queryset.query.annotations
+        )
+
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+
+        if queryset._fields is not None:
+            # `.values()` rows need the keys to build the cursors from.
+            missing = [
+                key.name for key in self.keys
+                if key.name not in queryset._fields
+            ]
+            if missing:
+                queryset = queryset.values(*queryset._fields, *missing)
+
+        queryset = queryset.order_by(*self.get_order_by(reverse))
+        if self.cursor is not None:
+            queryset = queryset.filter(
+                self.get_seek_filter(self.cursor.position, reverse)
+            )
+
+        # Always fetch an extra row to know whether a following page exists.
+        results = list(queryset[:self.page_size + 1])
+        has_following = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next = self.cursor is not None
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = self.cursor is not None
+
+        if self.page:
+            self.next_position = self.get_position(self.page[-1])
+            self.previous_position = self.get_position(self.page[0])
+        elif self.cursor is not None:
+            # Nothing past the cursor, let the client walk back from it.
+            self.next_position = self.previous_position = self.cursor.position
+        else:
+            self.has_next = self.has_previous = False
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        ordering = None
+        ordering_filters = [
+            filter_cls for filter_cls in getattr(view, 'filter_backends', [])
+            if hasattr(filter_cls, 'get_ordering')
+        ]
+        if ordering_filters:
+            ordering = ordering_filters[0]().get_ordering(request, queryset, view)
+        default_ordering = self.get_default_ordering(queryset.model)
+        if not ordering:
+            ordering = queryset.query.order_by or default_ordering
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+
+        # Expressions and random ordering can't be turned into a keyset.
+        ordering = [
+            order for order in ordering
+            if isinstance(order, str) and order != '?'
+        ] or list(default_ordering)
+
+        pk_name = queryset.model._meta.pk.name
+        if not {'pk', pk_name} & {order.lstrip('-') for order in ordering}:
+            ordering.append(
+                '-' + pk_name if ordering[-1].startswith('-') else pk_name
+            )
+        return tuple(ordering)
+
+    def get_default_ordering(self, model):
+        """
+        Returns the class's `ordering` if set, else the model's
+        ``Meta.ordering``, newest first by ``Meta.get_latest_by`` or
+        ``created_at``, or the primary key descending.
+        """
+        ordering = type(self).ordering
+        if ordering:
+            return (ordering,) if isinstance(ordering, str) else tuple(ordering)
+        opts = model._meta
+        ordering = [
+            order for order in opts.ordering
+            if isinstance(order, str) and order != '?'
+        ]
+        if ordering:
+            return tuple(ordering)
+        latest_by = opts.get_latest_by
+        if isinstance(latest_by, str):
+            latest_by = (latest_by,)
+        if latest_by:
+            return tuple(
+                order[1:] if order.startswith('-') else '-' + order
+                for order in latest_by
+            )
+        try:
+            opts.get_field('created_at')
+        except FieldDoesNotExist:
+            return ('-pk',)
+        return ('-created_at',)
+
+    def get_keys(self, model, ordering, annotations=None):
+        keys = []
+        for order in ordering:
+            name = order.lstrip('-')
+            field = None
+            nullable = True
+            if annotations and name in annotations:
+                # E.g. a search rank. Nullable unless its output field says
+                # otherwise.
+                try:
+                    nullable = annotations[name].output_field.null
+                except FieldError:
+                    pass
+            elif '__' not in name:
+                try:
+                    field = (model._meta.pk if name == 'pk'
+                             else model._meta.get_field(name))
+                except FieldDoesNotExist:
+                    pass
+            if field is not None and not field.concrete:
+                field = None
+            keys.append(KeysetKey(
+                name=field.attname if field is not None else name,
+                lookup=field.attname if field is not None else name,
+                descending=order.startswith('-'),
+                nullable=field.null if field is not None else nullable,
+                field=field,
+            ))
+        return keys
+
+    def get_order_by(self, reverse=False):
+        order_by = []
+        for key in self.keys:
+            descending = key.descending != reverse
+            expression = F(key.lookup)
+            if not key.nullable:
+                order_by.append(expression.desc() if descending else expression.asc())
+            elif descending:
+                order_by.append(expression.desc(nulls_last=True))
+            else:
+                order_by.append(expression.asc(nulls_first=True))
+        return order_by
+
+    def get_seek_filter(self, position, reverse=False):
+        """
+        Builds ``(k1 > v1) OR (k1 = v1 AND k2 > v2) OR ...`` where ``>`` means
+        "comes after" in the current direction. NULLs sort first ascending
+        and last descending, matching `get_order_by`.
+        """
+        seek = Q()
+        equal = Q()
+        for key, value in zip(self.keys, position):
+            descending = key.descending != reverse
+            if value is None:
+                after = Q(**{key.lookup + '__isnull': False}) if not descending else None
+            elif descending:
+                after = Q(**{key.lookup + '__lt': value})
+                if key.nullable:
+                    after |= Q(**{key.lookup + '__isnull': True})
+            else:
+                after = Q(**{key.lookup + '__gt': value})
+
+            if after is not None:
+                seek |= equal & after
+            if value is None:
+                equal &= Q(**{key.lookup + '__isnull': True})
+            else:
+                equal &= Q(**{key.lookup: value})
+        return seek or Q(pk__in=[])
+
+    def get_position(self, row):
+        position = []
+        for key in self.keys:
+            if isinstance(row, dict):
+                value = row[key.name]
+            else:
+                value = row
+                for attr in key.name.split('__'):
+                    value = getattr(value, attr, None)
+                    if value is None:
+                        break
+            position.append(value)
+        return position
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(KeysetCursor(self.next_position, False))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(KeysetCursor(self.previous_position, True))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            tokens = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            position = tokens['p']
+            if not isinstance(position, list) or len(position) != len(self.keys):
+                raise ValueError
+            position = [
+                key.field.to_python(value)
+                if key.field is not None and value is not None else value
+                for key, value in zip(self.keys, position)
+            ]
+            reverse = bool(tokens.get('r'))
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+        return KeysetCursor(position=position, reverse=reverse)
+
+    def encode_cursor(self, cursor):
+        tokens = {'p': [_to_json(value) for value in cursor.position]}
+        if cursor.reverse:
+            tokens['r'] = 1
+        encoded = urlsafe_b64encode(
+            json.dumps(tokens, separators=(',', ':')).encode()
+        ).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+
+def _to_json(value):
+    # Full precision, unlike DjangoJSONEncoder which truncates microseconds.
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
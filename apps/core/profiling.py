@@ -0,0 +1,261 @@
+"""
+Request profiling cheap enough to leave on in production.
+
+`ServerTimingMiddleware` times each request and reports it in a
+``Server-Timing`` header (see `is_header_allowed`):
+
+* ``db``: SQL time, its description holding the query count
+* ``pool``: waiting for a pooled database connection, see
+  `apps.core.db.pool`
+* ``serializer``: building serializers and their fields
+* ``validation``: ``Serializer.is_valid``
+* ``view``: the view, from URL resolution to its returned response
+* ``render``: rendering the response
+* ``total``: the whole request as seen by the middleware
+
+The ``serializer``, ``validation`` and ``render`` phases don't overlap: a
+`timer` started inside another one, e.g. the fields of a serializer built
+during its validation, is counted in the enclosing phase. ``db`` and
+``pool`` are counted in any phase.
+
+Phases are recorded on the profile of the current context, so a
+`timer` outside a request does nothing, and rolling percentiles of every
+metric are kept per URL name by `get_server_timing_stats()`.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from apps.core.utils.stats import RollingWindow
+
+_current_profile = ContextVar('request_profile', default=None)
+
+
+class RequestProfile:
+    metrics = ('total', 'view', 'db', 'queries', 'pool', 'serializer', 'validation',
+               'render')
+
+    __slots__ = ('started', 'timings', 'queries', 'view_started', 'phase')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings = {}
+        self.queries = 0
+        self.view_started = None
+        # Name of the running `timer`, if any.
+        self.phase = None
+
+    def add(self, name, duration):
+        self.timings[name] = self.timings.get(name, 0.0) + duration
+
+    @contextmanager
+    def timer(self, name):
+        if self.phase is not None:
+            # Counted in the enclosing phase.
+            yield
+            return
+        self.phase = name
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase = None
+            self.add(name, time.perf_counter() - started)
+
+    def start_view(self):
+        self.view_started = time.perf_counter()
+
+    def end_view(self):
+        if self.view_started is not None:
+            self.add('view', time.perf_counter() - self.view_started)
+            self.view_started = None
+
+    def finish(self, request, response):
+        """
+        Records the profile under the request's URL name and adds the
+        ``Server-Timing`` header to ``response``.
+        """
+        self.end_view()
+        self.timings['total'] = time.perf_counter() - self.started
+        match = getattr(request, 'resolver_match', None)
+        if match is not None:
+            get_server_timing_stats().add(match.view_name, self)
+        if is_header_allowed(request):
+            response['Server-Timing'] = self.get_header()
+
+    def get_header(self):
+        entries = []
+        for name, duration in self.timings.items():
+            entry = '{};dur={:.2f}'.format(name, duration * 1000)
+            if name == 'db':
+                entry += ';desc="{} queries"'.format(self.queries)
+            entries.append(entry)
+        return ', '.join(entries)
+
+
+@contextmanager
+def profile_request():
+    """
+    Makes a new `RequestProfile` current for the enclosed block.
+    """
+    profile = RequestProfile()
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+def get_current_profile():
+    return _current_profile.get()
+
+
+@contextmanager
+def timer(name):
+    """
+    Adds the time spent in the block to the ``name`` phase of the current
+    request's profile, if any.
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    with profile.timer(name):
+        yield
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper adding queries to the current profile.
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.add('db', time.perf_counter() - started)
+        profile.queries += 1
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    Connected to ``connection_created`` so that the queries of every
+    thread, executor workers included, are recorded.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class ServerTimingStats:
+    """
+    Rolling percentiles of each `RequestProfile` metric per URL name.
+    """
+
+    def __init__(self, window_size=1024):
+        self.window_size = window_size
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def add(self, view_name, profile):
+        windows = self._windows.get(view_name)
+        if windows is None:
+            with self._lock:
+                windows = self._windows.setdefault(view_name, {
+                    metric: RollingWindow(self.window_size)
+                    for metric in RequestProfile.metrics
+                })
+        for metric, window in windows.items():
+            if metric == 'queries':
+                window.add(profile.queries)
+            else:
+                window.add(profile.timings.get(metric, 0.0))
+
+    def stats(self):
+        """
+        Returns the count and p50/p95/p99 of every metric per URL name,
+        durations in milliseconds, as seen by this process.
+        """
+        with self._lock:
+            items = list(self._windows.items())
+        return {
+            view_name: {
+                metric if metric == 'queries' else metric + '_ms':
+                    window.summary(scale=1 if metric == 'queries' else 1000)
+                for metric, window in windows.items()
+            }
+            for view_name, windows in items
+        }
+
+
+def get_server_timing_config():
+    return getattr(settings, 'SERVER_TIMING', {})
+
+
+_stats = None
+
+
+def get_server_timing_stats():
+    """
+    Returns the stats sized by the `SERVER_TIMING` setting.
+    """
+    global _stats
+    if _stats is None:
+        _stats = ServerTimingStats(
+            window_size=get_server_timing_config().get('WINDOW_SIZE', 1024)
+        )
+    return _stats
+
+
+def is_profiling_enabled():
+    return get_server_timing_config().get('ENABLED', True)
+
+
+def is_header_allowed(request):
+    """
+    The header reveals query counts and timings, so unless `HEADER` is set
+    it is only sent with ``DEBUG`` on or to staff users.
+    """
+    if get_server_timing_config().get('HEADER', False) or settings.DEBUG:
+        return True
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_staff
+
+
+class ServerTimingMiddleware:
+    """
+    Profiles every request, see the module docstring. Put it first in
+    ``MIDDLEWARE`` so that ``total`` covers the other middleware.
+    """
+
+    def __init__(self, get_response):
+        if not is_profiling_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with profile_request() as profile:
+            response = self.get_response(request)
+        profile.finish(request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = _current_profile.get()
+        if profile is not None:
+            profile.start_view()
+
+    def process_template_response(self, request, response):
+        # Called between the view returning and the response rendering.
+        profile = _current_profile.get()
+        if profile is not None:
+            profile.end_view()
+            started = time.perf_counter()
+            response.add_post_render_callback(
+                lambda response: profile.add('render', time.perf_counter() - started)
+            )
+        return response
@@ -0,0 +1,90 @@
+"""
+Renderers of row exports, see `apps.core.mixins.ExportModelMixin`.
+
+Besides `render`, used for error payloads, each renderer has
+`iter_render`, which encodes an iterable of rows lazily into chunks of about
+`buffer_size` bytes for a ``StreamingHttpResponse``.
+"""
+import csv
+import io
+import json
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils import encoders
+
+
+class StreamingRenderer(BaseRenderer):
+    charset = 'utf-8'
+    buffer_size = 64 * 1024
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        field_names = list(rows[0]) if rows and isinstance(rows[0], dict) else []
+        return b''.join(self.iter_render(rows, field_names))
+
+    def iter_render(self, rows, field_names):
+        """
+        Yields ``rows``, dicts keyed by ``field_names``, encoded.
+        """
+        buffer = io.StringIO()
+        self.write_header(buffer, field_names)
+        for row in rows:
+            self.write_row(buffer, row, field_names)
+            if buffer.tell() >= self.buffer_size:
+                yield buffer.getvalue().encode(self.charset)
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode(self.charset)
+
+    def write_header(self, buffer, field_names):
+        pass
+
+    def write_row(self, buffer, row, field_names):
+        raise NotImplementedError
+
+
+class CSVRenderer(StreamingRenderer):
+    """
+    One line per row after a header of the field names. Nested values are
+    written as JSON and None as an empty cell.
+
+    Strings a spreadsheet would read as a formula are prefixed with ``'``,
+    so that an exported value like ``=HYPERLINK(...)`` stays text.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    formula_prefixes = ('=', '+', '-', '@', '\t', '\r')
+
+    def write_header(self, buffer, field_names):
+        csv.writer(buffer).writerow(field_names)
+
+    def write_row(self, buffer, row, field_names):
+        csv.writer(buffer).writerow([
+            self.get_cell(row.get(field_name)) for field_name in field_names
+        ])
+
+    def get_cell(self, value):
+        if value is None:
+            return ''
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, cls=encoders.JSONEncoder, ensure_ascii=False)
+        if isinstance(value, str) and value.startswith(self.formula_prefixes):
+            return "'" + value
+        return value
+
+
+class NDJSONRenderer(StreamingRenderer):
+    """
+    One JSON object per line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def write_row(self, buffer, row, field_names):
+        buffer.write(json.dumps(
+            row, cls=encoders.JSONEncoder, ensure_ascii=False, separators=(',', ':')
+        ))
+        buffer.write('\n')
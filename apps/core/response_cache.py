@@ -0,0 +1,148 @@
+"""
+Cache of rendered list and retrieve responses, see
+`BaseViewSet.response_cache_actions`.
+
+Entries are stored through the Django cache named by the `RESPONSE_CACHE`
+setting, so any backend works, LocMem and file based included. Their keys
+embed a version per model the response depends on; saving or deleting an
+instance of a `BaseModel` subclass replaces its model's version once the
+transaction commits, so stale entries are never read again and simply
+expire.
+"""
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from apps.core.models import BaseModel
+from apps.core.utils.stats import RollingWindow
+
+
+class ResponseCache:
+    """
+    :param cache_alias: name of the Django cache storing the responses
+    :param timeout: seconds a response stays cached
+    :param key_prefix: prefix of every key written to the cache
+    """
+
+    def __init__(self, cache_alias='default', timeout=60, key_prefix='response'):
+        self.cache_alias = cache_alias
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def get_version_key(self, model):
+        # Proxies share the rows, and so the version, of their model.
+        return '{}-version:{}'.format(
+            self.key_prefix, model._meta.concrete_model._meta.label_lower
+        )
+
+    def get_versions(self, models):
+        """
+        Returns the current version of each of ``models``, in order.
+        """
+        keys = [self.get_version_key(model) for model in models]
+        versions = self.cache.get_many(keys)
+        for key in keys:
+            if key not in versions:
+                # An evicted version must not fall back to one used before.
+                version = uuid.uuid4().hex
+                if not self.cache.add(key, version, None):
+                    version = self.cache.get(key, version)
+                versions[key] = version
+        return [versions[key] for key in keys]
+
+    def invalidate(self, models):
+        self.cache.set_many(
+            {self.get_version_key(model): uuid.uuid4().hex for model in models},
+            None,
+        )
+
+    def make_key(self, label, versions, parts):
+        return '{}:{}:{}:{}'.format(
+            self.key_prefix, label, '.'.join(versions),
+            uuid.uuid5(uuid.NAMESPACE_URL, repr(parts)).hex,
+        )
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, entry, timeout=None):
+        self.cache.set(key, entry, self.timeout if timeout is None else timeout)
+
+    def record(self, label, hit, duration):
+        """
+        Counts a lookup of the ``label`` action that took ``duration``
+        seconds, whether served from the cache or not.
+        """
+        with self._lock:
+            stats = self._stats.get(label)
+            if stats is None:
+                stats = self._stats[label] = {
+                    'hits': 0, 'misses': 0,
+                    'hit_latency': RollingWindow(), 'miss_latency': RollingWindow(),
+                }
+            stats['hits' if hit else 'misses'] += 1
+        stats['hit_latency' if hit else 'miss_latency'].add(duration)
+
+    def stats(self):
+        """
+        Returns hits, misses, hit ratio and latencies in milliseconds per
+        action, as seen by this process.
+        """
+        with self._lock:
+            items = list(self._stats.items())
+        result = {}
+        for label, stats in items:
+            lookups = stats['hits'] + stats['misses']
+            result[label] = {
+                'hits': stats['hits'],
+                'misses': stats['misses'],
+                'hit_ratio': stats['hits'] / lookups if lookups else None,
+                'hit_latency_ms': stats['hit_latency'].summary(scale=1000),
+                'miss_latency_ms': stats['miss_latency'].summary(scale=1000),
+            }
+        return result
+
+
+_response_cache = None
+
+
+def get_response_cache():
+    """
+    Returns the response cache configured by the `RESPONSE_CACHE` setting.
+    """
+    global _response_cache
+    if _response_cache is None:
+        config = getattr(settings, 'RESPONSE_CACHE', {})
+        _response_cache = ResponseCache(
+            cache_alias=config.get('CACHE_ALIAS', 'default'),
+            timeout=config.get('TIMEOUT', 60),
+            key_prefix=config.get('KEY_PREFIX', 'response'),
+        )
+    return _response_cache
+
+
+def invalidate_responses(models, using='default'):
+    """
+    Drops the cached responses depending on ``models`` once the current
+    transaction commits. Called on every save and delete of a `BaseModel`
+    subclass; call it after writes that bypass signals, like ``bulk_create``,
+    ``bulk_update`` or ``QuerySet.update()``.
+    """
+    models = list(models)
+    transaction.on_commit(
+        lambda: get_response_cache().invalidate(models), using=using
+    )
+
+
+def invalidate_model_responses(sender, using='default', **kwargs):
+    if issubclass(sender, BaseModel):
+        invalidate_responses([sender], using=using)
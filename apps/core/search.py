@@ -0,0 +1,329 @@
+"""
+Indexed substring search for `SearchFilter`.
+
+DRF's `SearchFilter` matches each term with OR-ed ``icontains`` clauses,
+which scan the whole table. A `SearchIndex` declares the fields to index and
+a backend per database vendor maintains the index and narrows the queryset
+with it:
+
+* SQLite: an FTS5 table with the ``trigram`` tokenizer, kept up to date by
+  triggers on the model's table. Ranked by how closely fields match.
+* PostgreSQL: ``pg_trgm`` GIN indexes on ``UPPER(column)``, the expression
+  Django's ``icontains`` compiles to, so the lookups themselves use the
+  index. Ranked by trigram similarity.
+
+`IndexedSearchFilter` still applies the ``icontains`` clauses, so results
+are the same as with `SearchFilter`, only ranked and fetched through the
+index.
+"""
+from django.apps import apps
+from django.db import connections
+from django.db.migrations.operations.base import Operation
+from django.db.models import (
+    Case, ExpressionWrapper, F, FloatField, Func, IntegerField, Value, When,
+)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, Greatest
+from rest_framework.filters import SearchFilter
+
+
+class SearchIndex:
+    """
+    :param model: ``'app_label.ModelName'`` of the indexed model
+    :param name: name of the index; also used as prefix for the database
+        objects backing it
+    :param fields: names of the indexed model fields
+    """
+
+    def __init__(self, model, name, fields):
+        self.model = model
+        self.name = name
+        self.fields = tuple(fields)
+
+    def get_model(self):
+        return apps.get_model(self.model)
+
+    def covers(self, search_fields):
+        """
+        Whether every ``icontains`` search field is indexed. Prefixed
+        (``^``, ``=``, ``@``, ``$``) and related lookups are not.
+        """
+        return bool(search_fields) and all(
+            field in self.fields for field in search_fields
+        )
+
+    def ensure(self, using='default'):
+        """
+        Creates the index if needed and repairs it when the table was
+        rebuilt, e.g. by a SQLite ``ALTER TABLE`` emulation dropping the
+        triggers. Connected to ``post_migrate``.
+        """
+        connection = connections[using]
+        backend = get_search_backend(connection)
+        model = self.get_model()
+        if backend is None or model._meta.db_table not in \
+                connection.introspection.table_names():
+            return
+        with connection.schema_editor() as schema_editor:
+            backend.install(schema_editor, model, self.name, self.fields)
+
+
+class SearchBackend:
+    vendor = None
+
+    def is_available(self, connection):
+        return True
+
+    def install(self, schema_editor, model, name, fields):
+        """
+        Creates the database objects of the index. Must be idempotent.
+        """
+        raise NotImplementedError
+
+    def uninstall(self, schema_editor, model, name, fields):
+        raise NotImplementedError
+
+    def search(self, queryset, search_index, search_terms):
+        """
+        Narrows ``queryset`` through the index and annotates it with
+        ``search_rank``, higher being more relevant.
+        """
+        raise NotImplementedError
+
+
+class SQLiteTrigramBackend(SearchBackend):
+    vendor = 'sqlite'
+    # The trigram tokenizer can't look up anything shorter.
+    min_term_length = 3
+
+    def is_available(self, connection):
+        from django.db.backends.sqlite3.base import Database
+
+        return Database.sqlite_version_info >= (3, 34, 0)
+
+    def install(self, schema_editor, model, name, fields):
+        qn = schema_editor.quote_name
+        opts = model._meta
+        columns = [opts.get_field(field).column for field in fields]
+        table, index_table, pk = qn(opts.db_table), qn(name), qn(opts.pk.column)
+
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') "
+                "AND name IN (%s, %s, %s, %s)",
+                [name, name + '_ai', name + '_ad', name + '_au'],
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+
+        new_values = ', '.join('new.%s' % qn(column) for column in columns)
+        old_values = ', '.join('old.%s' % qn(column) for column in columns)
+        column_list = ', '.join(qn(column) for column in columns)
+        insert = 'INSERT INTO %s(rowid, %s) VALUES (new.%s, %s);' % (
+            index_table, column_list, pk, new_values
+        )
+        delete = "INSERT INTO %s(%s, rowid, %s) VALUES ('delete', old.%s, %s);" % (
+            index_table, index_table, column_list, pk, old_values
+        )
+        statements = {
+            name: "CREATE VIRTUAL TABLE %s USING fts5(%s, content=%s, "
+                  "content_rowid=%s, tokenize='trigram')" % (
+                      index_table, column_list, table, pk),
+            name + '_ai': 'CREATE TRIGGER %s AFTER INSERT ON %s BEGIN %s END' % (
+                qn(name + '_ai'), table, insert),
+            name + '_ad': 'CREATE TRIGGER %s AFTER DELETE ON %s BEGIN %s END' % (
+                qn(name + '_ad'), table, delete),
+            # Only the indexed columns, so e.g. `last_login` updates are free.
+            name + '_au': 'CREATE TRIGGER %s AFTER UPDATE OF %s ON %s BEGIN %s %s END' % (
+                qn(name + '_au'), column_list, table, delete, insert),
+        }
+        missing = [key for key in statements if key not in existing]
+        for key in missing:
+            schema_editor.execute(statements[key])
+        if missing:
+            # Rows written while a trigger was missing aren't indexed.
+            schema_editor.execute(
+                "INSERT INTO %s(%s) VALUES ('rebuild')" % (index_table, index_table)
+            )
+
+    def uninstall(self, schema_editor, model, name, fields):
+        qn = schema_editor.quote_name
+        for suffix in ('_ai', '_ad', '_au'):
+            schema_editor.execute('DROP TRIGGER IF EXISTS %s' % qn(name + suffix))
+        schema_editor.execute('DROP TABLE IF EXISTS %s' % qn(name))
+
+    def search(self, queryset, search_index, search_terms):
+        terms = [
+            term for term in search_terms if len(term) >= self.min_term_length
+        ]
+        if not terms:
+            return queryset
+
+        qn = connections[queryset.db].ops.quote_name
+        index_table = qn(search_index.name)
+        # Each term as a phrase: a substring match with the trigram tokenizer.
+        match = ' AND '.join('"%s"' % term.replace('"', '""') for term in terms)
+        return queryset.filter(
+            pk__in=RawSQL(
+                'SELECT rowid FROM %s WHERE %s MATCH %%s' % (index_table, index_table),
+                [match],
+            )
+        ).annotate(
+            # Reading bm25 per row would evaluate the MATCH again for each
+            # one, so rank from the row's own values instead.
+            search_rank=get_match_score(search_index.fields, search_terms)
+        )
+
+
+class PostgresTrigramBackend(SearchBackend):
+    """
+    Needs the ``pg_trgm`` extension, which the migration creates if the
+    database user may do so.
+    """
+    vendor = 'postgresql'
+
+    def get_index_name(self, name, column):
+        return '%s_%s' % (name, column)
+
+    def install(self, schema_editor, model, name, fields):
+        qn = schema_editor.quote_name
+        opts = model._meta
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for field in fields:
+            column = opts.get_field(field).column
+            schema_editor.execute(
+                'CREATE INDEX IF NOT EXISTS %s ON %s USING gin '
+                '((UPPER(%s::text)) gin_trgm_ops)' % (
+                    qn(self.get_index_name(name, column)),
+                    qn(opts.db_table),
+                    qn(column),
+                )
+            )
+
+    def uninstall(self, schema_editor, model, name, fields):
+        opts = model._meta
+        for field in fields:
+            schema_editor.execute('DROP INDEX IF EXISTS %s' % schema_editor.quote_name(
+                self.get_index_name(name, opts.get_field(field).column)
+            ))
+
+    def search(self, queryset, search_index, search_terms):
+        # The icontains clauses already use the indexes; only rank here.
+        query = ' '.join(search_terms)
+        similarities = [
+            Coalesce(
+                Func(F(field), Value(query), function='similarity',
+                     output_field=FloatField()),
+                0.0,
+            )
+            for field in search_index.fields
+        ]
+        return queryset.annotate(
+            search_rank=Greatest(*similarities)
+            if len(similarities) > 1 else similarities[0]
+        )
+
+
+def get_match_score(fields, search_terms):
+    """
+    Expression scoring how well a row matches: for each term, 3 when a field
+    equals it, 2 when a field starts with it and 1 when it only contains it.
+    """
+    scores = []
+    for term in search_terms:
+        field_scores = [
+            Case(
+                When(**{field + '__iexact': term}, then=Value(3)),
+                When(**{field + '__istartswith': term}, then=Value(2)),
+                When(**{field + '__icontains': term}, then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+            for field in fields
+        ]
+        scores.append(
+            Greatest(*field_scores) if len(field_scores) > 1 else field_scores[0]
+        )
+    score = scores[0]
+    for term_score in scores[1:]:
+        score = ExpressionWrapper(score + term_score, output_field=IntegerField())
+    return score
+
+
+SEARCH_BACKENDS = {
+    backend.vendor: backend
+    for backend in (SQLiteTrigramBackend(), PostgresTrigramBackend())
+}
+
+
+def get_search_backend(connection):
+    backend = SEARCH_BACKENDS.get(connection.vendor)
+    if backend is None or not backend.is_available(connection):
+        return None
+    return backend
+
+
+class CreateSearchIndex(Operation):
+    """
+    Migration operation installing the backend objects of a `SearchIndex`.
+    Does nothing on databases without a search backend.
+    """
+    reversible = True
+    reduces_to_sql = False
+
+    def __init__(self, model_name, name, fields):
+        self.model_name = model_name
+        self.name = name
+        self.fields = list(fields)
+
+    def deconstruct(self):
+        return (
+            self.__class__.__name__,
+            [],
+            {'model_name': self.model_name, 'name': self.name, 'fields': self.fields},
+        )
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        backend = get_search_backend(schema_editor.connection)
+        if backend is not None:
+            model = to_state.apps.get_model(app_label, self.model_name)
+            backend.install(schema_editor, model, self.name, self.fields)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        backend = get_search_backend(schema_editor.connection)
+        if backend is not None:
+            model = from_state.apps.get_model(app_label, self.model_name)
+            backend.uninstall(schema_editor, model, self.name, self.fields)
+
+    def describe(self):
+        return 'Create search index %s on %s' % (self.name, self.model_name)
+
+
+class IndexedSearchFilter(SearchFilter):
+    """
+    `SearchFilter` using the view's ``search_index`` when it covers the
+    ``search_fields``. Unless an ordering was requested, results are
+    ordered by relevance.
+    """
+    rank_ordering = '-search_rank'
+
+    def filter_queryset(self, request, queryset, view):
+        queryset = super().filter_queryset(request, queryset, view)
+
+        search_index = getattr(view, 'search_index', None)
+        search_terms = self.get_search_terms(request)
+        if search_index is None or not search_terms:
+            return queryset
+        if not search_index.covers(self.get_search_fields(view, request)):
+            return queryset
+        backend = get_search_backend(connections[queryset.db])
+        if backend is None:
+            return queryset
+
+        queryset = backend.search(queryset, search_index, search_terms)
+        if 'search_rank' in queryset.query.annotations \
+                and not queryset.query.order_by:
+            queryset = queryset.order_by(self.rank_ordering)
+        return queryset
@@ -1,5 +1,14 @@
+import copy
+
+from django.core.exceptions import FieldDoesNotExist
 from django.utils.functional import cached_property
 from rest_framework.serializers import ModelSerializer, Serializer
+from rest_framework.utils import model_meta
+from rest_framework.utils.serializer_helpers import BindingDict
+
+from apps.core.compiled import compile_reader
+from apps.core.profiling import timer
+from apps.core.utils.cache import LRUCache
 
 
 class DynamicFieldsSerializer(Serializer):
@@ -7,36 +16,101 @@ class DynamicFieldsSerializer(Serializer):
     A Serializer that takes an additional `fields` and 'exclude_fields'
     argument that controls which fields should be displayed and not to be
     displayed.
+
+    The filtered field set is built once per class and cache key (see
+    `get_fields_cache_key`) and every instance binds a deep copy of it. Set
+    `cache_fields = False` on serializers whose `get_fields` depends on
+    anything else, e.g. the requesting user.
+
+    Fields listed in ``Meta.opt_in_fields`` are only rendered when named in
+    the `fields` argument, e.g. the URL of a large original file.
     """
+    cache_fields = True
+    _fields_cache = LRUCache(max_items=512)
 
     def __init__(self, instance=None, *args, **kwargs):
         # Don't pass the 'fields' arg up to the superclass
-        fields = kwargs.pop('fields', None)
-        exclude_fields = kwargs.pop('exclude_fields', None)
+        self._include_fields = kwargs.pop('fields', None)
+        self._exclude_fields = kwargs.pop('exclude_fields', None)
 
         # Instantiate the superclass normally
         super().__init__(
             instance, *args, **kwargs
         )
 
-        if fields is not None:
+    @cached_property
+    def fields(self):
+        with timer('serializer'):
+            key = self.get_fields_cache_key()
+            if key is None:
+                declared_fields = self.filter_fields(self.get_fields())
+            else:
+                cached_fields = self._fields_cache.get(key)
+                if cached_fields is None:
+                    cached_fields = self.filter_fields(self.get_fields())
+                    self._fields_cache.set(key, cached_fields)
+                declared_fields = copy.deepcopy(cached_fields)
+
+            fields = BindingDict(self)
+            for field_name, field in declared_fields.items():
+                fields[field_name] = field
+        return fields
+
+    def is_valid(self, raise_exception=False):
+        with timer('validation'):
+            return super().is_valid(raise_exception=raise_exception)
+
+    def filter_fields(self, fields):
+        if self._include_fields is not None:
             # Drop any fields that are not specified in the `fields` argument.
-            allowed = set(fields)
-            existing = set(self.fields.keys())
-            for field_name in existing - allowed:
-                self.fields.pop(field_name)
+            allowed = set(self._include_fields)
+            fields = {
+                field_name: field for field_name, field in fields.items()
+                if field_name in allowed
+            }
+        else:
+            opt_in_fields = set(getattr(getattr(self, 'Meta', None), 'opt_in_fields', ()))
+            fields = {
+                field_name: field for field_name, field in fields.items()
+                if field_name not in opt_in_fields
+            }
         # exclude fields
-        if exclude_fields is not None:
-            # Drop any fields that are not specified in the `fields` argument.
-            exclude_fields = set(exclude_fields)
-            for field_name in exclude_fields:
-                self.fields.pop(field_name)
+        if self._exclude_fields is not None:
+            excluded = set(self._exclude_fields)
+            fields = {
+                field_name: field for field_name, field in fields.items()
+                if field_name not in excluded
+            }
+        return fields
+
+    def get_fields_cache_key(self):
+        """
+        Returns the key the built fields are cached under, or None to build
+        them for every instance.
+        """
+        if not self.cache_fields:
+            return None
+        request = self.request
+        return (
+            self.__class__,
+            frozenset(self._include_fields)
+            if self._include_fields is not None else None,
+            frozenset(self._exclude_fields or ()),
+            request.method.upper() if request is not None else None,
+            self.create_only_fields_active(),
+        )
+
+    def create_only_fields_active(self):
+        meta = getattr(self, 'Meta', None)
+        return self.instance is not None and bool(
+            getattr(meta, 'create_only_fields', None)
+        )
 
     def get_extra_kwargs(self):
         extra_kwargs = super().get_extra_kwargs()
         create_only_fields = getattr(self.Meta, 'create_only_fields', None)
 
-        if self.instance and create_only_fields:
+        if self.create_only_fields_active():
             for field_name in create_only_fields:
                 kwargs = extra_kwargs.get(field_name, {})
                 kwargs['read_only'] = True
@@ -60,8 +134,105 @@ class DynamicFieldsModelSerializer(ModelSerializer, DynamicFieldsSerializer):
     A ModelSerializer that takes an additional `fields` and 'exclude_fields'
     argument that controls which fields should be displayed and not to be
     displayed.
+
+    Set `compiled_read = True` to let list actions render ``.values()`` rows
+    through a reader generated for the field set, see `get_compiled_reader`.
+
+    Bulk writes (see `apps.core.mixins.BulkModelMixin`) validate each item
+    with ``context['bulk']`` set, then call `validate_bulk` once for the
+    whole payload and build the rows with `get_bulk_instance` and
+    `prepare_bulk_instances` instead of `create` / `update`.
     """
-    pass
+    compiled_read = False
+    _validators_cache = LRUCache(max_items=512)
+    _readers_cache = LRUCache(max_items=256)
+
+    def get_validators(self):
+        # Unique together / for date validators only depend on the field set.
+        key = self.get_fields_cache_key()
+        if key is None:
+            return super().get_validators()
+        validators = self._validators_cache.get(key)
+        if validators is None:
+            validators = list(super().get_validators())
+            self._validators_cache.set(key, validators)
+        return list(validators)
+
+    def get_compiled_reader(self):
+        """
+        Returns a `CompiledReader` for the current field set, or None if
+        `compiled_read` is off or a readable field can't be compiled.
+        """
+        if not self.compiled_read:
+            return None
+        key = self.get_fields_cache_key()
+        if key is None:
+            return compile_reader(self) or None
+        reader = self._readers_cache.get(key)
+        if reader is None:
+            # False remembers field sets that can't be compiled.
+            reader = compile_reader(self) or False
+            self._readers_cache.set(key, reader)
+        return reader or None
+
+    def get_model_columns(self):
+        """
+        Returns the names of the model fields that have to be loaded to render
+        this serializer, or None if that can't be worked out because a
+        readable field reads from `*`, a property or a method.
+        """
+        opts = self.Meta.model._meta
+        columns = {opts.pk.name}
+        for field in self._readable_fields:
+            if field.source == '*':
+                return None
+            try:
+                model_field = opts.get_field(field.source_attrs[0])
+            except FieldDoesNotExist:
+                return None
+            if model_field.concrete:
+                columns.add(model_field.name)
+            elif not model_field.is_relation:
+                return None
+        return columns
+
+    def is_bulk(self):
+        return bool(self.context.get('bulk'))
+
+    def validate_bulk(self, items):
+        """
+        Validates a bulk payload as a whole, e.g. uniqueness with set based
+        queries instead of one query per item.
+
+        :param items: ``{index: (instance, attrs)}`` of the items that passed
+            item validation, ``instance`` being None for new rows
+        :return: ``{index: errors}`` of the failing items
+        """
+        return {}
+
+    def get_bulk_instance(self, attrs, instance=None):
+        """
+        Applies ``attrs`` to ``instance``, or to a new model instance, without
+        saving it.
+        """
+        ModelClass = self.Meta.model
+        info = model_meta.get_field_info(ModelClass)
+        assert not any(
+            attr in info.relations and info.relations[attr].to_many
+            for attr in attrs
+        ), 'Bulk writes do not support many-to-many fields.'
+
+        if instance is None:
+            return ModelClass(**attrs)
+        for attr, value in attrs.items():
+            setattr(instance, attr, value)
+        return instance
+
+    def prepare_bulk_instances(self, instances, attrs_list):
+        """
+        Called once with every valid item of the payload before any
+        transaction is opened, e.g. to hash passwords.
+        """
 
 
 class DummyObject:
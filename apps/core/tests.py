@@ -0,0 +1,563 @@
+import asyncio
+import base64
+import datetime
+import io
+import json
+import random
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.signals import got_request_exception
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import path
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from apps.core import validators
+from apps.core.asgi import AsyncRouter, StreamingASGIHandler
+from apps.core.async_viewsets import AsyncBaseViewSet
+from apps.core.checks import check_response_cache
+from apps.core.db import pool as pool_module
+from apps.core.db.pool import ConnectionPool, PoolTimeout, get_pool
+from apps.core.fields import Base64ImageField
+from apps.core.profiling import profile_request, timer
+from apps.core.utils.slugify import unique_slugify_bulk
+
+
+class Attachment:
+    def __init__(self, size):
+        self.size = size
+
+
+@override_settings(OTP_LENGTH=6)
+class BatchValidatorTests(SimpleTestCase):
+    """
+    Each batch validator must flag the rows its scalar validator rejects,
+    with the same message.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        generator = random.Random(0)
+        alphabet = '0123456789+- aZé\n'
+        cls.strings = [
+            ''.join(generator.choice(alphabet) for _ in range(generator.randrange(16)))
+            for _ in range(2000)
+        ] + [
+            '9811111111', '977-9833333333', '+977-9833333333', '9811111111\n',
+            'Ram Bahadur', ' ', '', '977-0825666',
+        ]
+        cls.integers = [generator.randrange(10 ** 12) for _ in range(500)]
+        cls.dates = [
+            datetime.date(generator.randrange(1, 9999), generator.randrange(1, 13), 1)
+            for _ in range(500)
+        ]
+        cls.datetimes = [
+            timezone.now() + datetime.timedelta(days=generator.randrange(-5, 5))
+            for _ in range(200)
+        ]
+        cls.date_parts = [
+            (generator.choice([0, 2020, 2026, 2027, 99999, None]),
+             generator.choice([0, 1, 10, 12, 13]),
+             generator.choice([0, 1, 18, 19, 31]))
+            for _ in range(500)
+        ]
+        cls.attachments = [
+            Attachment(generator.randrange(4 * 1024 * 1024)) for _ in range(200)
+        ]
+
+    def get_scalar_messages(self, validator, values):
+        messages = []
+        for value in values:
+            try:
+                validator(value)
+            except serializers.ValidationError as exc:
+                messages.append(str(exc.detail[0]))
+            else:
+                messages.append(None)
+        return messages
+
+    def assertSameMessages(self, batch_validator, validator, values):
+        self.assertEqual(
+            batch_validator(values).messages,
+            self.get_scalar_messages(validator, values),
+        )
+
+    def test_names(self):
+        self.assertSameMessages(
+            validators.validate_names, validators.validate_name, self.strings
+        )
+
+    def test_phone_numbers(self):
+        values = self.strings + self.integers
+        for batch_validator, validator in [
+            (validators.validate_phone_numbers,
+             validators.validate_phone_number),
+            (validators.validate_phone_numbers_without_country_code,
+             validators.validate_phone_number_without_country_code),
+            (validators.validate_coded_phone_numbers,
+             validators.validate_coded_phone_number),
+        ]:
+            with self.subTest(batch_validator.__name__):
+                self.assertSameMessages(batch_validator, validator, values)
+
+    def test_otps(self):
+        self.assertSameMessages(
+            validators.validate_otps, validators.validate_otp,
+            self.strings + self.integers
+        )
+
+    def test_dobs(self):
+        self.assertSameMessages(
+            validators.validate_dobs, validators.validate_dob, self.dates
+        )
+
+    def test_future_datetimes(self):
+        self.assertSameMessages(
+            validators.are_future_datetimes, validators.is_future_datetime,
+            self.datetimes
+        )
+
+    def test_attachments(self):
+        self.assertSameMessages(
+            validators.validate_attachments, validators.validate_attachment,
+            self.attachments
+        )
+
+    def test_date_parts(self):
+        years, months, days = zip(*self.date_parts)
+        for batch_validator, validator in [
+            (validators.validate_future_datetimes,
+             validators.validate_future_datetime),
+            (validators.validate_is_future_datetimes,
+             validators.validate_is_future_datetime),
+        ]:
+            with self.subTest(batch_validator.__name__):
+                self.assertEqual(
+                    batch_validator(years, months, days).messages,
+                    self.get_scalar_messages(lambda parts: validator(*parts), self.date_parts),
+                )
+
+    def test_date_parts_of_different_lengths(self):
+        with self.assertRaises(ValueError):
+            validators.validate_future_datetimes([2030, 2031], [1, 1], [1])
+
+    def test_column_errors(self):
+        errors = validators.validate_phone_numbers(['98111', '9811111111'])
+        self.assertEqual(errors.mask, [True, False])
+        self.assertEqual([index for index, _ in errors.items()], [0])
+        self.assertTrue(errors)
+        self.assertEqual(len(errors), 2)
+
+
+class ImageSerializer(serializers.Serializer):
+    image = Base64ImageField()
+
+
+class Base64ImageFieldTests(SimpleTestCase):
+
+    def get_png(self):
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new('RGB', (40, 40), 'red').save(buffer, 'PNG')
+        return buffer.getvalue()
+
+    def test_decodes_image(self):
+        content = self.get_png()
+        data = 'data:image/png;base64,' + base64.b64encode(content).decode()
+        serializer = ImageSerializer(data={'image': data})
+        self.assertTrue(serializer.is_valid())
+        upload = serializer.validated_data['image']
+        self.assertTrue(upload.name.endswith('.png'))
+        self.assertEqual(upload.size, len(content))
+        self.assertEqual(upload.content_type, 'image/png')
+        self.assertEqual(upload.read(), content)
+
+    def test_rejects_corrupted_image(self):
+        data = base64.b64encode(b'GIF89a' + b'x' * 100).decode()
+        serializer = ImageSerializer(data={'image': data})
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors['image'][0].code, 'invalid_image')
+
+    @override_settings(ATTACHMENT_MAX_UPLOAD_SIZE=64)
+    def test_rejects_oversized_image(self):
+        data = base64.b64encode(self.get_png()).decode()
+        serializer = ImageSerializer(data={'image': data})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('image', serializer.errors)
+
+
+class UniqueSlugifyBulkTests(TestCase):
+    """
+    Runs against the user's ``username``, the slug-like field of the repo.
+    """
+
+    def slugify(self, values, **kwargs):
+        user_model = get_user_model()
+        instances = [user_model() for _ in values]
+        unique_slugify_bulk(instances, values, slug_field_name='username', **kwargs)
+        return [instance.username for instance in instances]
+
+    def test_duplicates_within_the_batch(self):
+        self.assertEqual(self.slugify(['Foo', 'foo', 'Bar']), ['foo', 'foo-2', 'bar'])
+
+    def test_existing_slugs(self):
+        get_user_model().objects.create_user('foo@example.com', username='foo')
+        self.assertEqual(self.slugify(['Foo']), ['foo-2'])
+
+    def test_taken_slugs(self):
+        self.assertEqual(
+            self.slugify(['Foo', 'Foo'], taken={'foo', 'foo-3'}), ['foo-2', 'foo-4']
+        )
+
+
+def call_asgi(application, method, path, data=None, headers=()):
+    """
+    Returns the status, headers and body of ``application``'s response.
+    """
+    body = json.dumps(data).encode() if data is not None else b''
+    path, _, query_string = path.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': method, 'scheme': 'http', 'path': path, 'root_path': '',
+        'query_string': query_string.encode(),
+        'headers': [
+            (b'host', b'testserver'),
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+            *headers,
+        ],
+        'server': ('testserver', 80), 'client': ('127.0.0.1', 0),
+    }
+    messages = [{'type': 'http.request', 'body': body}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    return (
+        sent[0]['status'],
+        dict(sent[0]['headers']),
+        b''.join(message.get('body', b'') for message in sent[1:]),
+    )
+
+
+class AsyncRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        async def application(scope, receive, send):
+            raise AssertionError('Routed to Django.')
+
+        self.router = AsyncRouter(application)
+
+    def test_route(self):
+        async def view(request):
+            return Response({'echo': request.data})
+
+        self.router.route('POST', '/echo/', view)
+        status, headers, body = call_asgi(self.router, 'POST', '/echo/', {'a': 1})
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body), {'echo': {'a': 1}})
+
+    def test_api_exception(self):
+        async def view(request):
+            raise NotFound()
+
+        self.router.route('POST', '/missing/', view)
+        status, _, body = call_asgi(self.router, 'POST', '/missing/', {})
+        self.assertEqual(status, 404)
+        self.assertEqual(json.loads(body), {'detail': 'Not found.'})
+
+    @override_settings(DEBUG=False)
+    def test_unhandled_exception(self):
+        async def view(request):
+            raise RuntimeError('Unhandled.')
+
+        requests = []
+
+        def receiver(request, **kwargs):
+            requests.append(request)
+
+        self.router.route('POST', '/error/', view)
+        got_request_exception.connect(receiver)
+        try:
+            with self.assertLogs('django.request', 'ERROR'):
+                status, _, _ = call_asgi(self.router, 'POST', '/error/', {})
+        finally:
+            got_request_exception.disconnect(receiver)
+        self.assertEqual(status, 500)
+        self.assertEqual(len(requests), 1)
+
+
+class ResponseCacheCheckTests(SimpleTestCase):
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }})
+    def test_process_local_cache(self):
+        self.assertEqual(
+            [error.id for error in check_response_cache(None)], ['core.W001']
+        )
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+    }})
+    def test_shared_cache(self):
+        self.assertEqual(check_response_cache(None), [])
+
+
+class TimerTests(SimpleTestCase):
+
+    def test_nested_timers(self):
+        with profile_request() as profile:
+            with timer('validation'):
+                # E.g. the fields built on first access, during validation.
+                with timer('serializer'):
+                    with timer('validation'):
+                        pass
+            self.assertEqual(list(profile.timings), ['validation'])
+            with timer('serializer'):
+                pass
+            with timer('serializer'):
+                pass
+        self.assertEqual(list(profile.timings), ['validation', 'serializer'])
+        self.assertIsNone(profile.phase)
+
+    def test_exception(self):
+        with profile_request() as profile:
+            with self.assertRaises(ValueError), timer('render'):
+                raise ValueError()
+            with timer('serializer'):
+                pass
+        self.assertEqual(list(profile.timings), ['render', 'serializer'])
+
+
+class GroupCountViewSet(AsyncBaseViewSet):
+    permission_classes = (AllowAny,)
+    queryset = Group.objects.all()
+
+    async def list(self, request, *args, **kwargs):
+        count = await self.run_sync(self.get_queryset().count)
+        return Response({'count': count})
+
+
+urlpatterns = [
+    path('groups/', GroupCountViewSet.as_view({'get': 'list'})),
+]
+
+
+# The ASGI handler runs the views on another thread, which doesn't see the
+# data of a TestCase transaction.
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncViewSetTests(TransactionTestCase):
+
+    def setUp(self):
+        Group.objects.create(name='Staff')
+
+    def test_django_client(self):
+        response = self.client.get('/groups/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'count': 1})
+        # Through the middleware.
+        self.assertEqual(response['X-Frame-Options'], 'DENY')
+
+    def test_asgi(self):
+        router = AsyncRouter(StreamingASGIHandler())
+        status, headers, body = call_asgi(router, 'GET', '/groups/')
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body), {'count': 1})
+        self.assertEqual(headers[b'X-Frame-Options'], b'DENY')
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch.object(pool_module, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_pool(self, **kwargs):
+        kwargs.setdefault('min_size', 0)
+        kwargs.setdefault('max_size', 2)
+        kwargs.setdefault('timeout', 0)
+        return ConnectionPool(FakeConnection, **kwargs)
+
+    def test_acquire(self):
+        pool = self.make_pool(max_size=1)
+        self.assertEqual(pool._acquire(self.clock.now), (None, None))
+        # The reserved slot counts towards `max_size`.
+        self.assertEqual(pool.size, 1)
+        with self.assertRaises(PoolTimeout):
+            pool._acquire(self.clock.now)
+        self.assertEqual(pool.timeouts, 1)
+
+        connection = pool._open()
+        pool.putconn(connection)
+        self.assertEqual(pool._acquire(self.clock.now), (connection, self.clock.now))
+        self.assertEqual(pool.size, 1)
+
+    def test_reuses_last_returned(self):
+        pool = self.make_pool()
+        first, second = pool.getconn(), pool.getconn()
+        pool.putconn(first)
+        pool.putconn(second)
+        self.assertIs(pool.getconn(), second)
+        self.assertEqual(pool.connects, 2)
+        self.assertEqual(pool.checkouts, 3)
+
+    def test_timeout(self):
+        pool = self.make_pool(max_size=1)
+        pool.getconn()
+        with self.assertRaises(PoolTimeout):
+            pool.getconn()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_waiter_gets_returned_connection(self):
+        # Real time, the waiter sleeps on the condition.
+        self.clock.monotonic = time.monotonic
+        pool = self.make_pool(max_size=1, timeout=5)
+        connection = pool.getconn()
+        checked_out = []
+        waiter = threading.Thread(target=lambda: checked_out.append(pool.getconn()))
+        waiter.start()
+        while not pool.stats()['waiting']:
+            time.sleep(0.001)
+        pool.putconn(connection)
+        waiter.join()
+        self.assertEqual(checked_out, [connection])
+
+    def test_putconn_recycles_old_connection(self):
+        pool = self.make_pool(max_lifetime=10)
+        connection = pool.getconn()
+        self.clock.now += 11
+        pool.putconn(connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual((pool.size, pool.recycled), (0, 1))
+
+    def test_getconn_recycles_old_connection(self):
+        pool = self.make_pool(max_lifetime=10)
+        connection = pool.getconn()
+        self.clock.now += 5
+        pool.putconn(connection)
+        self.clock.now += 6
+        self.assertIsNot(pool.getconn(), connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual((pool.size, pool.recycled), (1, 1))
+
+    def test_putconn_discards(self):
+        def reset(connection):
+            raise RuntimeError()
+
+        pool = self.make_pool(reset=reset)
+        connection = pool.getconn()
+        pool.putconn(connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.size, 0)
+
+        pool = self.make_pool()
+        connection = pool.getconn()
+        pool.putconn(connection, discard=True)
+        self.assertTrue(connection.closed)
+        # Connections the pool didn't open aren't kept.
+        stranger = FakeConnection()
+        pool.putconn(stranger)
+        self.assertTrue(stranger.closed)
+        self.assertEqual(pool.stats()['idle'], 0)
+
+    def test_health_check(self):
+        pool = self.make_pool(is_usable=lambda connection: False,
+                              health_check_after=1)
+        connection = pool.getconn()
+        pool.putconn(connection)
+        # Recently returned, not checked.
+        self.assertIs(pool.getconn(), connection)
+        pool.putconn(connection)
+        self.clock.now += 2
+        self.assertIsNot(pool.getconn(), connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.health_check_failures, 1)
+
+    def test_pop_idle_expired(self):
+        pool = self.make_pool(min_size=1, max_size=3, max_idle=10)
+        connections = [pool.getconn() for _ in range(3)]
+        for connection in connections:
+            pool.putconn(connection)
+            self.clock.now += 4
+        with pool._cond:
+            expired = pool._pop_idle_expired(self.clock.now)
+        # Idle for 12 and 8 seconds.
+        self.assertEqual(expired, connections[:1])
+        with pool._cond:
+            expired = pool._pop_idle_expired(self.clock.now + 10)
+        # Down to `min_size`.
+        self.assertEqual(expired, connections[1:2])
+        self.assertEqual(pool.size, 1)
+
+    def test_close(self):
+        pool = self.make_pool()
+        idle, in_use = pool.getconn(), pool.getconn()
+        pool.putconn(idle)
+        pool.close()
+        self.assertTrue(idle.closed)
+        self.assertFalse(in_use.closed)
+        with self.assertRaises(PoolTimeout):
+            pool.getconn()
+        pool.putconn(in_use)
+        self.assertTrue(in_use.closed)
+        self.assertEqual(pool.size, 0)
+
+    def test_inherited_through_fork(self):
+        pool = self.make_pool()
+        connection = pool.getconn()
+        # As in a child process.
+        pool.pid = -1
+        pool.putconn(connection)
+        self.assertFalse(connection.closed)
+        self.assertEqual(pool.stats()['idle'], 0)
+
+    def test_get_pool_after_fork(self):
+        key = ('tests', 'fork')
+        self.addCleanup(pool_module._pools.pop, key, None)
+        inherited = get_pool(key, self.make_pool)
+        self.assertIs(get_pool(key, self.make_pool), inherited)
+        inherited.pid = -1
+        pool = get_pool(key, self.make_pool)
+        self.assertIsNot(pool, inherited)
+        self.assertIn(inherited, pool_module._inherited_pools)
+        pool_module._inherited_pools.remove(inherited)
@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+_MISSING = object()
+
+# Django cache backends keeping their entries in the memory of each process.
+PROCESS_LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+)
+
+
+def is_process_local_cache(cache_alias):
+    """
+    Whether the entries of the ``CACHES`` entry ``cache_alias`` are unseen
+    by the other processes, e.g. the other workers of the server.
+    """
+    backend = settings.CACHES.get(cache_alias, {}).get('BACKEND')
+    return backend in PROCESS_LOCAL_CACHE_BACKENDS
+
+
+class LRUCache:
+    """
+    Thread-safe, bounded least-recently-used cache.
+
+    :param max_items: maximum number of entries kept, ``None`` for no limit
+    :param max_bytes: maximum total size of the stored values as measured by
+        ``sizeof``, ``None`` for no limit
+    :param sizeof: callable returning the size of a value
+    :param ttl: seconds an entry stays valid after being set, ``None`` to
+        keep entries until they are evicted
+    """
+
+    def __init__(self, max_items=None, max_bytes=None, sizeof=len, ttl=None):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and entry[2] is not None \
+                    and entry[2] <= time.monotonic():
+                self._pop(key)
+                entry = _MISSING
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._pop(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                # Would evict everything else and still not fit.
+                return
+            self._data[key] = (value, size, expires)
+            self.current_bytes += size
+            self._evict()
+
+    def delete(self, key):
+        with self._lock:
+            self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'items': len(self._data),
+                'bytes': self.current_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+    def _pop(self, key):
+        entry = self._data.pop(key, _MISSING)
+        if entry is not _MISSING:
+            self.current_bytes -= entry[1]
+
+    def _evict(self):
+        while self._data and (
+            (self.max_items is not None and len(self._data) > self.max_items)
+            or (self.max_bytes is not None
+                and self.current_bytes > self.max_bytes)
+        ):
+            _, (_, size, _) = self._data.popitem(last=False)
+            self.current_bytes -= size
+            self.evictions += 1
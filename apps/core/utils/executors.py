@@ -0,0 +1,92 @@
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from apps.core.utils.stats import RollingWindow
+
+
+class ExecutorSaturated(Exception):
+    """Raised when a `BoundedExecutor` has no room for another task."""
+
+
+class BoundedExecutor:
+    """
+    Thread pool that refuses work instead of queueing it without limit.
+
+    :param max_workers: number of worker threads
+    :param max_queue: tasks allowed to wait for a free worker; once reached
+        `submit` raises `ExecutorSaturated`
+    :param name: prefix of the worker thread names
+
+    Tasks run in a copy of the submitter's context, so context variables
+    such as the current request profile follow them.
+    """
+
+    def __init__(self, max_workers=4, max_queue=64, name='bounded'):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=name
+        )
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self.latency = RollingWindow()
+
+    def submit(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise ExecutorSaturated(
+                'All {} workers are busy and {} tasks are queued'.format(
+                    self.max_workers, self.max_queue
+                )
+            )
+        with self._lock:
+            self.submitted += 1
+            self.in_flight += 1
+        started = time.perf_counter()
+
+        def done(future):
+            self._slots.release()
+            with self._lock:
+                self.in_flight -= 1
+            self.latency.add(time.perf_counter() - started)
+
+        try:
+            future = self._executor.submit(
+                contextvars.copy_context().run, fn, *args, **kwargs
+            )
+        except BaseException:
+            done(None)
+            raise
+        future.add_done_callback(done)
+        return future
+
+    def run(self, fn, *args, **kwargs):
+        """
+        Runs ``fn`` on the pool and blocks until it returns.
+        """
+        return self.submit(fn, *args, **kwargs).result()
+
+    async def run_async(self, fn, *args, **kwargs):
+        """
+        Runs ``fn`` on the pool without blocking the event loop.
+        """
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'in_flight': self.in_flight,
+            }
+        stats['latency_ms'] = self.latency.summary(scale=1000)
+        return stats
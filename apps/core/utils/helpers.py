@@ -1,7 +1,8 @@
 import os
+import operator
 import uuid
 import datetime
-from functools import reduce
+from functools import lru_cache
 
 from django.utils import timezone
 
@@ -51,14 +52,19 @@ def update_instance(instance: object, validated_data: dict, save: bool = True):
     :param instance: Instance to update
     :param validated_data: Dictionary containing fields as keys and update
         as values
-    :param save: If true, calls save() method of instance
+    :param save: If true, saves the instance; only the changed fields (see
+        `BaseModel.save_changes`) if it tracks them, nothing if none changed
     :return: updated instance
     """
     for attr, value in validated_data.items():
         setattr(instance, attr, value)
 
-    if save and hasattr(instance, 'save'):
-        instance.save()
+    if save:
+        save_changes = getattr(instance, 'save_changes', None)
+        if save_changes is not None:
+            save_changes()
+        elif hasattr(instance, 'save'):
+            instance.save()
     return instance
 
 
@@ -67,7 +73,7 @@ def set_instance_fields(instance: object, validated_data: dict, save: bool = Tru
     Sets attributes to given instance
     :param instance: Instance to update
     :param validated_data: Dictionary containing fields as keys and update as values
-    :param save: If true, calls save() method of instance
+    :param save: If true, saves the instance, see `update_instance`
     :param fields: name of fields that will be updated
     :param pop_items: pop items in fields from validated_data
     :return: updated instance
@@ -93,15 +99,104 @@ def nested_getattr(instance: object, attributes: str, separator='.', default=Non
     :param call: flag that determines whether to call or not if callable
     :return:
     """
-    nested_attrs = attributes.split(separator)
-    nested_attrs.insert(0, instance)
+    return get_attribute_accessor(attributes, separator, call)(instance, default)
+
+
+# Accessors are cached with `lru_cache` rather than `LRUCache`, whose
+# lock would cost more than the parsing they save.
+@lru_cache(maxsize=1024)
+def get_attribute_accessor(attributes: str, separator='.', call=True):
+    """
+    Returns ``accessor(instance, default=None)``, equivalent to
+    `nested_getattr` with the same arguments; the path is parsed once and
+    the accessor cached, so get it once per column rather than per row.
+    """
+    return _compile_accessor(_compile_getter(attributes, separator), call)
+
+
+@lru_cache(maxsize=256)
+def get_attributes_accessor(attributes_list: tuple, separator='.', call=True):
+    """
+    Returns ``accessor(instance, default=None)`` returning the tuple of the
+    `nested_getattr` values of each path of ``attributes_list``.
+    """
+    return _compile_many_accessor(attributes_list, separator, call)
+
+
+def nested_getattr_many(instances, attributes_list, separator='.', default=None, call=True):
+    """
+    Returns, for each of ``instances``, the tuple of its `nested_getattr`
+    values for each path of ``attributes_list``.
+    """
+    accessor = get_attributes_accessor(tuple(attributes_list), separator, call)
+    return [accessor(instance, default) for instance in instances]
+
+
+def _compile_getter(attributes, separator):
+    names = attributes.split(separator)
+    if any('.' in name for name in names):
+        # Only reachable with another separator; attrgetter would split them.
+        def getter(instance):
+            for name in names:
+                instance = getattr(instance, name)
+            return instance
+        return getter
+    return operator.attrgetter('.'.join(names))
+
+
+def _compile_accessor(getter, call):
+    if call:
+        def accessor(instance, default=None):
+            try:
+                attr = getter(instance)
+                if callable(attr):
+                    return attr()
+                return attr
+            except AttributeError:
+                return default
+    else:
+        def accessor(instance, default=None):
+            try:
+                return getter(instance)
+            except AttributeError:
+                return default
+    return accessor
+
+
+def _compile_many_accessor(attributes_list, separator, call):
+    accessors = [
+        get_attribute_accessor(attributes, separator, call)
+        for attributes in attributes_list
+    ]
+    if len(accessors) < 2 or any(
+        separator != '.' and '.' in attributes for attributes in attributes_list
+    ):
+        def accessor(instance, default=None):
+            return tuple([path_accessor(instance, default) for path_accessor in accessors])
+        return accessor
+
+    # Fetches every path in one attrgetter call, falling back to the
+    # accessors of each path for the rows missing an attribute.
+    getter = operator.attrgetter(*(
+        '.'.join(attributes.split(separator)) for attributes in attributes_list
+    ))
+
+    def accessor(instance, default=None):
+        try:
+            values = getter(instance)
+        except AttributeError:
+            return tuple([path_accessor(instance, default) for path_accessor in accessors])
+        if call:
+            return tuple([
+                _call(value, default) if callable(value) else value
+                for value in values
+            ])
+        return values
+    return accessor
+
+
+def _call(function, default):
     try:
-        attr = reduce(
-            lambda instance_, attribute_: getattr(instance_, attribute_),
-            nested_attrs
-        )
-        if call and callable(attr):
-            return attr()
-        return attr
+        return function()
     except AttributeError:
         return default
@@ -0,0 +1,32 @@
+"""
+Image processing run in worker processes. Keep this module free of Django
+imports: spawned workers import it without setting Django up.
+"""
+import io
+
+
+def render_variants(data, sizes, image_format, quality):
+    """
+    Returns ``{size: encoded bytes}`` of the image ``data`` fitted in a
+    ``size`` pixels square for each of ``sizes``, never upscaled.
+    """
+    from PIL import Image, ImageOps
+
+    image = Image.open(io.BytesIO(data))
+    # Lets the JPEG decoder downscale while decoding.
+    image.draft('RGB', (max(sizes), max(sizes)))
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    if image.mode == 'RGBA' and image_format == 'JPEG':
+        image = image.convert('RGB')
+
+    variants = {}
+    # Each size is scaled down from the previous, larger one.
+    for size in sorted(sizes, reverse=True):
+        image.thumbnail((size, size), Image.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, image_format, quality=quality)
+        variants[size] = output.getvalue()
+    return variants
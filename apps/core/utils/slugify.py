@@ -3,8 +3,13 @@ Taken from SmileyChris' post @ https://djangosnippets.org/snippets/690/
 """
 import re
 
+from django.db.models import Q
 from django.template.defaultfilters import slugify
 
+# Widest suffix we expect to append ('-' plus up to 10 digits). Used to pick
+# a lookup prefix short enough to match every truncated candidate.
+MAX_SUFFIX_LENGTH = 11
+
 
 def unique_slugify(instance, value, slug_field_name='slug', queryset=None,
                    slug_separator='-'):
@@ -16,38 +21,121 @@ def unique_slugify(instance, value, slug_field_name='slug', queryset=None,
 
     ``queryset`` usually doesn't need to be explicitly provided - it'll default
     to using the ``.all()`` queryset from the model's default manager.
+
+    Every existing slug sharing the base prefix is fetched in a single query
+    and the next free suffix is worked out in memory.
     """
     slug_field = instance._meta.get_field(slug_field_name)
+    slug_len = slug_field.max_length
+
+    original_slug = _get_base_slug(value, slug_len, slug_separator)
+
+    # Create a queryset, excluding the current instance.
+    if queryset is None:
+        queryset = instance.__class__._default_manager.all()
+        if instance.pk:
+            queryset = queryset.exclude(pk=instance.pk)
+
+    taken = _get_taken_slugs(
+        queryset, slug_field_name, [original_slug], slug_len, slug_separator
+    )
+    slug = _next_free_slug(original_slug, taken, slug_len, slug_separator)
+    setattr(instance, slug_field.attname, slug)
+
+
+def unique_slugify_bulk(instances, values, slug_field_name='slug',
+                        queryset=None, slug_separator='-', taken=()):
+    """
+    Assigns unique slugs to a list of unsaved ``instances`` before
+    ``bulk_create``.
+
+    ``values`` is the list of texts to slugify, in the same order as
+    ``instances``. Existing slugs for every distinct base are fetched in one
+    query and slugs handed out within the batch are reserved as they are
+    assigned, so two instances with the same title get ``foo`` and ``foo-2``.
+
+    ``taken`` holds further slugs to avoid, e.g. the preset slugs of other
+    instances of the same batch.
+    """
+    instances = list(instances)
+    values = list(values)
+    assert len(instances) == len(values), \
+        "`instances` and `values` must have the same length"
+    if not instances:
+        return instances
 
-    slug = getattr(instance, slug_field.attname)
+    model = instances[0].__class__
+    slug_field = model._meta.get_field(slug_field_name)
     slug_len = slug_field.max_length
 
+    base_slugs = [
+        _get_base_slug(value, slug_len, slug_separator) for value in values
+    ]
+    if queryset is None:
+        queryset = model._default_manager.all()
+
+    taken = _get_taken_slugs(
+        queryset, slug_field_name, set(base_slugs), slug_len, slug_separator
+    ) | set(taken)
+    for instance, base_slug in zip(instances, base_slugs):
+        slug = _next_free_slug(base_slug, taken, slug_len, slug_separator)
+        taken.add(slug)
+        setattr(instance, slug_field.attname, slug)
+    return instances
+
+
+def _get_base_slug(value, slug_len, slug_separator):
     # Sort out the initial slug. Chop its length down if we need to.
     slug = slugify(value)
     if slug_len:
         slug = slug[:slug_len]
-    slug = _slug_strip(slug, slug_separator)
-    original_slug = slug
+    return _slug_strip(slug, slug_separator)
 
-    # Create a queryset, excluding the current instance.
-    if not queryset:
-        queryset = instance.__class__._default_manager.all()
-        if instance.pk:
-            queryset = queryset.exclude(pk=instance.pk)
 
+def _get_lookup_prefix(base_slug, slug_len, slug_separator):
+    """
+    Returns the prefix shared by ``base_slug`` and all of its suffixed
+    candidates, including the ones chopped down to fit ``slug_len``.
+    """
+    if slug_len and len(base_slug) + MAX_SUFFIX_LENGTH > slug_len:
+        base_slug = _slug_strip(
+            base_slug[:max(slug_len - MAX_SUFFIX_LENGTH, 1)], slug_separator
+        )
+    # An empty base only ever yields '-2', '-3', ...
+    return base_slug or '-'
+
+
+def _get_taken_slugs(queryset, slug_field_name, base_slugs, slug_len,
+                     slug_separator):
+    """
+    Fetches, in one query, every slug in ``queryset`` that could collide with
+    a candidate built from ``base_slugs``.
+    """
+    lookup = Q()
+    for prefix in {
+        _get_lookup_prefix(base_slug, slug_len, slug_separator)
+        for base_slug in base_slugs
+    }:
+        lookup |= Q(**{'%s__startswith' % slug_field_name: prefix})
+    return set(
+        queryset.filter(lookup).values_list(slug_field_name, flat=True)
+    )
+
+
+def _next_free_slug(base_slug, taken, slug_len, slug_separator):
     # Find a unique slug. If one matches, at '-2' to the end and try again
     # (then '-3', etc).
+    slug = base_slug
     next = 2
-    while not slug or queryset.filter(**{slug_field_name: slug}):
-        slug = original_slug
+    while not slug or slug in taken:
+        slug = base_slug
         end = '-%s' % next
         if slug_len and len(slug) + len(end) > slug_len:
             slug = slug[:slug_len-len(end)]
             slug = _slug_strip(slug, slug_separator)
         slug = '%s%s' % (slug, end)
         next += 1
-
-    setattr(instance, slug_field.attname, slug)
+    return slug
 
 
 def _slug_strip(value, separator=None):
@@ -0,0 +1,46 @@
+import math
+import threading
+from collections import deque
+
+
+class RollingWindow:
+    """
+    Thread-safe window of the last ``size`` samples with percentile lookup.
+    """
+
+    def __init__(self, size=1024):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def add(self, value):
+        with self._lock:
+            self._samples.append(value)
+            self.count += 1
+
+    def percentiles(self, percents=(50, 95, 99)):
+        """
+        Returns ``{percent: value}`` using the nearest-rank method, with
+        None values while the window is empty.
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return {percent: None for percent in percents}
+        return {
+            percent: samples[max(math.ceil(percent / 100 * len(samples)) - 1, 0)]
+            for percent in percents
+        }
+
+    def summary(self, scale=1):
+        """
+        Returns the sample count and p50/p95/p99 multiplied by ``scale``,
+        e.g. ``scale=1000`` to report seconds as milliseconds.
+        """
+        return dict(
+            count=self.count,
+            **{
+                'p%d' % percent: value * scale if value is not None else None
+                for percent, value in self.percentiles().items()
+            }
+        )
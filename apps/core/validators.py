@@ -2,43 +2,50 @@ import re
 
 from django.conf import settings
 from django.utils import timezone
-from django.utils.translation import gettext as _
+from django.utils.translation import gettext as _, gettext_noop
 from rest_framework import serializers
 
 from apps.core.utils.helpers import get_today, combine_date_parts
 
 PHONE_NUMBER_REGEX = re.compile(r"^(([+]?\d{3})-?)?\d{7,10}$")
 
+# Messages shared by the scalar and batch validators, translated when used.
+NAME_ERROR = gettext_noop("Name Should not contain any special characters.")
+PHONE_NUMBER_LENGTH_ERROR = gettext_noop('Phone Number should range from 7-10.')
+PHONE_NUMBER_DIGITS_ERROR = gettext_noop('Phone Number Should Be Integer')
+PHONE_NUMBER_FORMAT_ERROR = gettext_noop(
+    'Phone Number format is not valid. Some examples of supported'
+    ' phone numbers are numbers are 9811111111, 08256666,'
+    ' 977-9833333333, +977-9833333333, 977-08256666'
+)
+CODED_PHONE_NUMBER_FORMAT_ERROR = gettext_noop('Phone Number format is incorrect.')
+COUNTRY_CODE_DIGITS_ERROR = gettext_noop('Country Code Should Be Integer')
+DOB_ERROR = gettext_noop('Age must be in between 16 years and 100 years.')
+INVALID_DATE_ERROR = gettext_noop('Invalid Date Passed.')
+PAST_DATE_ERROR = gettext_noop('Date Must not be in future.')
+FUTURE_DATE_ERROR = gettext_noop('Date Must be in future.')
+
 
 def validate_name(name):
     if not name.replace(" ", "").isalpha():
-        raise serializers.ValidationError(
-            _("Name Should not contain any special characters."))
+        raise serializers.ValidationError(_(NAME_ERROR))
     return name
 
 
 def validate_phone_number_without_country_code(number):
     phone_number = str(number)
     if not 7 <= len(phone_number) <= 10:
-        raise serializers.ValidationError(
-            _('Phone Number should range from 7-10.')
-        )
+        raise serializers.ValidationError(_(PHONE_NUMBER_LENGTH_ERROR))
 
     if not phone_number.isdigit():
-        raise serializers.ValidationError(
-            _('Phone Number Should Be Integer')
-        )
+        raise serializers.ValidationError(_(PHONE_NUMBER_DIGITS_ERROR))
 
 
 def validate_phone_number(number):
     phone_number = str(number)
 
     if not PHONE_NUMBER_REGEX.match(phone_number):
-        raise serializers.ValidationError(
-            _('Phone Number format is not valid. Some examples of supported'
-              ' phone numbers are numbers are 9811111111, 08256666,'
-              ' 977-9833333333, +977-9833333333, 977-08256666')
-        )
+        raise serializers.ValidationError(_(PHONE_NUMBER_FORMAT_ERROR))
 
     return number
 
@@ -48,16 +55,12 @@ def validate_coded_phone_number(number):
     try:
         country_code, phone_number = number.split('-')
     except ValueError:
-        raise serializers.ValidationError(
-            _('Phone Number format is incorrect.')
-        )
+        raise serializers.ValidationError(_(CODED_PHONE_NUMBER_FORMAT_ERROR))
 
     validate_phone_number_without_country_code(phone_number)
 
     if not country_code.isdigit():
-        raise serializers.ValidationError(
-            _('Country Code Should Be Integer')
-        )
+        raise serializers.ValidationError(_(COUNTRY_CODE_DIGITS_ERROR))
 
     # TODO: add more validation rule
     return number
@@ -72,17 +75,18 @@ def validate_otp(otp):
     otp = str(otp)
 
     if not len(otp) == settings.OTP_LENGTH:
-        raise serializers.ValidationError(
-            _(f'Otp should have length of {settings.OTP_LENGTH}')
-        )
+        raise serializers.ValidationError(get_otp_length_error())
     return otp
 
 
+def get_otp_length_error():
+    return _(f'Otp should have length of {settings.OTP_LENGTH}')
+
+
 def validate_dob(value):
     year_diff = get_today().year - value.year
     if year_diff not in range(16, 100):
-        raise serializers.ValidationError(
-            _('Age must be in between 16 years and 100 years.'))
+        raise serializers.ValidationError(_(DOB_ERROR))
     return value
 
 
@@ -92,14 +96,18 @@ def is_future_datetime(value, error_message=_("DateTime Must Be Future.")):
     return value
 
 
+def get_attachment_size_error(max_size=None):
+    if max_size is None:
+        max_size = settings.ATTACHMENT_MAX_UPLOAD_SIZE
+    return _(
+        'File Size Should not Exceed '
+        f'{max_size / (1024 * 1024)} MB'
+    )
+
+
 def validate_attachment(attachment):
     if attachment.size > settings.ATTACHMENT_MAX_UPLOAD_SIZE:
-        raise serializers.ValidationError(
-            _(
-                'File Size Should not Exceed '
-                f'{settings.ATTACHMENT_MAX_UPLOAD_SIZE / (1024 * 1024)} MB'
-            )
-        )
+        raise serializers.ValidationError(get_attachment_size_error())
     return attachment
 
 
@@ -113,14 +121,10 @@ def validate_future_datetime(year: int = 0, month: int = 0, day: int = 1):
     provided_date = combine_date_parts(year, month, day)
 
     if not provided_date:
-        raise serializers.ValidationError(_(
-            'Invalid Date Passed.'
-        ))
+        raise serializers.ValidationError(_(INVALID_DATE_ERROR))
 
     if provided_date > get_today():
-        raise serializers.ValidationError(_(
-            'Date Must not be in future.'
-        ))
+        raise serializers.ValidationError(_(PAST_DATE_ERROR))
 
 
 def validate_is_future_datetime(year: int = 0, month: int = 0, day: int = 1):
@@ -132,11 +136,183 @@ def validate_is_future_datetime(year: int = 0, month: int = 0, day: int = 1):
     provided_date = combine_date_parts(year, month, day)
 
     if not provided_date:
-        raise serializers.ValidationError(_(
-            'Invalid Date Passed.'
-        ))
+        raise serializers.ValidationError(_(INVALID_DATE_ERROR))
 
     if provided_date < get_today():
-        raise serializers.ValidationError(_(
-            'Date Must be in future.'
-        ))
+        raise serializers.ValidationError(_(FUTURE_DATE_ERROR))
+
+
+# Batch validators
+#
+# Each validates a column of values, e.g. of a bulk import, the way the
+# scalar validator of the same name does, but returns `ColumnErrors`
+# instead of raising on the first invalid value. Messages are translated
+# and dates computed once per column.
+
+
+class ColumnErrors:
+    """
+    Outcome of a batch validator: ``messages[i]`` is the error message of
+    row ``i``, the one the scalar validator raises, or None if it is valid.
+    """
+    __slots__ = ('messages',)
+
+    def __init__(self, messages):
+        self.messages = messages
+
+    @property
+    def mask(self):
+        """
+        ``[bool]``, True for the invalid rows.
+        """
+        return [message is not None for message in self.messages]
+
+    def items(self):
+        """
+        Yields ``(row index, message)`` of the invalid rows.
+        """
+        for index, message in enumerate(self.messages):
+            if message is not None:
+                yield index, message
+
+    def __bool__(self):
+        return any(message is not None for message in self.messages)
+
+    def __len__(self):
+        return len(self.messages)
+
+    def __repr__(self):
+        return '<ColumnErrors {} of {} rows invalid>'.format(
+            sum(self.mask), len(self.messages)
+        )
+
+
+def validate_names(names):
+    error = _(NAME_ERROR)
+    return ColumnErrors([
+        None if name.replace(" ", "").isalpha() else error
+        for name in names
+    ])
+
+
+def _get_phone_number_checker():
+    length_error = _(PHONE_NUMBER_LENGTH_ERROR)
+    digits_error = _(PHONE_NUMBER_DIGITS_ERROR)
+
+    def get_error(phone_number):
+        if not 7 <= len(phone_number) <= 10:
+            return length_error
+        if not phone_number.isdigit():
+            return digits_error
+        return None
+    return get_error
+
+
+def validate_phone_numbers_without_country_code(numbers):
+    get_error = _get_phone_number_checker()
+    return ColumnErrors([get_error(str(number)) for number in numbers])
+
+
+def validate_phone_numbers(numbers):
+    error = _(PHONE_NUMBER_FORMAT_ERROR)
+    match = PHONE_NUMBER_REGEX.match
+    return ColumnErrors([
+        None if match(str(number)) else error
+        for number in numbers
+    ])
+
+
+def validate_coded_phone_numbers(numbers):
+    format_error = _(CODED_PHONE_NUMBER_FORMAT_ERROR)
+    country_code_error = _(COUNTRY_CODE_DIGITS_ERROR)
+    get_phone_number_error = _get_phone_number_checker()
+    messages = []
+    for number in numbers:
+        parts = str(number).split('-')
+        if len(parts) != 2:
+            messages.append(format_error)
+            continue
+        country_code, phone_number = parts
+        error = get_phone_number_error(phone_number)
+        if error is None and not country_code.isdigit():
+            error = country_code_error
+        messages.append(error)
+    return ColumnErrors(messages)
+
+
+def validate_otps(otps):
+    otps = list(otps)
+    if not otps:
+        return ColumnErrors([])
+    length = settings.OTP_LENGTH
+    error = get_otp_length_error()
+    return ColumnErrors([
+        None if len(str(otp)) == length else error
+        for otp in otps
+    ])
+
+
+def validate_dobs(values):
+    error = _(DOB_ERROR)
+    year = get_today().year
+    return ColumnErrors([
+        None if 16 <= year - value.year < 100 else error
+        for value in values
+    ])
+
+
+def are_future_datetimes(values, error_message=_("DateTime Must Be Future.")):
+    now = timezone.now()
+    return ColumnErrors([
+        None if now < value else error_message
+        for value in values
+    ])
+
+
+def validate_attachments(attachments):
+    max_size = settings.ATTACHMENT_MAX_UPLOAD_SIZE
+    error = get_attachment_size_error()
+    return ColumnErrors([
+        error if attachment.size > max_size else None
+        for attachment in attachments
+    ])
+
+
+def _validate_date_parts(years, months, days, is_invalid, error):
+    years, months, days = list(years), list(months), list(days)
+    if not len(years) == len(months) == len(days):
+        raise ValueError(
+            'years, months and days must have the same length, got {}, {} and {}.'
+            .format(len(years), len(months), len(days))
+        )
+    invalid_date_error = _(INVALID_DATE_ERROR)
+    today = get_today()
+    messages = []
+    for year, month, day in zip(years, months, days):
+        provided_date = combine_date_parts(year, month, day)
+        if not provided_date:
+            messages.append(invalid_date_error)
+        elif is_invalid(provided_date, today):
+            messages.append(error)
+        else:
+            messages.append(None)
+    return ColumnErrors(messages)
+
+
+def validate_future_datetimes(years, months, days):
+    """
+    Column version of `validate_future_datetime`: ``years``, ``months`` and
+    ``days`` are the parts of each row's date.
+    """
+    return _validate_date_parts(
+        years, months, days, lambda date, today: date > today, _(PAST_DATE_ERROR)
+    )
+
+
+def validate_is_future_datetimes(years, months, days):
+    """
+    Column version of `validate_is_future_datetime`.
+    """
+    return _validate_date_parts(
+        years, months, days, lambda date, today: date < today, _(FUTURE_DATE_ERROR)
+    )
@@ -1,11 +1,23 @@
+import hashlib
+import time
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date
 from rest_framework.mixins import (
-    RetrieveModelMixin, ListModelMixin,
     UpdateModelMixin, CreateModelMixin,
     DestroyModelMixin
 )
 
 from rest_framework.viewsets import GenericViewSet
 
+from apps.core.mixins import ListModelMixin, RetrieveModelMixin
+from apps.core.pagination import KeysetPagination
+from apps.core.profiling import timer
+from apps.core.response_cache import get_response_cache
+
 
 class BaseViewSet(GenericViewSet):
     """"
@@ -23,10 +35,61 @@ class BaseViewSet(GenericViewSet):
 
         set this value or override get_serializer_exclude_fields
 
+    :cvar sparse_fieldset_actions:
+        actions whose clients may pick fields with ``?fields=a,b`` and drop
+        fields with ``?omit=c``. Only the columns needed by the resulting
+        serializer are loaded from the database.
+
+    :cvar search_index:
+        `apps.core.search.SearchIndex` used by `IndexedSearchFilter` to
+        answer ``?search=`` through an index instead of table scans.
+
+    :cvar conditional_field:
+        datetime field, ``modified_at`` of `BaseModel`, from which the
+        ``conditional_actions`` compute their ETag and Last-Modified
+        validators. Requests with a matching ``If-None-Match`` or
+        ``If-Modified-Since`` header get a 304 before anything is
+        serialized. Set to None to disable.
+
+        Detail validators come from the object's field; list validators
+        from ``Max(field)`` and ``Count`` over the filtered queryset plus
+        the query string. Lists have no Last-Modified since deletions don't
+        move the maximum. Writes bypassing ``auto_now``, like
+        ``QuerySet.update()``, and changes to related objects rendered by
+        the serializer don't change the validators.
+
+    :cvar response_cache_actions:
+        actions whose rendered responses are cached, see
+        `apps.core.response_cache`. Entries are keyed by action, host,
+        query parameters, serializer field set, ``response_cache_scope``
+        and the versions of the view's model and ``response_cache_models``,
+        which saves and deletes of those models replace. Responses carry
+        ``X-Cache: HIT`` or ``MISS``.
+
+    :cvar response_cache_scope:
+        who may share an entry: ``'user'`` (default) caches per user,
+        ``'role'`` shares entries between users with the same
+        ``is_staff`` / ``is_superuser`` flags. Only use ``'role'`` when
+        the queryset and serializer don't depend on the user.
+
+    List actions are paginated with keyset cursors, by default over
+    ``(created_at, id)``, see `KeysetPagination.get_default_ordering`.
     """
     serializer_include_fields = None
     serializer_exclude_fields = None
     permission_class_mapper = {}
+    pagination_class = KeysetPagination
+    sparse_fieldset_actions = ('list', 'retrieve', 'export')
+    fields_query_param = 'fields'
+    omit_query_param = 'omit'
+    search_index = None
+    conditional_field = 'modified_at'
+    conditional_actions = ('list', 'retrieve')
+    response_cache_actions = ()
+    response_cache_models = ()
+    response_cache_scope = 'user'
+    response_cache_formats = ('json',)
+    response_cache_timeout = None
 
     def get_permissions(self):
         """
@@ -41,18 +104,230 @@ class BaseViewSet(GenericViewSet):
             return self.permission_class_mapper.get(self.action, self.permission_classes)
 
     def get_serializer(self, *args, **kwargs):
-        serializer_class = self.get_serializer_class()
-        kwargs['context'] = self.get_serializer_context()
+        with timer('serializer'):
+            serializer_class = self.get_serializer_class()
+            kwargs['context'] = self.get_serializer_context()
 
-        kwargs['fields'] = self.get_serializer_include_fields()
-        kwargs['exclude_fields'] = self.get_serializer_exclude_fields()
-        return serializer_class(*args, **kwargs)
+            kwargs['fields'] = self.get_serializer_include_fields()
+            kwargs['exclude_fields'] = self.get_serializer_exclude_fields()
+            return serializer_class(*args, **kwargs)
 
     def get_serializer_include_fields(self):
-        return self.serializer_include_fields
+        fields = self.serializer_include_fields
+        requested = self.get_requested_fields(self.fields_query_param)
+        if requested is None:
+            return fields
+        if fields is None:
+            return requested
+        return [field for field in fields if field in requested]
 
     def get_serializer_exclude_fields(self):
-        return self.serializer_exclude_fields
+        exclude_fields = self.serializer_exclude_fields
+        omitted = self.get_requested_fields(self.omit_query_param)
+        if omitted is None:
+            return exclude_fields
+        return list(exclude_fields or ()) + omitted
+
+    def get_requested_fields(self, query_param):
+        """
+        Returns the field names given in ``query_param`` or None if the
+        parameter is missing or not honoured for the current action.
+        """
+        request = getattr(self, 'request', None)
+        if request is None or self.action not in self.sparse_fieldset_actions:
+            return None
+        value = request.query_params.get(query_param)
+        if not value:
+            return None
+        return [name.strip() for name in value.split(',') if name.strip()]
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action in self.sparse_fieldset_actions:
+            queryset = self.restrict_queryset_columns(queryset)
+        return queryset
+
+    def restrict_queryset_columns(self, queryset):
+        """
+        Loads only the columns the serializer renders, plus the ones the
+        paginator orders by, using `.only()`.
+        """
+        query = queryset.query
+        if (queryset._fields is not None or query.select_related
+                or query.deferred_loading[0]):
+            return queryset
+
+        serializer = self.get_serializer()
+        get_model_columns = getattr(serializer, 'get_model_columns', None)
+        columns = get_model_columns() if get_model_columns else None
+        if columns is None:
+            return queryset
+
+        opts = queryset.model._meta
+        ordering = list(query.order_by)
+        paginator = self.paginator
+        if paginator is not None and hasattr(paginator, 'get_ordering'):
+            ordering += paginator.get_ordering(self.request, queryset, self)
+        for order in ordering:
+            if not isinstance(order, str):
+                continue
+            try:
+                field = opts.get_field(order.lstrip('-'))
+            except FieldDoesNotExist:
+                continue
+            if field.concrete:
+                columns.add(field.name)
+        if self.get_conditional_field(queryset.model) is not None:
+            columns.add(self.conditional_field)
+        return queryset.only(*columns)
+
+    def get_conditional_field(self, model):
+        """
+        Returns the field validators are computed from, or None when the
+        current action or ``model`` has none.
+        """
+        if not self.conditional_field or self.action not in self.conditional_actions:
+            return None
+        try:
+            return model._meta.get_field(self.conditional_field)
+        except FieldDoesNotExist:
+            return None
+
+    def get_list_validators(self, queryset):
+        """
+        Returns the ETag and Last-Modified (None) of the list of
+        ``queryset``, using one aggregate query.
+        """
+        if self.get_conditional_field(queryset.model) is None:
+            return None, None
+        aggregates = queryset.order_by().aggregate(
+            last_modified=Max(self.conditional_field), count=Count('pk')
+        )
+        etag = self.get_etag(
+            aggregates['last_modified'], aggregates['count'],
+            self.request.get_full_path(),
+        )
+        return etag, None
+
+    def get_object_validators(self, instance):
+        """
+        Returns the ETag and Last-Modified timestamp of ``instance``.
+        """
+        if self.get_conditional_field(type(instance)) is None:
+            return None, None
+        modified = getattr(instance, self.conditional_field)
+        if modified is None:
+            return None, None
+        etag = self.get_etag(modified, instance.pk, self.request.get_full_path())
+        return etag, int(modified.timestamp())
+
+    def get_etag(self, *parts):
+        """
+        Weak ETag of ``parts`` and the negotiated renderer, as the body
+        itself isn't hashed.
+        """
+        renderer = getattr(self.request, 'accepted_media_type', '')
+        value = '|'.join(str(part) for part in parts + (renderer,))
+        return 'W/"%s"' % hashlib.md5(value.encode()).hexdigest()
+
+    def get_not_modified_response(self, etag, last_modified):
+        """
+        Returns the 304 (or 412) response for a conditional request
+        matching the validators, otherwise None.
+        """
+        response = get_conditional_response(
+            self.request, etag=etag, last_modified=last_modified
+        )
+        if response is not None:
+            self.set_validator_headers(response, etag, last_modified)
+        return response
+
+    def set_validator_headers(self, response, etag, last_modified):
+        if etag is not None:
+            response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def cache_response(self, get_response):
+        """
+        Returns the cached response of the current request, or the one of
+        ``get_response()`` after caching it if successful.
+        """
+        renderer = getattr(self.request, 'accepted_renderer', None)
+        if self.action not in self.response_cache_actions or renderer is None \
+                or renderer.format not in self.response_cache_formats:
+            return get_response()
+
+        response_cache = get_response_cache()
+        label = '{}.{}'.format(
+            getattr(self, 'basename', None) or type(self).__name__, self.action
+        )
+        started = time.perf_counter()
+        key = self.get_response_cache_key(response_cache, label)
+        entry = response_cache.get(key)
+        if entry is not None:
+            response = None
+            if any(entry['validators']):
+                response = self.get_not_modified_response(*entry['validators'])
+            if response is None:
+                response = HttpResponse(
+                    entry['content'], status=entry['status'],
+                    content_type=entry['content_type'],
+                )
+                self.set_validator_headers(response, *entry['validators'])
+            response['X-Cache'] = 'HIT'
+            response_cache.record(label, True, time.perf_counter() - started)
+            return response
+
+        response = get_response()
+        if response.status_code == 200 and not response.streaming:
+            response = self.finalize_response(
+                self.request, response, *self.args, **self.kwargs
+            )
+            with timer('render'):
+                response.render()
+            last_modified = response.get('Last-Modified')
+            response_cache.set(key, {
+                'status': response.status_code,
+                'content': response.content,
+                'content_type': response['Content-Type'],
+                'validators': (
+                    response.get('ETag'),
+                    parse_http_date(last_modified) if last_modified else None,
+                ),
+            }, self.response_cache_timeout)
+        response['X-Cache'] = 'MISS'
+        response_cache.record(label, False, time.perf_counter() - started)
+        return response
+
+    def get_response_cache_key(self, response_cache, label):
+        request = self.request
+        ignored = (self.fields_query_param, self.omit_query_param)
+        fields = self.get_serializer_include_fields()
+        parts = (
+            request.scheme,
+            request.get_host(),
+            sorted(self.kwargs.items()),
+            sorted(
+                (key, values) for key, values in request.query_params.lists()
+                if key not in ignored
+            ),
+            sorted(fields) if fields is not None else None,
+            sorted(self.get_serializer_exclude_fields() or ()),
+            request.accepted_media_type,
+            self.get_response_cache_scope(),
+        )
+        models = [self.get_queryset().model, *self.response_cache_models]
+        return response_cache.make_key(
+            label, response_cache.get_versions(models), parts
+        )
+
+    def get_response_cache_scope(self):
+        user = self.request.user
+        if self.response_cache_scope == 'role':
+            return (user.is_authenticated, user.is_staff, user.is_superuser)
+        return user.pk
 
 
 class ListViewSet(ListModelMixin, BaseViewSet):
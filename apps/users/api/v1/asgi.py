@@ -0,0 +1,67 @@
+"""
+Async versions of the token obtain and user create endpoints, served by
+`apps.core.asgi.AsyncRouter` from ``config/asgi.py``. Password hashing and
+checking run on the password pool while the event loop keeps serving other
+requests.
+"""
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import AUTH_HEADER_TYPES
+
+from apps.core.asgi import database_sync_to_async
+from apps.users import hashing
+from apps.users.api.v1.serializers import (
+    CustomTokenObtainPairSerializer,
+    UserDetailSerializer,
+)
+
+USER = get_user_model()
+
+
+def _get_user(username):
+    try:
+        return USER._default_manager.get_by_natural_key(username)
+    except USER.DoesNotExist:
+        return None
+
+
+async def obtain_token(request):
+    serializer = CustomTokenObtainPairSerializer(context={'request': request})
+    try:
+        attrs = serializer.to_internal_value(request.data)
+    except ValidationError as exc:
+        return Response(exc.detail, status=status.HTTP_400_BAD_REQUEST)
+
+    password = attrs['password']
+    user = await database_sync_to_async(_get_user)(attrs[serializer.username_field])
+    if user is None:
+        # Run the default password hasher once to reduce the timing
+        # difference between an existing and a nonexistent user.
+        await hashing.amake_password(password)
+    elif await hashing.acheck_password(user, password) and user.is_active:
+        data = await database_sync_to_async(
+            CustomTokenObtainPairSerializer.get_token_data
+        )(user)
+        return Response(data, status=status.HTTP_200_OK)
+
+    return Response(
+        {'detail': serializer.error_messages['no_active_account']},
+        status=status.HTTP_401_UNAUTHORIZED,
+        headers={'WWW-Authenticate': '{} realm="api"'.format(AUTH_HEADER_TYPES[0])},
+    )
+
+
+async def create_user(request):
+    serializer = UserDetailSerializer(
+        data=request.data, context={'request': request}
+    )
+    if not await database_sync_to_async(serializer.is_valid)():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    encoded_password = await hashing.amake_password(
+        serializer.validated_data.get('password1')
+    )
+    await database_sync_to_async(serializer.save)(encoded_password=encoded_password)
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -1,12 +1,17 @@
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import update_last_login
 from django.core.validators import FileExtensionValidator
 from django.utils.translation import gettext as _
+from django.db.models import Q
 from rest_framework import serializers
-from rest_framework.validators import UniqueValidator
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, PasswordField
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 
+from apps.core.fields import ImageVariantsField
 from apps.core.serializers import DummySerializer, DynamicFieldsModelSerializer
 from apps.core.validators import validate_attachment
+from apps.users import hashing
+from apps.users.manager import normalize_email_key
 
 USER = get_user_model()
 
@@ -26,6 +31,19 @@ class PasswordChangeSerializer(DummySerializer):
 
 
 class UserDetailSerializer(DynamicFieldsModelSerializer):
+    compiled_read = True
+    unique_contact_messages = {
+        'email': _('You cannot create account with this email address.'),
+        'phone_number': _('You cannot create user with this phone number.'),
+    }
+    # Checked for a whole bulk payload per query.
+    bulk_lookup_batch_size = 500
+
+    profile_picture_variants = ImageVariantsField()
+    # The uploaded file at full resolution, see `Meta.opt_in_fields`.
+    profile_picture_original = serializers.ImageField(
+        source='profile_picture', read_only=True, use_url=True
+    )
 
     class Meta:
         model = USER
@@ -40,7 +58,11 @@ class UserDetailSerializer(DynamicFieldsModelSerializer):
             'is_staff',
             'last_login',
             'profile_picture',
+            'profile_picture_variants',
+            'profile_picture_original',
         )
+        # Only rendered when asked for, e.g. `?fields=id,profile_picture_original`.
+        opt_in_fields = ('profile_picture_original',)
         extra_kwargs = {
             'full_name': {
                 'required': True,
@@ -50,7 +72,10 @@ class UserDetailSerializer(DynamicFieldsModelSerializer):
                 'required': False,
                 'allow_blank': True
             },
+            # Rendered as `profile_picture_variants` and
+            # `profile_picture_original`.
             'profile_picture': {
+                'write_only': True,
                 'required': False,
                 'allow_null': True,
                 'validators': [
@@ -61,14 +86,9 @@ class UserDetailSerializer(DynamicFieldsModelSerializer):
                 ],
                 'use_url': True
             },
+            # Email and phone number uniqueness is checked in `validate`.
             'email': {
-                'validators': [
-                    UniqueValidator(
-                        queryset=USER.objects.all(),
-                        lookup='iexact',
-                        message=_("You cannot create account with this email address.")
-                    )
-                ]
+                'validators': []
             },
             'phone_number': {
                 'validators': []
@@ -96,20 +116,113 @@ class UserDetailSerializer(DynamicFieldsModelSerializer):
                 'Both Password must be same'
             ))
 
+        if not self.is_bulk():
+            self.validate_unique_contacts(attrs)
+        return super().validate(attrs)
+
+    def validate_unique_contacts(self, attrs):
+        """
+        Checks the email (case-insensitively) and the phone number against
+        other users in a single query on the indexed columns.
+        """
+        email = normalize_email_key(attrs.get('email'))
         phone_number = attrs.get('phone_number')
 
-        user_qs = USER.objects.all()
+        conflicts = Q()
+        if email:
+            conflicts |= Q(email_normalized=email)
+        if phone_number:
+            conflicts |= Q(phone_number=phone_number)
+        if not conflicts:
+            return
 
+        user_qs = USER.objects.filter(conflicts)
         if self.instance:
             user_qs = user_qs.exclude(id=self.instance.id)
+        # Phone numbers are unique, so two rows are enough to spot an email
+        # conflict next to a phone one.
+        taken_emails = list(user_qs.values_list('email_normalized', flat=True)[:2])
 
-        if user_qs.filter(phone_number=phone_number).exists():
+        if email in taken_emails:
             raise serializers.ValidationError({
-                'phone_number': _(
-                    'You cannot create user with this phone number.'
-                )
+                'email': self.unique_contact_messages['email']
             })
-        return super().validate(attrs)
+        if taken_emails:
+            raise serializers.ValidationError({
+                'phone_number': self.unique_contact_messages['phone_number']
+            })
+
+    def validate_bulk(self, items):
+        """
+        `validate_unique_contacts` for a whole payload: duplicates within
+        the payload, then conflicts with other users in batched queries.
+        """
+        conflicts = {}
+        claimed = {}
+        for index, (instance, attrs) in items.items():
+            for key in self.get_contact_keys(attrs):
+                if key in claimed:
+                    conflicts.setdefault(index, set()).add(key[0])
+                else:
+                    claimed[key] = index
+
+        keys = list(claimed)
+        for start in range(0, len(keys), self.bulk_lookup_batch_size):
+            batch = keys[start:start + self.bulk_lookup_batch_size]
+            lookup = Q(email_normalized__in=[
+                value for name, value in batch if name == 'email'
+            ]) | Q(phone_number__in=[
+                value for name, value in batch if name == 'phone_number'
+            ])
+            rows = USER.objects.filter(lookup).values_list(
+                'pk', 'email_normalized', 'phone_number'
+            )
+            for pk, email, phone_number in rows:
+                for key in (('email', email), ('phone_number', phone_number)):
+                    index = claimed.get(key)
+                    if index is None:
+                        continue
+                    instance = items[index][0]
+                    if instance is None or instance.pk != pk:
+                        conflicts.setdefault(index, set()).add(key[0])
+
+        errors = {}
+        for index, names in conflicts.items():
+            # The email error wins, as in `validate_unique_contacts`.
+            name = 'email' if 'email' in names else 'phone_number'
+            errors[index] = {name: [self.unique_contact_messages[name]]}
+        return errors
+
+    def get_contact_keys(self, attrs):
+        keys = []
+        email = normalize_email_key(attrs.get('email'))
+        if email:
+            keys.append(('email', email))
+        if attrs.get('phone_number'):
+            keys.append(('phone_number', attrs['phone_number']))
+        return keys
+
+    def get_bulk_instance(self, attrs, instance=None):
+        for field_name in ('password1', 'password2', 'referral_code'):
+            attrs.pop(field_name, None)
+        return super().get_bulk_instance(attrs, instance)
+
+    def prepare_bulk_instances(self, instances, attrs_list):
+        new = [
+            (instance, attrs) for instance, attrs in zip(instances, attrs_list)
+            if instance._state.adding
+        ]
+        passwords = hashing.make_passwords([
+            attrs.get('password1') for instance, attrs in new
+        ])
+        for (instance, attrs), password in zip(new, passwords):
+            instance.password = password
+
+    def create(self, validated_data):
+        password = validated_data.pop('password1', None)
+        validated_data.pop('password2', None)
+        validated_data.pop('referral_code', None)
+        return USER.objects.create_user(password=password, **validated_data)
 
 
 class CustomTokenObtainPairSerializer(DummySerializer, TokenObtainPairSerializer):
@@ -118,3 +231,19 @@ class CustomTokenObtainPairSerializer(DummySerializer, TokenObtainPairSerializer
         data = super().validate(attrs)
         data['user'] = UserDetailSerializer(instance=self.user).data
         return data
+
+    @classmethod
+    def get_token_data(cls, user):
+        """
+        Builds the response of an already authenticated ``user``, as
+        `validate` does.
+        """
+        refresh = cls.get_token(user)
+        data = {
+            'refresh': str(refresh),
+            'access': str(refresh.access_token),
+        }
+        if jwt_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, user)
+        data['user'] = UserDetailSerializer(instance=user).data
+        return data
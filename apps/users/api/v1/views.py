@@ -2,16 +2,20 @@ from django.contrib.auth import get_user_model
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status
 from rest_framework.decorators import action
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
 from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView
 
+from apps.core.mixins import BulkModelMixin, ExportModelMixin
+from apps.core.search import IndexedSearchFilter
 from apps.core.viewsets import CreateListUpdateDestroyViewSet
+from apps.users.authentication import invalidate_cached_users
 from apps.users.api.v1.serializers import (
     UserDetailSerializer,
     CustomTokenObtainPairSerializer, PasswordChangeSerializer
 )
+from apps.users.search import user_search_index
 
 USER = get_user_model()
 
@@ -20,23 +24,37 @@ class CustomTokenViewBase(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
 
 
-class UserViewSet(CreateListUpdateDestroyViewSet):
+class UserViewSet(BulkModelMixin, ExportModelMixin,
+                  CreateListUpdateDestroyViewSet):
     serializer_class = UserDetailSerializer
-    queryset = USER.objects.filter(is_active=True)
+    # Soft deleted users are inactive too, but inactive ones aren't always
+    # soft deleted.
+    queryset = USER.alive_objects.filter(is_active=True)
     permission_class_mapper = {
-        'create': []
+        'create': [],
+        'bulk_create': [IsAdminUser],
+        'bulk_update': [IsAdminUser],
+        'export': [IsAdminUser],
     }
-    filter_backends = (DjangoFilterBackend, OrderingFilter, SearchFilter)
+    filter_backends = (DjangoFilterBackend, OrderingFilter, IndexedSearchFilter)
     search_fields = ['full_name', 'email', 'phone_number']
+    search_index = user_search_index
     filter_fields = ['is_staff', ]
+    response_cache_actions = ('list',)
+    # Every user is listed the same way whoever asks.
+    response_cache_scope = 'role'
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
-        instance.is_active = False
-        instance.save()
+        instance.soft_delete()
 
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def perform_bulk_update(self, instances, fields):
+        # Bulk updates don't send `post_save`.
+        super().perform_bulk_update(instances, fields)
+        invalidate_cached_users(instances)
+
     @action(
         detail=True,
         methods=['put', ],
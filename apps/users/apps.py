@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.core.checks import register
+from django.db.models.signals import post_migrate
 
 
 class UsersConfig(AppConfig):
     name = 'apps.users'
+
+    def ready(self):
+        from apps.users import signals
+        from apps.users.checks import check_user_cache
+
+        post_migrate.connect(signals.ensure_user_search_index, sender=self)
+        register(check_user_cache)
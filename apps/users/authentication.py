@@ -0,0 +1,115 @@
+import copy
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from apps.core.utils.cache import LRUCache
+
+
+class UserCache:
+    """
+    TTL + LRU cache of authenticated users keyed by user id.
+
+    :param backend: ``'local'`` keeps users in process memory, ``'django'``
+        stores them in the Django cache named by ``cache_alias``
+    :param timeout: seconds a user stays cached
+    :param max_size: maximum number of users kept by the local backend
+    """
+    key_prefix = 'auth-user'
+
+    def __init__(self, backend='django', timeout=60, max_size=10000,
+                 cache_alias='default'):
+        self.backend = backend
+        self.timeout = timeout
+        if backend == 'local':
+            self._cache = LRUCache(max_items=max_size, ttl=timeout)
+        else:
+            self._cache = caches[cache_alias]
+
+    def get(self, user_id):
+        user = self._cache.get(self.make_key(user_id))
+        if user is not None and self.backend == 'local':
+            # Every request gets its own copy so nothing set on one
+            # request's user leaks into another one.
+            user = copy.copy(user)
+            user._state = copy.copy(user._state)
+            user._state.fields_cache = {}
+        return user
+
+    def set(self, user_id, user):
+        if self.backend == 'local':
+            self._cache.set(self.make_key(user_id), user)
+        else:
+            self._cache.set(self.make_key(user_id), user, self.timeout)
+
+    def delete(self, user_id):
+        self._cache.delete(self.make_key(user_id))
+
+    def make_key(self, user_id):
+        return '{}:{}'.format(self.key_prefix, user_id)
+
+
+_user_cache = None
+
+
+def get_user_cache():
+    """
+    Returns the user cache configured by the `AUTH_USER_CACHE` setting.
+    """
+    global _user_cache
+    if _user_cache is None:
+        config = getattr(settings, 'AUTH_USER_CACHE', {})
+        _user_cache = UserCache(
+            backend=config.get('BACKEND', 'django'),
+            timeout=config.get('TIMEOUT', 60),
+            max_size=config.get('MAX_SIZE', 10000),
+            cache_alias=config.get('CACHE_ALIAS', 'default'),
+        )
+    return _user_cache
+
+
+def invalidate_cached_users(users, using=None):
+    """
+    Drops ``users`` from the user cache once the current transaction of
+    ``using`` commits, so that a concurrent request can't cache the old rows
+    again meanwhile. Called on every save and delete of a user; call it
+    after queryset updates that bypass signals.
+    """
+    user_ids = [getattr(user, api_settings.USER_ID_FIELD) for user in users]
+
+    def invalidate():
+        user_cache = get_user_cache()
+        for user_id in user_ids:
+            user_cache.delete(user_id)
+    transaction.on_commit(invalidate, using=using)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    `JWTAuthentication` that serves users from `get_user_cache()` instead of
+    querying the users table on every request.
+
+    Only active users are cached and saving or deleting a user drops its
+    entry once the change commits, so a deactivated user is rejected on the
+    next request by every process sharing the cache. With the ``'local'``
+    backend, or a per-process ``CACHES`` entry, other processes keep
+    accepting the user for up to `TIMEOUT` seconds.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        user_cache = get_user_cache()
+        user = user_cache.get(user_id)
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, user)
+        return user
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.checks import Warning
+
+from apps.core.utils.cache import is_process_local_cache
+
+
+def check_user_cache(app_configs, **kwargs):
+    """
+    Warns when `AUTH_USER_CACHE` isn't shared by the workers: a user
+    deactivated or soft deleted through one of them keeps authenticating
+    on the others until its entry expires.
+    """
+    config = getattr(settings, 'AUTH_USER_CACHE', {})
+    if config.get('BACKEND', 'django') != 'local' \
+            and not is_process_local_cache(config.get('CACHE_ALIAS', 'default')):
+        return []
+    return [Warning(
+        'AUTH_USER_CACHE keeps users in the memory of each process.',
+        hint='With several workers, a deactivated user keeps authenticating '
+             'on the others for up to TIMEOUT seconds. Use the "django" '
+             'BACKEND with a CACHE_ALIAS shared by the workers, e.g. memcached.',
+        id='users.W001',
+    )]
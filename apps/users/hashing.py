@@ -0,0 +1,108 @@
+"""
+Password hashing offloaded to a bounded thread pool.
+
+Used by the async endpoints, so that hashing doesn't block the event loop,
+and by `make_passwords` for bulk imports. A single hash in a synchronous
+view is done on the request's thread, as Django does. PBKDF2 releases the
+GIL, so hashes run in parallel on the pool while the queue limit keeps a
+login burst from piling up unbounded work: once the pool is saturated
+callers get `PasswordHashingUnavailable` (HTTP 503).
+"""
+from collections import deque
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from apps.core.utils.executors import BoundedExecutor, ExecutorSaturated
+
+
+class PasswordHashingUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Too many password operations in progress, try again shortly.')
+    default_code = 'password_hashing_unavailable'
+
+
+_password_pool = None
+
+
+def get_password_pool():
+    """
+    Returns the pool configured by the `PASSWORD_HASHING_POOL` setting.
+    """
+    global _password_pool
+    if _password_pool is None:
+        config = getattr(settings, 'PASSWORD_HASHING_POOL', {})
+        _password_pool = BoundedExecutor(
+            max_workers=config.get('MAX_WORKERS', 4),
+            max_queue=config.get('MAX_QUEUE', 64),
+            name='password-hashing',
+        )
+    return _password_pool
+
+
+def _submit(fn, *args):
+    try:
+        return get_password_pool().submit(fn, *args)
+    except ExecutorSaturated:
+        raise PasswordHashingUnavailable()
+
+
+def make_passwords(raw_passwords):
+    """
+    Hashes ``raw_passwords`` in parallel and returns them in the same order.
+
+    At most ``max_workers`` hashes of the batch are on the pool at a time, so
+    a large import neither fills the queue nor holds the slots concurrent
+    logins need.
+    """
+    window = get_password_pool().max_workers
+    encoded = [None] * len(raw_passwords)
+    pending = deque()
+    for index, raw_password in enumerate(raw_passwords):
+        if raw_password is None:
+            # Unusable passwords cost nothing to build.
+            encoded[index] = hashers.make_password(None)
+            continue
+        if len(pending) >= window:
+            done_index, future = pending.popleft()
+            encoded[done_index] = future.result()
+        pending.append((index, _submit(hashers.make_password, raw_password)))
+    for index, future in pending:
+        encoded[index] = future.result()
+    return encoded
+
+
+async def amake_password(raw_password):
+    if raw_password is None:
+        return hashers.make_password(None)
+    return await _run_async(hashers.make_password, raw_password)
+
+
+async def acheck_password(user, raw_password):
+    is_correct = await _run_async(
+        hashers.check_password, raw_password, user.password
+    )
+    if is_correct and _must_update(user.password):
+        user.password = await amake_password(raw_password)
+        await sync_to_async(user.save)(update_fields=['password'])
+    return is_correct
+
+
+async def _run_async(fn, *args):
+    try:
+        return await get_password_pool().run_async(fn, *args)
+    except ExecutorSaturated:
+        raise PasswordHashingUnavailable()
+
+
+def _must_update(encoded):
+    try:
+        hasher = hashers.identify_hasher(encoded)
+    except ValueError:
+        return False
+    preferred = hashers.get_hasher('default')
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
@@ -1,21 +1,66 @@
 from django.contrib.auth.base_user import BaseUserManager
+from django.db import transaction
 
+from apps.core.models import SoftDeleteManager, SoftDeleteQuerySet
 
-class UserManager(BaseUserManager):
+
+def normalize_email_key(email):
+    """
+    Case-folded email used for case-insensitive lookups and uniqueness
+    checks, stored on `User.email_normalized`.
+    """
+    return email.lower() if email else email
+
+
+class UserQuerySet(SoftDeleteQuerySet):
+
+    def bulk_create(self, objs, *args, **kwargs):
+        # Bulk writes skip ``User.save``, which keeps the column in sync.
+        objs = list(objs)
+        for obj in objs:
+            obj.email_normalized = normalize_email_key(obj.email)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        if 'email' in fields and 'email_normalized' not in fields:
+            objs = list(objs)
+            for obj in objs:
+                obj.email_normalized = normalize_email_key(obj.email)
+            fields = [*fields, 'email_normalized']
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def soft_delete(self):
+        # The UPDATE skips the signals dropping the users from the cache.
+        # Imported here, the module needs the user model.
+        from apps.users.authentication import invalidate_cached_users
+
+        with transaction.atomic(using=self.db):
+            users = list(self.alive().only('pk'))
+            count = super().soft_delete()
+            invalidate_cached_users(users, using=self.db)
+        return count
+
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
     use_in_migrations = True
 
     def get_by_natural_key(self, username):
-        case_insensitive_username_field = '{}__iexact'.format(self.model.USERNAME_FIELD)
-        return self.get(**{case_insensitive_username_field: username})
+        return self.get(email_normalized=normalize_email_key(username))
 
-    def _create_user(self, email, password, **extra_fields):
+    def _create_user(self, email, password, encoded_password=None, **extra_fields):
         """
         Creates and saves a User with the given email and password.
+
+        ``encoded_password`` is stored as is when the password has already
+        been hashed, e.g. by the async create endpoint.
         """
         if not email:
             raise ValueError('The given email must be set')
         user = self.model(email=email, **extra_fields)
-        user.set_password(password)
+        if encoded_password is not None:
+            user.password = encoded_password
+        else:
+            user.set_password(password)
         user.save(using=self._db)
         return user
 
@@ -31,3 +76,7 @@ class UserManager(BaseUserManager):
             raise ValueError('Superuser must have is_superuser=True.')
 
         return self._create_user(email, password, **extra_fields)
+
+
+class AliveUserManager(SoftDeleteManager.from_queryset(UserQuerySet)):
+    """Users that aren't soft deleted."""
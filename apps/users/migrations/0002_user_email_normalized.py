@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+
+def backfill_email_normalized(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    users = User.objects.using(schema_editor.connection.alias)
+    batch = []
+    for user in users.only('pk', 'email').iterator():
+        user.email_normalized = user.email.lower() if user.email else user.email
+        batch.append(user)
+        if len(batch) == 1000:
+            users.bulk_update(batch, ['email_normalized'])
+            batch = []
+    users.bulk_update(batch, ['email_normalized'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='email_normalized',
+            field=models.EmailField(db_index=True, editable=False, max_length=254, null=True, verbose_name='normalized email address'),
+        ),
+        migrations.RunPython(backfill_email_normalized, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+import apps.core.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_email_normalized'),
+    ]
+
+    operations = [
+        apps.core.search.CreateSearchIndex(
+            model_name='user',
+            name='users_user_search',
+            fields=['full_name', 'email', 'phone_number'],
+        ),
+    ]
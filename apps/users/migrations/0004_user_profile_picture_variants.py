@@ -0,0 +1,17 @@
+import apps.core.images
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_picture_variants',
+            field=apps.core.images.ImageVariantsField(source='profile_picture'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_deleted_at(apps, schema_editor):
+    # `UserViewSet.destroy` used to only deactivate users.
+    User = apps.get_model('users', 'User')
+    User.objects.using(schema_editor.connection.alias).filter(
+        is_active=False, deleted_at__isnull=True
+    ).update(deleted_at=F('modified_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_user_profile_picture_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_deleted_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(deleted_at__isnull=True), fields=['created_at', 'id'], name='users_user_alive'),
+        ),
+    ]
@@ -2,14 +2,15 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.utils.translation import gettext as _
 
-from apps.core.models import BaseModel
+from apps.core.images import ImageVariantsField
+from apps.core.models import SoftDeleteModel
 from apps.core.utils.helpers import get_upload_path
 from apps.core.validators import validate_phone_number
 from apps.users.constants import GENDER_CHOICES
-from apps.users.manager import UserManager
+from apps.users.manager import AliveUserManager, UserManager, normalize_email_key
 
 
-class User(AbstractUser, BaseModel):
+class User(AbstractUser, SoftDeleteModel):
     username = models.CharField(
         _('username'),
         max_length=150,
@@ -34,12 +35,22 @@ class User(AbstractUser, BaseModel):
             'unique': _("A user with that email already exists."),
         }
     )
+    # Lowercased `email`, kept in sync on save. Case-insensitive lookups use
+    # this indexed column since `email__iexact` can't use the unique index.
+    email_normalized = models.EmailField(
+        _('normalized email address'),
+        null=True,
+        editable=False,
+        db_index=True
+    )
 
     # Below fields are optional
     profile_picture = models.ImageField(
         upload_to=get_upload_path,
         blank=True
     )
+    # Resized copies of `profile_picture`, generated after each upload.
+    profile_picture_variants = ImageVariantsField(source='profile_picture')
 
     phone_number = models.CharField(
         _('phone number'),
@@ -58,10 +69,37 @@ class User(AbstractUser, BaseModel):
     )
 
     objects = UserManager()
+    alive_objects = AliveUserManager()
 
     EMAIL_FIELD = 'email'
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
 
+    class Meta(AbstractUser.Meta, SoftDeleteModel.Meta):
+        pass
+
     def __str__(self):
         return self.full_name or self.email
+
+    @classmethod
+    def get_soft_delete_values(cls):
+        # Soft deleted users can't log in.
+        return {**super().get_soft_delete_values(), 'is_active': False}
+
+    @classmethod
+    def get_restore_values(cls):
+        return {**super().get_restore_values(), 'is_active': True}
+
+    def save(self, *args, **kwargs):
+        if 'email' not in self.get_deferred_fields():
+            self.email_normalized = normalize_email_key(self.email)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'email' in update_fields:
+                update_fields.add('email_normalized')
+            if 'profile_picture' in update_fields:
+                # Reset along with the picture, see `ImageVariantsField`.
+                update_fields.add('profile_picture_variants')
+            kwargs['update_fields'] = update_fields
+        return super().save(*args, **kwargs)
@@ -0,0 +1,5 @@
+from apps.core.search import SearchIndex
+
+user_search_index = SearchIndex(
+    'users.User', 'users_user_search', ['full_name', 'email', 'phone_number']
+)
@@ -0,0 +1,16 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.users.authentication import invalidate_cached_users
+from apps.users.models import User
+from apps.users.search import user_search_index
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, using=None, **kwargs):
+    invalidate_cached_users([instance], using=using)
+
+
+def ensure_user_search_index(sender, using, **kwargs):
+    user_search_index.ensure(using)
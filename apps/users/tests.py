@@ -1,3 +1,504 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import re
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import Group, Permission, update_last_login
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection
+from django.db.models import F
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from apps.core.pagination import KeysetPagination
+from apps.core.response_cache import get_response_cache
+from apps.core.utils.helpers import update_instance
+from apps.users.checks import check_user_cache
+from apps.users.api.v1.views import UserViewSet
+from apps.users.models import User
+
+SET_COLUMN_RE = re.compile(r'"(\w+)" = ')
+
+
+class UserUpdateTests(TestCase):
+    """
+    Updates write the changed columns only, see `BaseModel.save_changes`.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_user('user@example.com', 'secret', full_name='User')
+
+    def setUp(self):
+        self.user = User.objects.get(email='user@example.com')
+
+    def update(self, validated_data):
+        """
+        Returns the columns set by each UPDATE of `update_instance`.
+        """
+        with CaptureQueriesContext(connection) as context:
+            update_instance(self.user, validated_data)
+        updates = []
+        for query in context.captured_queries:
+            if query['sql'].startswith('UPDATE'):
+                set_clause = query['sql'].split(' SET ', 1)[1].split(' WHERE ', 1)[0]
+                updates.append(set(SET_COLUMN_RE.findall(set_clause)))
+        return updates, context.captured_queries
+
+    def test_unchanged_values_are_not_saved(self):
+        _, queries = self.update({'full_name': 'User', 'email': 'user@example.com'})
+        self.assertEqual(queries, [])
+
+    def test_rename_writes_full_name(self):
+        updates, _ = self.update({'full_name': 'Renamed'})
+        self.assertEqual(updates, [{'full_name', 'modified_at'}])
+        self.assertEqual(User.objects.get(pk=self.user.pk).full_name, 'Renamed')
+        self.assertEqual(self.user.get_dirty_fields(), [])
+
+    def test_email_change_writes_normalized_email(self):
+        updates, _ = self.update({'email': 'Changed@Example.com'})
+        self.assertEqual(updates, [{'email', 'email_normalized', 'modified_at'}])
+        self.assertEqual(
+            User.objects.get(pk=self.user.pk).email_normalized, 'changed@example.com'
+        )
+
+    def test_picture_change_resets_variants(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (40, 40), 'red').save(buffer, 'PNG')
+        picture = SimpleUploadedFile('picture.png', buffer.getvalue(), 'image/png')
+
+        updates, _ = self.update({'profile_picture': picture})
+        self.assertEqual(
+            updates, [{'profile_picture', 'profile_picture_variants', 'modified_at'}]
+        )
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual(user.profile_picture.name, self.user.profile_picture.name)
+        self.assertEqual(user.profile_picture_variants, {
+            'source': self.user.profile_picture.name, 'variants': {},
+        })
+        self.assertEqual(self.user.get_dirty_fields(), [])
+
+
+class UserAPITestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin@example.com', 'secret')
+
+    def setUp(self):
+        # Entries and model versions outlive the rolled back test data.
+        for cache in caches.all():
+            cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+
+class UserListPaginationTests(UserAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for index in range(7):
+            User.objects.create_user(
+                'user{}@example.com'.format(index), 'secret',
+                # Every third user has no name, to sort NULLs.
+                full_name=None if index % 3 == 0 else 'User {}'.format(index % 4),
+            )
+
+    def get_pages(self, url):
+        ids = []
+        pages = 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row['id'] for row in response.json()['results'])
+            url = response.json()['next']
+            pages += 1
+        return ids, pages
+
+    def get_previous_pages(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            ids[:0] = [row['id'] for row in response.json()['results']]
+            url = response.json()['previous']
+        return ids
+
+    def test_default_ordering(self):
+        ids, pages = self.get_pages('/api/v1/user/?page_size=3')
+        expected = list(
+            User.alive_objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 3)
+
+    def test_nullable_ordering(self):
+        for ordering, expected in [
+            ('full_name', User.alive_objects.order_by(
+                F('full_name').asc(nulls_first=True), 'id')),
+            ('-full_name', User.alive_objects.order_by(
+                F('full_name').desc(nulls_last=True), '-id')),
+        ]:
+            with self.subTest(ordering):
+                ids, _ = self.get_pages(
+                    '/api/v1/user/?page_size=2&ordering=' + ordering
+                )
+                self.assertEqual(ids, list(expected.values_list('id', flat=True)))
+
+    def test_previous_links(self):
+        url = '/api/v1/user/?page_size=3&ordering=full_name'
+        ids, _ = self.get_pages(url)
+        while True:
+            response = self.client.get(url)
+            if response.json()['next'] is None:
+                break
+            url = response.json()['next']
+        last_page = [row['id'] for row in response.json()['results']]
+        self.assertEqual(
+            self.get_previous_pages(response.json()['previous']) + last_page, ids
+        )
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/v1/user/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+
+class UserConditionalRequestTests(UserAPITestCase):
+    url = '/api/v1/user/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = User.objects.create_user('user@example.com', 'secret')
+
+    def get_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_not_modified(self):
+        etag = self.get_etag()
+        for headers in [{'HTTP_IF_NONE_MATCH': etag}, {'HTTP_IF_NONE_MATCH': '*'}]:
+            with self.subTest(headers):
+                response = self.client.get(self.url, **headers)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+                self.assertEqual(response.content, b'')
+
+        # Other pages, filters or renderers are other representations.
+        response = self.client.get(self.url + '?page_size=1', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_partial_save_changes_etag(self):
+        etag = self.get_etag()
+        update_last_login(None, self.user)
+        # As on commit, which never comes in a TestCase.
+        get_response_cache().invalidate([User])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_deleted_user_changes_etag(self):
+        etag = self.get_etag()
+        User.objects.filter(pk=self.user.pk).soft_delete()
+        get_response_cache().invalidate([User])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+# The cached responses are dropped on commit, which never comes in a
+# TestCase.
+class UserResponseCacheTests(TransactionTestCase):
+    url = '/api/v1/user/'
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.admin = User.objects.create_superuser('admin@example.com', 'secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def get_list(self, cache_status):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Cache'], cache_status)
+        return sorted(row['email'] for row in response.json()['results'])
+
+    def test_hit(self):
+        emails = self.get_list('MISS')
+        self.assertEqual(self.get_list('HIT'), emails)
+
+    def test_invalidated_on_save(self):
+        self.get_list('MISS')
+        User.objects.create_user('user@example.com', 'secret')
+        self.assertIn('user@example.com', self.get_list('MISS'))
+        self.assertIn('user@example.com', self.get_list('HIT'))
+
+    def test_invalidated_on_soft_delete(self):
+        user = User.objects.create_user('user@example.com', 'secret')
+        self.get_list('MISS')
+        User.objects.filter(pk=user.pk).soft_delete()
+        self.assertNotIn('user@example.com', self.get_list('MISS'))
+
+    def test_invalidated_on_bulk_create(self):
+        self.get_list('MISS')
+        response = self.client.post(self.url + 'bulk/', [{
+            'email': 'bulk@example.com', 'full_name': 'Bulk',
+            'password1': 'secret1', 'password2': 'secret1',
+        }], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('bulk@example.com', self.get_list('MISS'))
+
+    def test_scope(self):
+        self.get_list('MISS')
+        staff = User.objects.create_user('staff@example.com', 'secret', is_staff=True)
+        self.get_list('MISS')
+        self.client.force_authenticate(staff)
+        # Another role, another entry.
+        self.get_list('MISS')
+
+
+class UserSoftDeleteTests(UserAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = User.objects.create_user('user@example.com', 'secret')
+
+    def get_listed_emails(self):
+        response = self.client.get('/api/v1/user/')
+        return [row['email'] for row in response.json()['results']]
+
+    def test_destroy(self):
+        response = self.client.delete('/api/v1/user/{}/'.format(self.user.pk))
+        self.assertEqual(response.status_code, 204)
+        user = User.objects.get(pk=self.user.pk)
+        self.assertTrue(user.is_deleted)
+        self.assertFalse(user.is_active)
+        self.assertFalse(User.alive_objects.filter(pk=user.pk).exists())
+        self.assertNotIn('user@example.com', self.get_listed_emails())
+        response = self.client.delete('/api/v1/user/{}/'.format(self.user.pk))
+        self.assertEqual(response.status_code, 404)
+
+    def test_inactive_user_not_listed(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assertNotIn('user@example.com', self.get_listed_emails())
+
+    def test_restore(self):
+        self.user.soft_delete()
+        self.user.restore()
+        user = User.alive_objects.get(pk=self.user.pk)
+        self.assertTrue(user.is_active)
+        self.assertIsNone(user.deleted_at)
+
+    def test_queryset_soft_delete(self):
+        count = User.objects.filter(pk=self.user.pk).soft_delete()
+        self.assertEqual(count, 1)
+        self.assertEqual(User.objects.filter(pk=self.user.pk).soft_delete(), 0)
+        self.assertFalse(User.objects.get(pk=self.user.pk).is_active)
+
+
+class PurgeSoftDeletedTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alive = User.objects.create_user('alive@example.com', 'secret')
+        cls.recent = User.objects.create_user('recent@example.com', 'secret')
+        cls.old = [
+            User.objects.create_user('old{}@example.com'.format(index), 'secret')
+            for index in range(3)
+        ]
+        User.objects.filter(pk=cls.recent.pk).soft_delete()
+        User.objects.filter(pk__in=[user.pk for user in cls.old]).update(
+            deleted_at=timezone.now() - timedelta(days=31)
+        )
+
+    def purge(self, **options):
+        stdout = io.StringIO()
+        options.setdefault('model', ['users.User'])
+        call_command('purge_soft_deleted', sleep=0, stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def test_purge(self):
+        output = self.purge(batch_size=2)
+        self.assertIn('users.User: 3 rows purged', output)
+        self.assertEqual(
+            set(User.objects.values_list('email', flat=True)),
+            {'alive@example.com', 'recent@example.com'},
+        )
+
+    def test_dry_run(self):
+        output = self.purge(dry_run=True)
+        self.assertIn('users.User: 3 rows to purge', output)
+        self.assertEqual(User.objects.count(), 5)
+
+    def test_archive(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = directory + '/users.ndjson.gz'
+        self.purge(archive=path)
+        with gzip.open(path, 'rt', encoding='utf-8') as archive:
+            rows = [json.loads(line) for line in archive]
+        self.assertEqual(
+            sorted(row['fields']['email'] for row in rows),
+            ['old0@example.com', 'old1@example.com', 'old2@example.com'],
+        )
+
+    def test_not_a_soft_delete_model(self):
+        with self.assertRaises(CommandError):
+            self.purge(model=['auth.Group'])
+
+
+class UserBulkCreateTests(UserAPITestCase):
+    url = '/api/v1/user/bulk/'
+
+    def get_item(self, index, **kwargs):
+        item = {
+            'email': 'bulk{}@example.com'.format(index),
+            'full_name': 'Bulk {}'.format(index),
+            'password1': 'secret1',
+            'password2': 'secret1',
+        }
+        item.update(kwargs)
+        return item
+
+    def get_items(self):
+        return [
+            self.get_item(0),
+            self.get_item(1, email='admin@example.com'),
+            self.get_item(2),
+            self.get_item(3, email='race@example.com'),
+        ]
+
+    def fail_race(self):
+        """
+        Makes the write of the chunk holding ``race@example.com`` fail, as
+        when another request takes the email after validation.
+        """
+        perform_bulk_create = UserViewSet.perform_bulk_create
+
+        def side_effect(viewset, instances):
+            if any(instance.email == 'race@example.com' for instance in instances):
+                raise IntegrityError
+            perform_bulk_create(viewset, instances)
+        return mock.patch.object(UserViewSet, 'perform_bulk_create', side_effect)
+
+    def get_errors(self, response):
+        return {
+            error['index']: error['errors'] for error in response.json()['errors']
+        }
+
+    def get_bulk_emails(self):
+        return set(
+            User.objects.filter(email__startswith='bulk').values_list('email', flat=True)
+        )
+
+    def test_batch_invalid_item(self):
+        response = self.client.post(self.url, self.get_items(), format='json')
+        self.assertEqual(response.status_code, 400)
+        errors = self.get_errors(response)
+        self.assertEqual(sorted(errors), [0, 1, 2, 3])
+        self.assertIn('email', errors[1])
+        rolled_back = {'non_field_errors': [
+            UserViewSet.bulk_error_messages['rolled_back']
+        ]}
+        self.assertEqual([errors[0], errors[2], errors[3]], [rolled_back] * 3)
+        self.assertEqual(self.get_bulk_emails(), set())
+
+    def test_batch_conflict(self):
+        items = [item for index, item in enumerate(self.get_items()) if index != 1]
+        with self.fail_race():
+            response = self.client.post(
+                self.url + '?chunk_size=2', items, format='json'
+            )
+        self.assertEqual(response.status_code, 400)
+        errors = self.get_errors(response)
+        messages = UserViewSet.bulk_error_messages
+        self.assertEqual(errors, {
+            0: {'non_field_errors': [messages['rolled_back']]},
+            1: {'non_field_errors': [messages['rolled_back']]},
+            2: {'non_field_errors': [messages['conflict']]},
+        })
+        self.assertEqual(self.get_bulk_emails(), set())
+
+    def test_chunk_mode(self):
+        with self.fail_race():
+            response = self.client.post(
+                self.url + '?transaction=chunk&chunk_size=1',
+                self.get_items(), format='json',
+            )
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(
+            [row['email'] for row in response.json()['results']],
+            ['bulk0@example.com', 'bulk2@example.com'],
+        )
+        errors = self.get_errors(response)
+        self.assertEqual(sorted(errors), [1, 3])
+        self.assertIn('email', errors[1])
+        self.assertEqual(errors[3], {'non_field_errors': [
+            UserViewSet.bulk_error_messages['conflict']
+        ]})
+        self.assertEqual(
+            self.get_bulk_emails(), {'bulk0@example.com', 'bulk2@example.com'}
+        )
+        self.assertTrue(
+            User.objects.get(email='bulk0@example.com').check_password('secret1')
+        )
+
+
+class KeysetPaginationDefaultOrderingTests(TestCase):
+
+    def test_model_ordering(self):
+        pagination = KeysetPagination()
+        self.assertEqual(
+            pagination.get_default_ordering(Permission),
+            tuple(Permission._meta.ordering),
+        )
+        self.assertEqual(pagination.get_default_ordering(User), ('-created_at',))
+        self.assertEqual(pagination.get_default_ordering(Group), ('-pk',))
+
+
+class UserCacheCheckTests(SimpleTestCase):
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }})
+    def test_process_local_cache(self):
+        self.assertEqual([error.id for error in check_user_cache(None)], ['users.W001'])
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+    }})
+    def test_shared_cache(self):
+        self.assertEqual(check_user_cache(None), [])
+        with self.settings(AUTH_USER_CACHE={'BACKEND': 'local'}):
+            self.assertEqual(len(check_user_cache(None)), 1)
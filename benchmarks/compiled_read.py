@@ -0,0 +1,64 @@
+"""
+Compares the compiled read path of `UserDetailSerializer` with regular
+serialization of the same rows.
+
+    python -m benchmarks.compiled_read --rows 10000
+"""
+import argparse
+import json
+
+from benchmarks.utils import (
+    create_test_database, destroy_test_database, measure, seed_users,
+    setup_django, summarize,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    old_name = create_test_database()
+    try:
+        run(args.rows, args.repeat)
+    finally:
+        destroy_test_database(old_name)
+
+
+def run(rows, repeat):
+    from django.contrib.auth import get_user_model
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from apps.users.api.v1.serializers import UserDetailSerializer
+
+    seed_users(rows)
+    queryset = get_user_model().objects.order_by('id')
+    request = Request(APIRequestFactory().get('/api/v1/user/'))
+    serializer = UserDetailSerializer(context={'request': request})
+    reader = serializer.get_compiled_reader()
+
+    def regular():
+        return UserDetailSerializer(
+            list(queryset), many=True, context={'request': request}
+        ).data
+
+    def compiled():
+        convert = reader.bind(serializer)
+        return [convert(row) for row in queryset.values(*reader.columns)]
+
+    assert json.dumps(regular()) == json.dumps(compiled()), \
+        'Compiled output differs from the serializer output'
+
+    regular_timings = summarize(measure(regular, repeat))
+    compiled_timings = summarize(measure(compiled, repeat))
+    print(f'{rows} rows, best of {repeat}')
+    print(f"  serializer: {regular_timings['min'] * 1000:8.1f} ms")
+    print(f"  compiled:   {compiled_timings['min'] * 1000:8.1f} ms")
+    print(f"  speedup:    {regular_timings['min'] / compiled_timings['min']:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Compares reading dotted attribute paths from rows with the former
+``reduce`` based `nested_getattr`, the current `nested_getattr` (cached
+accessors), an accessor got once per column (`get_attribute_accessor`) and
+`nested_getattr_many`.
+
+    python -m benchmarks.nested_getattr --rows 100000
+"""
+import argparse
+from functools import reduce
+from types import SimpleNamespace
+
+from benchmarks.utils import measure, setup_django, summarize
+
+PATHS = ('id', 'user.full_name', 'user.profile.city', 'user.get_initials')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    run(args.rows, args.repeat)
+
+
+def reduce_nested_getattr(instance, attributes, separator='.', default=None, call=True):
+    # `nested_getattr` before it was compiled.
+    nested_attrs = attributes.split(separator)
+    nested_attrs.insert(0, instance)
+    try:
+        attr = reduce(
+            lambda instance_, attribute_: getattr(instance_, attribute_),
+            nested_attrs
+        )
+        if call and callable(attr):
+            return attr()
+        return attr
+    except AttributeError:
+        return default
+
+
+def get_rows(count):
+    rows = []
+    for index in range(count):
+        # Every tenth row has no profile, so that defaults are exercised.
+        profile = SimpleNamespace(city=f'City {index % 50}') if index % 10 else None
+        user = SimpleNamespace(
+            full_name=f'User {index}', profile=profile,
+            get_initials=lambda index=index: f'U{index}',
+        )
+        rows.append(SimpleNamespace(id=index, user=user))
+    return rows
+
+
+def run(count, repeat):
+    from apps.core.utils.helpers import (
+        get_attribute_accessor, nested_getattr, nested_getattr_many,
+    )
+
+    rows = get_rows(count)
+
+    def reduce_based():
+        return [tuple(reduce_nested_getattr(row, path) for path in PATHS) for row in rows]
+
+    def cached():
+        return [tuple(nested_getattr(row, path) for path in PATHS) for row in rows]
+
+    def accessors():
+        getters = [get_attribute_accessor(path) for path in PATHS]
+        return [tuple(getter(row) for getter in getters) for row in rows]
+
+    def many():
+        return nested_getattr_many(rows, PATHS)
+
+    variants = {
+        'reduce': reduce_based,
+        'nested_getattr': cached,
+        'accessors': accessors,
+        'many': many,
+    }
+    expected = reduce_based()
+    for name, variant in variants.items():
+        assert variant() == expected, f'{name} differs from the reduce based values'
+
+    timings = {name: summarize(measure(variant, repeat)) for name, variant in variants.items()}
+    baseline = timings['reduce']['min']
+    print(f'{count} rows x {len(PATHS)} paths, best of {repeat}')
+    for name, timing in timings.items():
+        per_value = timing['min'] / (count * len(PATHS)) * 1e9
+        print(f"  {name:15} {timing['min'] * 1000:8.1f} ms  {per_value:6.0f} ns/value  "
+              f"{baseline / timing['min']:5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
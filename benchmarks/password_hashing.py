@@ -0,0 +1,51 @@
+"""
+Compares hashing passwords one after the other with hashing them on the
+password pool, and reports the pool's latency percentiles.
+
+    python -m benchmarks.password_hashing --passwords 64
+"""
+import argparse
+import time
+
+from benchmarks.utils import setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--passwords', type=int, default=64)
+    args = parser.parse_args()
+
+    setup_django()
+    run(args.passwords)
+
+
+def run(count):
+    from django.contrib.auth import hashers
+
+    from apps.users import hashing
+
+    pool = hashing.get_password_pool()
+    raw_passwords = [f'password-{index}' for index in range(count)]
+
+    started = time.perf_counter()
+    for raw_password in raw_passwords:
+        hashers.make_password(raw_password)
+    sequential = time.perf_counter() - started
+
+    # Stay within the queue limit so no hash is rejected.
+    batch_size = pool.max_workers + pool.max_queue
+    started = time.perf_counter()
+    for offset in range(0, count, batch_size):
+        hashing.make_passwords(raw_passwords[offset:offset + batch_size])
+    pooled = time.perf_counter() - started
+
+    latency = pool.stats()['latency_ms']
+    print(f'{count} passwords, {pool.max_workers} workers')
+    print(f'  sequential: {count / sequential:8.1f} hashes/s')
+    print(f'  pool:       {count / pooled:8.1f} hashes/s')
+    print(f"  latency:    p50 {latency['p50']:.1f} ms, "
+          f"p95 {latency['p95']:.1f} ms, p99 {latency['p99']:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
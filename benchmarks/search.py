@@ -0,0 +1,90 @@
+"""
+Compares ``?search=`` on the user list through `SearchFilter` (icontains
+scans) with `IndexedSearchFilter`, reporting latency percentiles of the
+first page.
+
+    python -m benchmarks.search --rows 1000000 --queries 200
+"""
+import argparse
+import random
+
+from benchmarks.utils import (
+    create_test_database, destroy_test_database, measure, seed_users,
+    setup_django,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    old_name = create_test_database()
+    try:
+        run(args.rows, args.queries)
+    finally:
+        destroy_test_database(old_name)
+
+
+def get_search_terms(rows, count):
+    generator = random.Random(0)
+    kinds = [
+        lambda index: f'user{index}@',
+        lambda index: f'User {index}',
+        lambda index: f'98{index:08d}'[:7],
+        lambda index: f'{index}',
+        lambda index: 'nobody',
+    ]
+    return [
+        generator.choice(kinds)(generator.randrange(rows))
+        for _ in range(count)
+    ]
+
+
+def run(rows, queries):
+    from django.contrib.auth import get_user_model
+    from rest_framework.filters import SearchFilter
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    from apps.core.utils.stats import RollingWindow
+    from apps.users.api.v1.views import UserViewSet
+
+    seed_users(rows)
+    admin = get_user_model().objects.create_superuser('admin@example.com', 'password')
+    factory = APIRequestFactory()
+    terms = get_search_terms(rows, queries)
+
+    filter_backends = [
+        backend for backend in UserViewSet.filter_backends
+        if not issubclass(backend, SearchFilter)
+    ]
+    # Repeated terms must not be answered by the response cache.
+    views = {
+        'icontains': UserViewSet.as_view(
+            {'get': 'list'}, filter_backends=(*filter_backends, SearchFilter),
+            response_cache_actions=(),
+        ),
+        'indexed': UserViewSet.as_view({'get': 'list'}, response_cache_actions=()),
+    }
+
+    print(f'{rows} users, {queries} searches')
+    for name, view in views.items():
+        window = RollingWindow(size=queries)
+
+        def search(term):
+            request = factory.get('/api/v1/user/', {'search': term})
+            force_authenticate(request, user=admin)
+            response = view(request)
+            assert response.status_code == 200, response.data
+
+        for term in terms:
+            window.add(measure(lambda: search(term), repeat=1)[0])
+        summary = window.summary(scale=1000)
+        print(f"  {name:10} p50 {summary['p50']:8.1f} ms  "
+              f"p95 {summary['p95']:8.1f} ms  p99 {summary['p99']:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
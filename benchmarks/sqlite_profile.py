@@ -0,0 +1,135 @@
+"""
+Compares the throughput of concurrent reads and writes on a SQLite file
+under each profile of the `SQLITE` setting (`apps.core.db.sqlite`).
+
+Readers fetch single users and pages of the user list while writers update
+users, each thread on its own connection, for ``--seconds`` per profile.
+
+    python -m benchmarks.sqlite_profile --readers 8 --writers 2 --seconds 10
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from benchmarks.utils import (
+    create_test_database, destroy_test_database, seed_users, setup_django,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--profiles', default='default,performance')
+    args = parser.parse_args()
+
+    setup_django()
+    from apps.core.db.sqlite import PROFILES
+
+    profiles = [name for name in args.profiles.split(',') if name]
+    unknown = set(profiles) - set(PROFILES)
+    if unknown:
+        parser.error('unknown profiles: %s' % ', '.join(sorted(unknown)))
+
+    print(f'{args.rows} users, {args.readers} readers, {args.writers} writers, '
+          f'{args.seconds:g} s per profile')
+    for profile in profiles:
+        print_result(profile, run_profile(profile, args))
+
+
+def run_profile(profile, args):
+    from django.conf import settings
+    from django.db import connections
+
+    settings.SQLITE = {**settings.SQLITE, 'PROFILE': profile}
+    # A file per profile: the journal mode persists in the database.
+    name = os.path.join(tempfile.gettempdir(), f'benchmark-sqlite-{profile}.sqlite3')
+    old_name = create_test_database(name)
+    try:
+        seed_users(args.rows)
+        connections.close_all()
+        return run(args)
+    finally:
+        destroy_test_database(old_name)
+        for suffix in ('-wal', '-shm'):
+            if os.path.exists(name + suffix):
+                os.remove(name + suffix)
+
+
+def run(args):
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+
+    user_model = get_user_model()
+    pks = list(user_model.objects.values_list('pk', flat=True))
+    connection.close()
+
+    def read(generator):
+        if generator.random() < 0.5:
+            list(user_model.objects.filter(pk=generator.choice(pks)).values())
+        else:
+            offset = generator.randrange(len(pks))
+            list(user_model.objects.order_by('pk').values()[offset:offset + 20])
+
+    def write(generator):
+        user_model.objects.filter(pk=generator.choice(pks)).update(
+            full_name=f'Updated {generator.random()}'
+        )
+
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+    start = threading.Barrier(args.readers + args.writers)
+
+    def worker(operation, counter, seed):
+        generator = random.Random(seed)
+        done = errors = 0
+        start.wait()
+        try:
+            while time.perf_counter() < deadline:
+                try:
+                    operation(generator)
+                except Exception:
+                    # e.g. "database is locked" past the busy timeout.
+                    errors += 1
+                else:
+                    done += 1
+        finally:
+            connection.close()
+        with lock:
+            counts[counter] += done
+            counts['errors'] += errors
+
+    threads = [
+        threading.Thread(target=worker, args=(read, 'reads', index))
+        for index in range(args.readers)
+    ] + [
+        threading.Thread(target=worker, args=(write, 'writes', -1 - index))
+        for index in range(args.writers)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {
+        'reads_per_second': counts['reads'] / elapsed,
+        'writes_per_second': counts['writes'] / elapsed,
+        'errors': counts['errors'],
+    }
+
+
+def print_result(profile, result):
+    print(f"  {profile:12} reads {result['reads_per_second']:9.1f}/s  "
+          f"writes {result['writes_per_second']:9.1f}/s  "
+          f"errors {result['errors']}")
+
+
+if __name__ == '__main__':
+    main()
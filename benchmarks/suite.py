@@ -0,0 +1,335 @@
+"""
+Benchmarks the user API hot paths through the Django test client (WSGI)
+and in process through ``config.asgi.application`` (ASGI), on a SQLite
+database seeded with ``--users`` users.
+
+Throughput and latency percentiles per client and scenario are printed and
+written to ``--output`` as JSON. Given a ``--baseline`` file from an
+earlier run, the run fails when a tracked metric regresses by more than
+``--threshold`` (a fraction) or when requests fail.
+
+    python -m benchmarks.suite --users 100000 --output after.json \\
+        --baseline before.json --threshold 0.2
+"""
+import argparse
+import json
+import platform
+import sqlite3
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+from benchmarks.utils import (
+    ASGIClient, create_test_database, destroy_test_database, seed_users,
+    setup_django,
+)
+
+CLIENTS = ('wsgi', 'asgi')
+
+# Name: (view action or None, expected status, uses --slow-requests,
+# authenticated). Soft delete comes last as it deactivates users.
+SCENARIOS = {
+    'token': (None, 200, True, False),
+    'list': ('list', 200, False, True),
+    'search': ('list', 200, False, True),
+    'retrieve': ('retrieve', 200, False, True),
+    'create': ('create', 201, True, False),
+    'update': ('partial_update', 200, False, True),
+    'soft_delete': ('destroy', 204, False, True),
+}
+
+# Metric: whether higher values are better.
+TRACKED_METRICS = {
+    'p95_ms': False,
+    'throughput_rps': True,
+}
+
+PASSWORD = 'password'
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--users', type=int, default=10000,
+                        help='users seeded, e.g. 10000, 100000 or 1000000')
+    parser.add_argument('--requests', type=int, default=200,
+                        help='requests per scenario and client')
+    parser.add_argument('--slow-requests', type=int, default=20,
+                        help='requests of the password hashing scenarios')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='requests in flight at once on the ASGI client')
+    parser.add_argument('--clients', default=','.join(CLIENTS))
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--response-cache', action='store_true',
+                        help="keep the views' response cache enabled")
+    parser.add_argument('--database', default=os.path.join(
+                            tempfile.gettempdir(), 'benchmark-suite.sqlite3'),
+                        help='SQLite file seeded for the run and deleted after')
+    parser.add_argument('--output', help='JSON file to write the results to')
+    parser.add_argument('--baseline', help='JSON results to compare with')
+    parser.add_argument('--threshold', type=float, default=0.2)
+    args = parser.parse_args()
+
+    clients = [name for name in args.clients.split(',') if name]
+    scenarios = [name for name in args.scenarios.split(',') if name]
+    unknown = set(clients) - set(CLIENTS) | set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error('unknown clients or scenarios: %s' % ', '.join(sorted(unknown)))
+
+    setup_django()
+    # A file rather than the in-memory test database, whose shared cache
+    # fails concurrent writes instead of waiting for the lock.
+    old_name = create_test_database(args.database)
+    try:
+        results = run(args, clients, scenarios)
+    finally:
+        destroy_test_database(old_name)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+
+    failures = get_errors(results)
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            failures += compare(json.load(baseline), results, args.threshold)
+    if failures:
+        print('\nFAILED')
+        for failure in failures:
+            print('  ' + failure)
+        sys.exit(1)
+
+
+def get_metadata(args):
+    import django
+
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'users': args.users,
+        'requests': args.requests,
+        'slow_requests': args.slow_requests,
+        'concurrency': args.concurrency,
+        'response_cache': args.response_cache,
+    }
+
+
+def run(args, clients, scenarios):
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from apps.users.api.v1.views import UserViewSet
+    from config.asgi import application
+
+    settings.ALLOWED_HOSTS = ['testserver']
+    if not args.response_cache:
+        UserViewSet.response_cache_actions = ()
+
+    started = time.perf_counter()
+    seed_users(args.users)
+    user_model = get_user_model()
+    admin = user_model.objects.create_superuser('admin@example.com', PASSWORD)
+    print(f'{args.users} users seeded in {time.perf_counter() - started:.1f} s')
+
+    authorization = 'Bearer {}'.format(AccessToken.for_user(admin))
+    # Every client updates and deactivates users of its own.
+    pks = list(
+        user_model.objects.exclude(pk=admin.pk).order_by('pk')
+        .values_list('pk', flat=True)[:args.requests * len(clients)]
+    )
+
+    results = {'meta': get_metadata(args), 'results': {}}
+    for index, client_name in enumerate(clients):
+        client_pks = pks[index::len(clients)]
+        # Senders of anonymous and authenticated requests.
+        if client_name == 'wsgi':
+            authenticated_client = APIClient()
+            authenticated_client.credentials(HTTP_AUTHORIZATION=authorization)
+            senders = {
+                False: get_wsgi_sender(APIClient()),
+                True: get_wsgi_sender(authenticated_client),
+            }
+        else:
+            asgi_clients = [
+                ASGIClient(application),
+                ASGIClient(application, {'Authorization': authorization}),
+            ]
+            senders = {
+                authenticated: get_asgi_sender(client, args.concurrency)
+                for authenticated, client in enumerate(asgi_clients)
+            }
+
+        client_results = results['results'][client_name] = {}
+        for scenario in scenarios:
+            action, expected_status, slow, authenticated = SCENARIOS[scenario]
+            if action is not None and not hasattr(UserViewSet, action):
+                client_results[scenario] = {
+                    'skipped': f'UserViewSet has no {action} action',
+                }
+                continue
+            count = args.slow_requests if slow else args.requests
+            requests = get_requests(scenario, count, client_name, client_pks, args.users)
+            samples, elapsed = senders[authenticated](requests)
+            client_results[scenario] = summarize_samples(
+                samples, elapsed, expected_status
+            )
+        if client_name == 'asgi':
+            for client in asgi_clients:
+                client.close()
+        print_results(client_name, client_results)
+    return results
+
+
+def get_requests(scenario, count, client_name, pks, users):
+    """
+    Returns ``count`` requests of ``scenario`` as ``(method, path, data)``.
+    """
+    from benchmarks.search import get_search_terms
+
+    if scenario == 'token':
+        # Users at the end of the table, which no client deactivates.
+        return [
+            ('POST', '/api/v1/user/get-token/', {
+                'email': f'user{users - 1 - index % users}@example.com',
+                'password': PASSWORD,
+            })
+            for index in range(count)
+        ]
+    if scenario == 'list':
+        return [('GET', '/api/v1/user/', None)] * count
+    if scenario == 'search':
+        return [
+            ('GET', '/api/v1/user/?' + urlencode({'search': term}), None)
+            for term in get_search_terms(users, count)
+        ]
+    if scenario == 'retrieve':
+        return [('GET', f'/api/v1/user/{pk}/', None) for pk in pks[:count]]
+    if scenario == 'create':
+        return [
+            ('POST', '/api/v1/user/', {
+                'full_name': f'Bench {client_name} {index}',
+                'email': f'bench-{client_name}-{index}@example.com',
+                'password1': 'BenchPassword-1',
+                'password2': 'BenchPassword-1',
+            })
+            for index in range(count)
+        ]
+    if scenario == 'update':
+        return [
+            ('PATCH', f'/api/v1/user/{pk}/', {'full_name': f'Updated {index}'})
+            for index, pk in enumerate(pks[:count])
+        ]
+    if scenario == 'soft_delete':
+        return [('DELETE', f'/api/v1/user/{pk}/', None) for pk in pks[:count]]
+    raise ValueError(scenario)
+
+
+def get_wsgi_sender(client):
+    def send(requests):
+        samples = []
+        started = time.perf_counter()
+        for method, path, data in requests:
+            request_started = time.perf_counter()
+            response = getattr(client, method.lower())(path, data, format='json')
+            samples.append((response.status_code, time.perf_counter() - request_started))
+        return samples, time.perf_counter() - started
+    return send
+
+
+def get_asgi_sender(client, concurrency):
+    def send(requests):
+        return client.run(requests, concurrency=concurrency)
+    return send
+
+
+def summarize_samples(samples, elapsed, expected_status):
+    from apps.core.utils.stats import RollingWindow
+
+    window = RollingWindow(size=len(samples) or 1)
+    errors = 0
+    for status, duration in samples:
+        window.add(duration)
+        if status != expected_status:
+            errors += 1
+    summary = window.summary(scale=1000)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'throughput_rps': len(samples) / elapsed if elapsed else None,
+        'p50_ms': summary['p50'],
+        'p95_ms': summary['p95'],
+        'p99_ms': summary['p99'],
+    }
+
+
+def print_results(client_name, client_results):
+    print(f'\n{client_name}')
+    for scenario, result in client_results.items():
+        if 'skipped' in result:
+            print(f"  {scenario:12} skipped: {result['skipped']}")
+            continue
+        print(f"  {scenario:12} {result['throughput_rps']:9.1f} req/s  "
+              f"p50 {result['p50_ms']:8.2f} ms  p95 {result['p95_ms']:8.2f} ms  "
+              f"p99 {result['p99_ms']:8.2f} ms  errors {result['errors']}")
+
+
+def get_errors(results):
+    return [
+        f"{client_name} {scenario}: {result['errors']} of "
+        f"{result['requests']} requests failed"
+        for client_name, client_results in results['results'].items()
+        for scenario, result in client_results.items()
+        if result.get('errors')
+    ]
+
+
+def compare(baseline, results, threshold):
+    """
+    Returns the tracked metrics of ``results`` worse than in ``baseline``
+    by more than ``threshold``, printing every change.
+    """
+    if baseline['meta'].get('users') != results['meta']['users']:
+        print('\nwarning: the baseline was seeded with {} users'.format(
+            baseline['meta'].get('users')))
+
+    regressions = []
+    print(f"\ncompared with {baseline['meta'].get('commit') or 'baseline'}")
+    for client_name, client_results in results['results'].items():
+        for scenario, result in client_results.items():
+            previous = baseline['results'].get(client_name, {}).get(scenario, {})
+            for metric, higher_is_better in TRACKED_METRICS.items():
+                old, new = previous.get(metric), result.get(metric)
+                if not old or new is None:
+                    continue
+                change = (new - old) / old
+                regressed = -change > threshold if higher_is_better \
+                    else change > threshold
+                print(f"  {client_name:5} {scenario:12} {metric:15} "
+                      f"{old:10.2f} -> {new:10.2f} ({change:+.1%})"
+                      f"{'  REGRESSION' if regressed else ''}")
+                if regressed:
+                    regressions.append(
+                        f'{client_name} {scenario} {metric}: '
+                        f'{old:.2f} -> {new:.2f} ({change:+.1%})'
+                    )
+    return regressions
+
+
+if __name__ == '__main__':
+    main()
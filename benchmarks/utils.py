@@ -0,0 +1,176 @@
+"""
+Helpers shared by the benchmark scripts.
+
+Scripts are run from the project root as modules, e.g.
+``python -m benchmarks.compiled_read``. Each run works on a throw-away
+test database, never on the configured one.
+"""
+import asyncio
+import json
+import os
+import statistics
+import time
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+
+def create_test_database(name=None):
+    """
+    Creates and migrates a test database and returns the name of the
+    original one, to be passed to `destroy_test_database`.
+
+    :param name: name of the test database, e.g. a file for SQLite, which
+        otherwise uses an in-memory database
+    """
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    if name is not None:
+        connection.settings_dict['TEST']['NAME'] = name
+    connection.creation.create_test_db(verbosity=0, keepdb=False)
+    return old_name
+
+
+def destroy_test_database(old_name):
+    from django.db import connection
+    from django.test.utils import teardown_test_environment
+
+    connection.creation.destroy_test_db(old_name, verbosity=0)
+    teardown_test_environment()
+
+
+def seed_users(count, batch_size=5000):
+    """
+    Inserts ``count`` users sharing one pre-computed password hash.
+    """
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+
+    user_model = get_user_model()
+    password = make_password('password')
+    start = user_model.objects.count()
+    for offset in range(start, start + count, batch_size):
+        user_model.objects.bulk_create([
+            user_model(
+                email=f'user{index}@example.com',
+                full_name=f'User {index}',
+                phone_number=f'98{index:08d}',
+                password=password,
+            )
+            for index in range(offset, min(offset + batch_size, start + count))
+        ])
+
+
+def measure(func, repeat=5):
+    """
+    Calls ``func`` ``repeat`` times and returns the durations in seconds.
+    """
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        'min': samples[0],
+        'median': statistics.median(samples),
+        'max': samples[-1],
+    }
+
+
+class ASGIClient:
+    """
+    Sends requests to an ASGI application in process, without a server.
+
+    :param application: the ASGI application, e.g. ``config.asgi.application``
+    :param headers: ``{name: value}`` sent with every request
+    """
+
+    def __init__(self, application, headers=None):
+        self.application = application
+        self.headers = [
+            (name.lower().encode('latin1'), value.encode('latin1'))
+            for name, value in (headers or {}).items()
+        ]
+        self.loop = asyncio.new_event_loop()
+
+    async def request(self, method, path, data=None):
+        """
+        Returns the status code and body of the response.
+        """
+        path, _, query_string = path.partition('?')
+        body = json.dumps(data).encode() if data is not None else b''
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': path,
+            'root_path': '',
+            'query_string': query_string.encode(),
+            'headers': [
+                (b'host', b'testserver'),
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+                *self.headers,
+            ],
+            'server': ('testserver', 80),
+            'client': ('127.0.0.1', 0),
+        }
+        messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+        disconnected = asyncio.Event()
+        sent = []
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        try:
+            await self.application(scope, receive, send)
+        finally:
+            disconnected.set()
+        return sent[0]['status'], b''.join(
+            message.get('body', b'') for message in sent[1:]
+        )
+
+    def run(self, requests, concurrency=1):
+        """
+        Sends ``requests``, ``(method, path, data)`` tuples, keeping up to
+        ``concurrency`` of them in flight.
+
+        :return: ``(status, seconds)`` of each request and the wall time
+        """
+        async def timed(semaphore, method, path, data):
+            async with semaphore:
+                started = time.perf_counter()
+                status, _ = await self.request(method, path, data)
+                return status, time.perf_counter() - started
+
+        async def run_all():
+            semaphore = asyncio.Semaphore(concurrency)
+            return await asyncio.gather(*(
+                timed(semaphore, *request) for request in requests
+            ))
+
+        started = time.perf_counter()
+        results = self.loop.run_until_complete(run_all())
+        return results, time.perf_counter() - started
+
+    def close(self):
+        self.loop.close()
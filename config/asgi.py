@@ -9,8 +9,20 @@ https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+# As django.core.asgi.get_asgi_application, with streaming responses
+# consumed off the event loop.
+django.setup(set_prefix=False)
+
+# Imported once Django is set up.
+from apps.core.asgi import AsyncRouter, StreamingASGIHandler  # noqa: E402
+from apps.users.api.v1 import asgi as users_asgi  # noqa: E402
+
+django_application = StreamingASGIHandler()
+
+application = AsyncRouter(django_application)
+application.route('POST', '/api/v1/user/get-token/', users_asgi.obtain_token)
+application.route('POST', '/api/v1/user/', users_asgi.create_user)
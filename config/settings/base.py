@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/3.0/ref/settings/
 import datetime
 import os
 
+from apps.core.db.config import get_database_config
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 
 PROJECT_DIR = os.path.dirname(os.path.dirname(
@@ -56,6 +58,7 @@ THIRD_PARTY_APPS = [
 ]
 
 LOCAL_APPS = [
+    'apps.core',
     'apps.users',
 ]
 
@@ -63,6 +66,7 @@ INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 
 MIDDLEWARE = [
+    'apps.core.profiling.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -97,11 +101,40 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
 
+# Configured by DATABASE_URL and the DATABASE_POOL_* variables, see
+# apps.core.db.config; PostgreSQL URLs get a pool of connections.
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+    'default': get_database_config(
+        'sqlite:///' + os.path.join(BASE_DIR, 'db.sqlite3')
+    ),
+}
+
+# PRAGMAs run on each SQLite connection: PROFILE is 'performance' (WAL,
+# synchronous=NORMAL, memory mapping, larger cache, see apps.core.db.sqlite)
+# or 'default', and PRAGMAS overrides single values. Every OPTIMIZE_INTERVAL
+# and CHECKPOINT_INTERVAL seconds, a new connection also runs PRAGMA optimize
+# and a passive WAL checkpoint.
+SQLITE = {
+    'PROFILE': 'performance',
+    'PRAGMAS': {},
+    'OPTIMIZE_INTERVAL': 3600,
+    'CHECKPOINT_INTERVAL': 300,
+}
+
+# Threads hashing and checking passwords for the async endpoints and bulk
+# imports. Requests beyond MAX_QUEUE waiting tasks are answered with 503
+# instead of tying up more workers.
+PASSWORD_HASHING_POOL = {
+    'MAX_WORKERS': 4,
+    'MAX_QUEUE': 64,
+}
+
+# Threads running the database work of the async viewsets (opt-in, see
+# apps.core.async_viewsets) on Django 3.1+; also the number of database
+# connections they hold at most.
+ASYNC_VIEWSET_EXECUTOR = {
+    'MAX_WORKERS': 16,
+    'MAX_QUEUE': 256,
 }
 
 
@@ -156,12 +189,57 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.users.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ),
 }
 
+# Users loaded by `CachedJWTAuthentication`. BACKEND is 'django', the CACHES
+# entry named by CACHE_ALIAS, or 'local' (process memory). Saving a user
+# drops it from the cache of the saving process only unless the cache is
+# shared (e.g. memcached), so other workers may accept a deactivated user for
+# up to TIMEOUT seconds; `manage.py check` warns about it (users.W001).
+AUTH_USER_CACHE = {
+    'BACKEND': 'django',
+    'TIMEOUT': 60,
+    'MAX_SIZE': 10000,
+}
+
+# Per-request SQL, serializer, validation, view and render timings sent as a
+# `Server-Timing` header and kept as rolling percentiles of the last
+# WINDOW_SIZE requests per URL name, see /api/v1/stats/server-timing/. The
+# header goes to every client with HEADER on, else only to staff users or
+# with DEBUG on.
+SERVER_TIMING = {
+    'ENABLED': True,
+    'HEADER': False,
+    'WINDOW_SIZE': 1024,
+}
+
+# Responses of the actions listed in a viewset's `response_cache_actions`,
+# stored in the CACHES entry named by CACHE_ALIAS. Use a shared backend
+# (e.g. FileBasedCache or memcached) when running several workers, so that
+# invalidations reach all of them; `manage.py check` warns about it
+# (core.W001).
+RESPONSE_CACHE = {
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 60,
+    'KEY_PREFIX': 'response',
+}
+
+# Variants of uploaded images (`apps.core.images.ImageVariantsField`): each
+# fitted in a SIZES pixels square and encoded as FORMAT by PROCESSES worker
+# processes. Uploads beyond MAX_QUEUE waiting ones get no variants until
+# `manage.py generate_image_variants` runs.
+IMAGE_VARIANTS = {
+    'SIZES': (64, 256, 1024),
+    'FORMAT': 'WEBP',
+    'QUALITY': 80,
+    'PROCESSES': 2,
+    'MAX_QUEUE': 64,
+}
+
 LOGIN_URL = 'rest_framework:login'
 LOGOUT_URL = 'rest_framework:logout'
 
@@ -194,3 +272,9 @@ SIMPLE_JWT = {
 
 # Max 2mb of file Upload
 ATTACHMENT_MAX_UPLOAD_SIZE = 2 * 1024 * 1024
+
+# Encoded payloads kept in memory for fields with `represent_in_base64=True`
+BASE64_REPRESENTATION_CACHE = {
+    'MAX_BYTES': 32 * 1024 * 1024,
+    'MAX_ITEM_BYTES': 1024 * 1024,
+}